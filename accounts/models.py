@@ -1,9 +1,16 @@
+from django.conf import settings
 from django.db import models
 from phonenumber_field.modelfields import PhoneNumberField
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser
 from django.db.models.signals import post_save
+from PIL import UnidentifiedImageError
+import logging
 import uuid
 
+from utils.images import normalize_field_file
+
+logger = logging.getLogger(__name__)
+
 
 # Create your models here.
 class CustomUserManager(BaseUserManager):
@@ -82,6 +89,15 @@ class Profile(models.Model):
     def __str__(self):
         return f'{self.user.first_name} {self.user.last_name}'
 
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            try:
+                normalize_field_file(self.image, settings.PROFILE_IMAGE_MAX_SIDE)
+            except (UnidentifiedImageError, OSError):
+                # Image illisible : gardée telle quelle, comme avant
+                logger.warning("Photo de profil non normalisée : %s", self.image.name, exc_info=True)
+        super().save(*args, **kwargs)
+
 
 def post_save_receiver(sender, instance, created, **kwargs):
     if created:
@@ -1,3 +1,6 @@
-from django.test import TestCase
+from pages.benchmarks import QueryBudgetTestCase
 
-# Create your tests here.
+
+class AccountViewsQueryBudgetTests(QueryBudgetTestCase):
+    def test_account_profile(self):
+        self.assertWithinBudget("account_profile")
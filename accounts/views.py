@@ -1,9 +1,8 @@
-from django.db.models import Prefetch
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from cars.models import Car, CarPhoto
+from cars.models import Car
 
 from .models import Profile
 from .forms import CustomUserCreationForm, CustomUserUpdateForm, ProfileUpdateForm
@@ -86,13 +85,6 @@ def account_list(request):
         Car.objects
         .filter(owner=user)
         .select_related("brand", "model_name", "place__city")
-        .prefetch_related(
-            Prefetch(
-                "photos",
-                queryset=CarPhoto.objects.order_by("order", "id"),
-                to_attr="prefetched_photos"
-            )
-        )
         .order_by("-created_at")[:3]
     )
     context = {"last_cars": last_cars}
@@ -109,13 +101,6 @@ def account_profile(request):
         Car.objects
         .filter(owner=user)
         .select_related("brand", "model_name", "place__city")
-        .prefetch_related(
-            Prefetch(
-                "photos",
-                queryset=CarPhoto.objects.order_by("order", "id"),
-                to_attr="prefetched_photos"
-            )
-        )
         .order_by("-created_at")[:3]
     )
 
@@ -1,11 +1,17 @@
 from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 
+from pages.landing_members import sync_cars
+from .bitmap_index import car_index
+from .cache_tags import bump_tags, car_tags
 from .models import (
     City, Place, Brand, CarModel,
-    Car, CarFeature, CarPhoto, Favorite
+    Car, CarFeature, CarPhoto, Favorite, save_photos
 )
+from .templatetags.car_images import rendition_url
 
 # ---------- Utilitaires d’affichage ----------
 def format_price(amount: int) -> str:
@@ -61,7 +67,7 @@ class CarPhotoInline(admin.TabularInline):
         if obj.id and obj.image:
             return format_html(
                 '<img src="{}" style="height:60px;width:90px;object-fit:cover;border-radius:6px;border:1px solid #ddd;" />',
-                obj.image.url
+                rendition_url(obj.image, obj.renditions, "thumb")
             )
         return "—"
 
@@ -83,18 +89,18 @@ class CarAdmin(admin.ModelAdmin):
     search_fields = (
         "title", "brand__name", "model_name__name",
         "owner__username", "owner__email",
-        "place__city__name",
+        "place__city__name", "external_id",
     )
     autocomplete_fields = ("brand", "model_name", "owner", "place")
     filter_horizontal = ("features",)
-    readonly_fields = ("slug", "created_at", "updated_at", "cover_preview")
+    readonly_fields = ("slug", "external_id", "created_at", "updated_at", "cover_preview")
     inlines = [CarPhotoInline]
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
 
     fieldsets = (
         ("Informations principales", {
-            "fields": ("owner", "title", "slug", "brand", "model_name", "year", "body_type")
+            "fields": ("owner", "title", "slug", "external_id", "brand", "model_name", "year", "body_type")
         }),
         ("Caractéristiques", {
             "fields": ("transmission", "fuel_type", "seats", "doors", "mileage_km", "color", "features")
@@ -129,35 +135,58 @@ class CarAdmin(admin.ModelAdmin):
 
     @admin.display(description="Cover")
     def cover_preview(self, obj: Car):
-        photo = obj.cover_photo
-        if photo and photo.image:
+        if obj.cover_image:
             return format_html(
                 '<img src="{}" style="height:100px;width:160px;object-fit:cover;border-radius:8px;border:1px solid #ddd;" />',
-                photo.image.url
+                rendition_url(obj.cover_image, obj.cover_renditions, "thumb")
             )
         return mark_safe('<span style="opacity:.6">Aucune photo de couverture</span>')
 
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not CarPhoto:
+            return super().save_formset(request, form, formset, change)
+        # Nouvelles photos envoyées ensemble vers le stockage (save_photos)
+        photos = formset.save(commit=False)
+        for photo in formset.deleted_objects:
+            photo.delete()
+        save_photos(photos)
+        formset.save_m2m()
+
     # --------- Actions utiles ---------
     actions = ["activer", "desactiver", "mettre_en_avant", "retirer_mise_en_avant"]
 
+    def _bulk_update(self, queryset, **values):
+        # update() ne déclenche pas de signaux : ce que les receivers de Car.save auraient fait
+        cars = list(queryset.select_related("place").only(
+            "pk", "brand_id", "body_type", "place__region", "place__city_id"))
+        ids = [car.pk for car in cars]
+        # updated_at : le flux partenaires (delta), les validateurs ETag, l'index bitmap et le plan
+        # du site voient le changement
+        updated = Car.objects.filter(pk__in=ids).update(**values, updated_at=timezone.now())
+        sync_cars(ids)
+        bump_tags(*{tag for car in cars for tag in car_tags(car)})
+        if car_index.ready:
+            transaction.on_commit(lambda: car_index.refresh(ids))
+        return updated
+
     @admin.action(description="Activer les annonces sélectionnées")
     def activer(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = self._bulk_update(queryset, is_active=True)
         self.message_user(request, f"{updated} annonce(s) activée(s).")
 
     @admin.action(description="Désactiver les annonces sélectionnées")
     def desactiver(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = self._bulk_update(queryset, is_active=False)
         self.message_user(request, f"{updated} annonce(s) désactivée(s).")
 
     @admin.action(description="Mettre en avant")
     def mettre_en_avant(self, request, queryset):
-        updated = queryset.update(is_featured=True)
+        updated = self._bulk_update(queryset, is_featured=True)
         self.message_user(request, f"{updated} annonce(s) mises en avant.")
 
     @admin.action(description="Retirer la mise en avant")
     def retirer_mise_en_avant(self, request, queryset):
-        updated = queryset.update(is_featured=False)
+        updated = self._bulk_update(queryset, is_featured=False)
         self.message_user(request, f"{updated} annonce(s) retirées de la mise en avant.")
 
 
@@ -183,7 +212,7 @@ class CarPhotoAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="height:50px;width:75px;object-fit:cover;border-radius:6px;border:1px solid #ddd;" />',
-                obj.image.url
+                rendition_url(obj.image, obj.renditions, "thumb")
             )
         return "—"
 
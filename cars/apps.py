@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CarsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cars'
+
+    def ready(self):
+        # Branche les signaux : étiquettes de cache, vecteurs de recherche, index bitmap, favoris, déclinaisons
+        from . import cache_tags, search, bitmap_index, favorites, renditions  # noqa: F401
+        # Capture des requêtes SQL lentes, sur chaque connexion (requêtes HTTP comme commandes)
+        from utils import slow_queries  # noqa: F401
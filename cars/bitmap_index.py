@@ -0,0 +1,355 @@
+# cars/bitmap_index.py
+"""
+Index bitmap en mémoire des annonces actives (un par processus).
+
+Chaque annonce active reçoit une position ; pour chaque couple (facette, valeur)
+on garde un entier Python dont le bit n° position vaut 1 si l'annonce a cette
+valeur. Filtrer = ET/OU binaires, compter = int.bit_count() : aucune requête.
+Seule la page affichée est ensuite chargée par clé primaire.
+
+Les positions suivent created_at croissant, donc « les plus récentes d'abord »
+= bits de poids fort d'abord.
+
+Fraîcheur :
+- les signaux Car / features du processus mettent l'index à jour après commit ;
+- toutes les CARS_BITMAP_SYNC_INTERVAL secondes, les annonces modifiées
+  ailleurs (updated_at) sont relues ;
+- toutes les CARS_BITMAP_REBUILD_INTERVAL secondes, reconstruction complète
+  (suppressions et update() en masse, qui ne déclenchent pas de signaux).
+
+Construction et synchro se font dans un thread du processus
+(CARS_BITMAP_ASYNC), jamais pendant une requête, une seule à la fois : les
+requêtes servent l'index précédent, ou passent par SQL (cars.facets) tant que
+le premier n'est pas prêt.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.utils import timezone
+
+from .facets import FACETS, BucketFacet, active_filters, build_facets
+from .models import Car, CarFeature, Place
+
+logger = logging.getLogger(__name__)
+
+SYNC_INTERVAL = getattr(settings, "CARS_BITMAP_SYNC_INTERVAL", 30)
+REBUILD_INTERVAL = getattr(settings, "CARS_BITMAP_REBUILD_INTERVAL", 600)
+SYNC_MARGIN = timedelta(seconds=5)
+
+# facette -> colonne lue en base ; doors et color sont indexés sans être des facettes
+COLUMNS = {
+    "body_type": "body_type",
+    "region": "place__region",
+    "fuel_type": "fuel_type",
+    "transmission": "transmission",
+    "seats": "seats",
+    "doors": "doors",
+    "color": "color",
+    "year": "year",
+    "price": "daily_price",
+    "mileage": "mileage_km",
+}
+BUCKETS = {facet.name: facet for facet in FACETS if isinstance(facet, BucketFacet)}
+
+
+def is_enabled():
+    return getattr(settings, "CARS_BITMAP_INDEX", True)
+
+
+def _keys(row, slugs):
+    """Clés (facette, valeur) d'une annonce à partir de sa ligne values()."""
+    keys = set()
+    for name, column in COLUMNS.items():
+        value = row[column]
+        if value is None:
+            continue
+        if name in BUCKETS:
+            value = BUCKETS[name].bucket_for(value)
+            if value is None:
+                continue
+        keys.add((name, str(value)))
+    keys.update(("features", slug) for slug in slugs)
+    return keys
+
+
+def _load(qs):
+    """[(pk, clés)] pour les annonces de `qs`, triées par created_at : 2 requêtes."""
+    rows = list(qs.order_by("created_at", "pk").values("pk", "is_active", *COLUMNS.values()))
+    slugs = {}
+    through = Car.features.through.objects.filter(car__in=qs.values("pk"))
+    for car_id, slug in through.values_list("car_id", "carfeature__slug"):
+        slugs.setdefault(car_id, []).append(slug)
+    return [(row["pk"], row["is_active"], _keys(row, slugs.get(row["pk"], ()))) for row in rows]
+
+
+class _State:
+    def __init__(self):
+        self.ids = []          # position -> pk (None si libérée)
+        self.positions = {}    # pk -> position
+        self.keys = {}         # position -> clés indexées
+        self.bitmaps = {}      # (facette, valeur) -> int
+        self.alive = 0
+        self.feature_names = {}
+
+    def add(self, pk, keys):
+        pos = self.positions.get(pk)
+        if pos is None:
+            # Nouvelle annonce (ou réactivée) : en tête de liste jusqu'à la prochaine reconstruction
+            pos = len(self.ids)
+            self.ids.append(pk)
+            self.positions[pk] = pos
+        else:
+            mask = ~(1 << pos)
+            for key in self.keys.get(pos, ()):
+                self.bitmaps[key] &= mask
+        self.keys[pos] = keys
+        bit = 1 << pos
+        self.alive |= bit
+        for key in keys:
+            self.bitmaps[key] = self.bitmaps.get(key, 0) | bit
+
+    def remove(self, pk):
+        pos = self.positions.pop(pk, None)
+        if pos is None:
+            return
+        self.ids[pos] = None
+        mask = ~(1 << pos)
+        self.alive &= mask
+        for key in self.keys.pop(pos, ()):
+            self.bitmaps[key] &= mask
+
+
+class BitmapIndex:
+    def __init__(self):
+        self._state = None
+        self._lock = threading.Lock()
+        # Reconstruction / synchro demandée ou en cours (get_car_index)
+        self._build_lock = threading.Lock()
+        self.built_at = 0.0
+        self.synced_at = 0.0
+        self._sync_from = None
+
+    @property
+    def ready(self):
+        return self._state is not None
+
+    # ---------- Construction / rafraîchissement ----------
+    def rebuild(self):
+        started = timezone.now()
+        state = _State()
+        for pk, _, keys in _load(Car.objects.filter(is_active=True)):
+            state.add(pk, keys)
+        state.feature_names = dict(CarFeature.objects.values_list("slug", "name"))
+        with self._lock:
+            self._state = state
+            self.built_at = self.synced_at = time.monotonic()
+            self._sync_from = started - SYNC_MARGIN
+
+    def refresh(self, pks):
+        """Relit ces annonces en base : ajout, mise à jour ou retrait de l'index."""
+        if self._state is None or not pks:
+            return
+        found = _load(Car.objects.filter(pk__in=list(pks)))
+        with self._lock:
+            state = self._state
+            for pk, is_active, keys in found:
+                if is_active:
+                    state.add(pk, keys)
+                else:
+                    state.remove(pk)
+            for pk in set(pks) - {pk for pk, _, _ in found}:
+                state.remove(pk)
+
+    def remove(self, pk):
+        if self._state is not None:
+            with self._lock:
+                self._state.remove(pk)
+
+    def sync(self):
+        """Rattrape les annonces enregistrées par les autres processus depuis la dernière synchro."""
+        started = timezone.now()
+        pks = list(Car.objects.filter(updated_at__gte=self._sync_from).values_list("pk", flat=True))
+        self.refresh(pks)
+        self.synced_at = time.monotonic()
+        self._sync_from = started - SYNC_MARGIN
+
+    def schedule_rebuild(self):
+        self.built_at = 0.0
+
+    # ---------- Lecture ----------
+    # `state` : état figé par indexed_search, qu'une reconstruction concurrente ne remplace pas
+    def match(self, active, skip=None, state=None):
+        """Bitmap des annonces satisfaisant `active` (ET entre facettes, ET entre options)."""
+        state = state or self._state
+        bits = state.alive
+        for name, value in active.items():
+            if name == skip:
+                continue
+            for v in (value if isinstance(value, tuple) else (value,)):
+                bits &= state.bitmaps.get((name, v), 0)
+        return bits
+
+    def facet_counts(self, active, state=None):
+        state = state or self._state
+        counts = {}
+        for facet in FACETS:
+            scope = self.match(active, skip=None if facet.multiple else facet.name, state=state)
+            if facet.name == "features":
+                options = sorted(state.feature_names.items(), key=lambda item: item[1])
+            else:
+                options = [(str(value), str(label)) for value, label in facet.choices]
+            counts[facet.name] = [
+                (value, label, (scope & state.bitmaps.get((facet.name, value), 0)).bit_count())
+                for value, label in options
+            ]
+        return counts
+
+    def page_ids(self, bits, offset, limit, state=None):
+        """pk des annonces `offset`..`offset+limit` de `bits`, les plus récentes d'abord."""
+        state = state or self._state
+        binary = bin(bits)[2:]     # caractère 0 = bit de poids fort
+        top = len(binary) - 1
+        ids = []
+        i = binary.find("1")
+        skipped = 0
+        while i != -1 and len(ids) < limit:
+            if skipped < offset:
+                skipped += 1
+            else:
+                ids.append(state.ids[top - i])
+            i = binary.find("1", i + 1)
+        return ids
+
+
+class IndexedResults:
+    """Séquence paresseuse compatible Paginator : compte via l'index, charge une page par pk."""
+
+    def __init__(self, index, bits, queryset, state=None):
+        self.index = index
+        self.bits = bits
+        self.queryset = queryset
+        self.state = state
+
+    def count(self):
+        return self.bits.bit_count()
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[0:self.count()])
+
+    def __getitem__(self, k):
+        if not isinstance(k, slice):
+            return self[k:k + 1][0]
+        start = k.start or 0
+        stop = self.count() if k.stop is None else k.stop
+        ids = self.index.page_ids(self.bits, start, max(stop - start, 0), self.state)
+        cars = self.queryset.in_bulk(ids)
+        return [cars[pk] for pk in ids if pk in cars]
+
+
+car_index = BitmapIndex()
+
+# Un seul worker : une reconstruction ou une synchro à la fois
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bitmap-index")
+
+
+def _update(rebuild):
+    # _build_lock a été pris par get_car_index ; rendu ici, dans le thread qui a fait le travail
+    try:
+        if rebuild:
+            car_index.rebuild()
+        else:
+            car_index.sync()
+    finally:
+        car_index._build_lock.release()
+
+
+def _update_in_worker(rebuild):
+    try:
+        _update(rebuild)
+    except Exception:
+        logger.exception("Mise à jour de l'index bitmap impossible")
+    finally:
+        # Connexion propre au thread du worker
+        connections.close_all()
+
+
+def get_car_index():
+    """
+    Index du processus, ou None s'il n'est pas encore construit. Reconstruction et synchro
+    sont lancées selon le calendrier, en arrière-plan ; la requête n'attend pas.
+    """
+    now = time.monotonic()
+    rebuild = not car_index.ready or now - car_index.built_at > REBUILD_INTERVAL
+    if (rebuild or now - car_index.synced_at > SYNC_INTERVAL) and car_index._build_lock.acquire(blocking=False):
+        if getattr(settings, "CARS_BITMAP_ASYNC", True):
+            _executor.submit(_update_in_worker, rebuild)
+        else:
+            _update(rebuild)
+    return car_index if car_index.ready else None
+
+
+def indexed_search(queryset, params=None):
+    """
+    Équivalent de faceted_search servi par l'index : (résultats, facettes, total) ;
+    None tant que l'index n'est pas prêt (l'appelant passe par SQL).
+    """
+    index = get_car_index()
+    if index is None:
+        return None
+    # Positions propres à un état : bits et page doivent venir du même
+    state = index._state
+    active = active_filters(params)
+    bits = index.match(active, state=state)
+    return (IndexedResults(index, bits, queryset, state),
+            build_facets(active, index.facet_counts(active, state)), bits.bit_count())
+
+
+# ---------- Signaux ----------
+def car_post_save_receiver(sender, instance, raw=False, **kwargs):
+    if not raw and car_index.ready:
+        transaction.on_commit(lambda: car_index.refresh([instance.pk]))
+
+
+def car_post_delete_receiver(sender, instance, **kwargs):
+    if car_index.ready:
+        transaction.on_commit(lambda: car_index.remove(instance.pk))
+
+
+def car_features_changed_receiver(sender, instance, action, reverse, pk_set, **kwargs):
+    if not car_index.ready or not action.startswith("post_"):
+        return
+    if reverse:
+        # feature.cars.add(...) : pk_set contient des voitures ; un clear() impose une reconstruction
+        if pk_set is None:
+            car_index.schedule_rebuild()
+            return
+        pks = list(pk_set)
+    else:
+        pks = [instance.pk]
+    transaction.on_commit(lambda: car_index.refresh(pks))
+
+
+def place_post_save_receiver(sender, instance, created, **kwargs):
+    # Changement de région d'un lieu : plus simple de tout reconstruire à la prochaine lecture
+    if not created:
+        car_index.schedule_rebuild()
+
+
+def carfeature_post_save_receiver(sender, instance, **kwargs):
+    car_index.schedule_rebuild()
+
+
+post_save.connect(car_post_save_receiver, sender=Car)
+post_delete.connect(car_post_delete_receiver, sender=Car)
+m2m_changed.connect(car_features_changed_receiver, sender=Car.features.through)
+post_save.connect(place_post_save_receiver, sender=Place)
+post_save.connect(carfeature_post_save_receiver, sender=CarFeature)
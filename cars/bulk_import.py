@@ -0,0 +1,439 @@
+# cars/bulk_import.py
+"""
+Import en masse d'annonces depuis un flux CSV ou JSON Lines (commande import_cars).
+
+Le fichier est lu ligne à ligne, jamais chargé entièrement. Les données de
+référence (marques, modèles, lieux, caractéristiques) sont chargées une fois en
+mémoire ; chaque lot de lignes est ensuite écrit en quelques requêtes :
+
+- un INSERT … ON CONFLICT (external_id) DO UPDATE pour les voitures : relancer
+  l'import met à jour les annonces déjà importées au lieu de les dupliquer ;
+- un INSERT dans la table des caractéristiques (Car.features.through) ;
+- les photos, lues dans un dossier local, sont normalisées et envoyées au
+  stockage par un pool de threads, puis leurs déclinaisons générées.
+
+bulk_create ne déclenche aucun signal : vecteur de recherche, landing pages,
+index bitmap et étiquettes de cache sont mis à jour explicitement, par lot.
+
+Colonnes (clés JSON) : external_id, owner (email), title, brand, model, year,
+body_type, transmission, fuel_type, seats, doors, mileage_km, color,
+description, city, region, daily_price, is_active, features, photos.
+En CSV, features et photos sont séparées par "|" ; les choix acceptent la
+valeur ("auto") ou le libellé ("Automatique"). Une colonne absente (ou vide,
+hors texte) prend la valeur par défaut du modèle pour une nouvelle annonce et
+laisse intacte celle d'une annonce déjà importée ; de même pour features. Les
+photos ne sont importées que pour une voiture qui n'en a encore aucune.
+"""
+import csv
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import connections, transaction
+from PIL import Image
+
+from pages.landing_members import sync_cars
+from utils.images import normalize_image
+from .bitmap_index import car_index
+from .cache_tags import bump_tags, car_tags
+from .models import Brand, Car, CarFeature, CarModel, CarPhoto, City, Place
+from .renditions import generate_for_photo
+from .search import update_search_vectors
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+PHOTO_WORKERS = 8
+LIST_SEPARATOR = "|"
+
+CHOICE_FIELDS = ("body_type", "transmission", "fuel_type", "seats", "doors", "color")
+INTEGER_FIELDS = ("year", "mileage_km", "daily_price")
+# Écrasés lors d'une mise à jour ; slug, created_at, favoris et couverture sont conservés
+UPDATE_FIELDS = (
+    "owner", "title", "brand", "model_name", "place", "description", "is_active",
+    *CHOICE_FIELDS, *INTEGER_FIELDS, "updated_at",
+)
+# Toujours écrasés (brand et city sont obligatoires) ; les autres seulement si la ligne les fournit
+ALWAYS_UPDATED = ("brand", "place", "updated_at")
+# Colonne -> champ : texte dès que la colonne existe, le reste seulement si la valeur n'est pas vide
+TEXT_COLUMNS = {"title": "title", "description": "description", "model": "model_name"}
+VALUE_COLUMNS = {"owner": "owner", "is_active": "is_active", **{name: name for name in CHOICE_FIELDS + INTEGER_FIELDS}}
+# Clés étrangères déjà résolues par les tables en mémoire ; slug et pk posés à l'écriture
+CLEAN_EXCLUDE = ["owner", "brand", "model_name", "place", "cover", "slug", "id", "external_id"]
+TRUE_VALUES = {"1", "true", "vrai", "oui", "yes"}
+FALSE_VALUES = {"0", "false", "faux", "non", "no"}
+
+
+class RowError(Exception):
+    pass
+
+
+def read_rows(fh, fmt):
+    """(numéro de ligne, enregistrement) du flux ; en JSON Lines, la ligne est décodée par l'importeur."""
+    if fmt == "csv":
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for number, line in enumerate(fh, 1):
+            if line.strip():
+                yield number, line
+
+
+def _decode(raw):
+    """Enregistrement CSV (dict) ou ligne JSON -> dict aux clés nettoyées."""
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError as e:
+            raise RowError(f"JSON invalide ({e}).")
+    if not isinstance(raw, dict):
+        raise RowError("Objet JSON attendu.")
+    return {k.strip(): v for k, v in raw.items() if isinstance(k, str)}
+
+
+def _key(value):
+    return " ".join(str(value).split()).casefold()
+
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def _list(value):
+    if isinstance(value, (list, tuple)):
+        return [_text(v) for v in value if _text(v)]
+    return [v.strip() for v in _text(value).split(LIST_SEPARATOR) if v.strip()]
+
+
+def update_fields(row):
+    """Champs qu'une ligne écrase sur une annonce existante, dans l'ordre de UPDATE_FIELDS."""
+    present = set(ALWAYS_UPDATED)
+    present.update(field for column, field in TEXT_COLUMNS.items() if column in row)
+    present.update(field for column, field in VALUE_COLUMNS.items() if _text(row.get(column)))
+    return tuple(field for field in UPDATE_FIELDS if field in present)
+
+
+def _choice_map(field):
+    choices = {}
+    for value, label in field.flatchoices:
+        choices[_key(value)] = choices[_key(label)] = value
+    return choices
+
+
+class CarImporter:
+    """
+    Importe un flux d'enregistrements [(numéro, dict ou ligne JSON), …] par lots.
+    Les erreurs sont par ligne : la ligne est ignorée, le reste du lot est écrit.
+    """
+
+    def __init__(self, owner=None, photos_dir=None, batch_size=BATCH_SIZE, workers=PHOTO_WORKERS,
+                 create_missing=False, renditions=True, on_error=None, on_batch=None):
+        self.default_owner = owner
+        self.photos_dir = os.path.realpath(photos_dir) if photos_dir else None
+        self.batch_size = batch_size
+        self.workers = workers
+        self.create_missing = create_missing
+        self.renditions = renditions
+        self.on_error = on_error or (lambda number, external_id, message: None)
+        self.on_batch = on_batch or (lambda stats: None)
+        self.stats = dict(rows=0, created=0, updated=0, errors=0, photos=0, photo_errors=0)
+        self.owners = {owner.email.lower(): owner} if owner else {}
+        self.choices = {name: _choice_map(Car._meta.get_field(name)) for name in CHOICE_FIELDS}
+        self.regions = _choice_map(Place._meta.get_field("region"))
+        self._load_references()
+
+    def _load_references(self):
+        self.brands = {_key(b.name): b for b in Brand.objects.all()}
+        self.models = {(m.brand_id, _key(m.name)): m for m in CarModel.objects.exclude(name=None)}
+        self.cities = {_key(c.name): c for c in City.objects.exclude(name=None)}
+        self.features = {_key(f.name): f for f in CarFeature.objects.all()}
+        self.places, self.places_by_city = {}, {}
+        for place in Place.objects.select_related("city").order_by("pk"):
+            self._add_place(place)
+
+    def _add_place(self, place):
+        self.places[place.pk] = place
+        self.places_by_city.setdefault((place.city_id, place.region), place)
+        # Sans région précisée : le premier lieu de la ville
+        self.places_by_city.setdefault((place.city_id, None), place)
+
+    # ---------- Données de référence ----------
+    def _brand(self, name):
+        brand = self.brands.get(_key(name))
+        if brand is None:
+            if not self.create_missing:
+                raise RowError(f"Marque inconnue : {name}.")
+            brand = self.brands[_key(name)] = Brand.objects.create(name=name)
+        return brand
+
+    def _model(self, brand, name):
+        model = self.models.get((brand.pk, _key(name)))
+        if model is None:
+            if not self.create_missing:
+                raise RowError(f"Modèle inconnu pour {brand} : {name}.")
+            model = self.models[(brand.pk, _key(name))] = CarModel.objects.create(brand=brand, name=name)
+        return model
+
+    def _place(self, city_name, region_name):
+        region = None
+        if region_name:
+            region = self.regions.get(_key(region_name))
+            if region is None:
+                raise RowError(f"Région inconnue : {region_name}.")
+        city = self.cities.get(_key(city_name))
+        if city is None:
+            if not self.create_missing:
+                raise RowError(f"Ville inconnue : {city_name}.")
+            fields = {"region": region} if region else {}
+            city = self.cities[_key(city_name)] = City.objects.create(name=city_name, **fields)
+        place = self.places_by_city.get((city.pk, region))
+        if place is None:
+            if not self.create_missing:
+                raise RowError(f"Aucun lieu pour {city} ({region or 'région non précisée'}).")
+            place = Place.objects.create(city=city, region=region or city.region)
+            self._add_place(place)
+        return place
+
+    def _feature(self, name):
+        feature = self.features.get(_key(name))
+        if feature is None:
+            if not self.create_missing:
+                raise RowError(f"Caractéristique inconnue : {name}.")
+            feature = self.features[_key(name)] = CarFeature.objects.create(name=name)
+        return feature
+
+    def _load_owners(self, rows):
+        emails = {_text(row.get("owner")).lower() for _, row in rows} - self.owners.keys()
+        emails.discard("")
+        if emails:
+            for user in get_user_model().objects.filter(email__in=emails):
+                self.owners[user.email.lower()] = user
+
+    def _photo_path(self, name):
+        path = os.path.realpath(os.path.join(self.photos_dir, name))
+        if os.path.commonpath([path, self.photos_dir]) != self.photos_dir or not os.path.isfile(path):
+            raise RowError(f"Photo introuvable : {name}.")
+        return path
+
+    # ---------- Une ligne -> Car (non enregistrée) ----------
+    def _build(self, row):
+        external_id = _text(row.get("external_id"))
+        if not external_id:
+            raise RowError("external_id manquant.")
+        if len(external_id) > Car._meta.get_field("external_id").max_length:
+            raise RowError("external_id trop long.")
+        email = _text(row.get("owner")).lower()
+        owner = self.owners.get(email) if email else self.default_owner
+        if owner is None:
+            raise RowError(f"Propriétaire inconnu : {email}." if email else "Propriétaire manquant (--owner).")
+        if not _text(row.get("brand")):
+            raise RowError("Marque manquante.")
+        if not _text(row.get("city")):
+            raise RowError("Ville manquante.")
+
+        brand = self._brand(_text(row["brand"]))
+        car = Car(
+            external_id=external_id, owner=owner, brand=brand,
+            model_name=self._model(brand, _text(row["model"])) if _text(row.get("model")) else None,
+            place=self._place(_text(row["city"]), _text(row.get("region"))),
+            title=_text(row.get("title")), description=_text(row.get("description")),
+        )
+        for name in CHOICE_FIELDS:
+            value = _text(row.get(name))
+            if value:
+                setattr(car, name, self.choices[name].get(_key(value), value))
+        for name in INTEGER_FIELDS:
+            value = _text(row.get(name))
+            if value:
+                try:
+                    setattr(car, name, int(value))
+                except ValueError:
+                    raise RowError(f"{name} : nombre entier attendu ({value}).")
+        active = _key(row.get("is_active", ""))
+        if active:
+            if active not in TRUE_VALUES | FALSE_VALUES:
+                raise RowError(f"is_active : booléen attendu ({row['is_active']}).")
+            car.is_active = active in TRUE_VALUES
+        try:
+            car.clean_fields(exclude=CLEAN_EXCLUDE)
+        except ValidationError as e:
+            raise RowError(" ".join(f"{name} : {' '.join(messages)}" for name, messages in e.message_dict.items()))
+
+        features = [self._feature(name) for name in _list(row["features"])] if "features" in row else None
+        photos = []
+        if self.photos_dir:
+            photos = [self._photo_path(name) for name in _list(row.get("photos"))]
+        return car, features, photos
+
+    # ---------- Import ----------
+    def run(self, rows):
+        batch, pending = [], set()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="import") as self.pool:
+            for number, raw in rows:
+                try:
+                    row = _decode(raw)
+                except RowError as e:
+                    self.stats["rows"] += 1
+                    self._error(number, "", str(e))
+                    continue
+                # Même external_id deux fois dans un lot : l'UPSERT ne peut pas toucher deux fois la même ligne
+                external_id = _text(row.get("external_id"))
+                if external_id in pending:
+                    self._flush(batch)
+                    batch, pending = [], set()
+                pending.add(external_id)
+                batch.append((number, row))
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch, pending = [], set()
+            self._flush(batch)
+        return self.stats
+
+    def _error(self, number, external_id, message):
+        self.stats["errors"] += 1
+        self.on_error(number, external_id, message)
+
+    def _flush(self, rows):
+        if not rows:
+            return
+        self.stats["rows"] += len(rows)
+        self._load_owners(rows)
+        built, fields = [], {}
+        for number, row in rows:
+            try:
+                car, features, photos = self._build(row)
+            except RowError as e:
+                self._error(number, _text(row.get("external_id")), str(e))
+                continue
+            built.append((number, car, features, photos))
+            fields[car.external_id] = update_fields(row)
+        if built:
+            self._write(built, fields)
+            self._import_photos(built)
+        self.on_batch(self.stats)
+
+    def _write(self, built, fields):
+        """`fields` : external_id -> champs à écraser si l'annonce existe déjà (update_fields)."""
+        cars = [car for _, car, _, _ in built]
+        # Un UPSERT par jeu de colonnes : une colonne absente d'une ligne n'écrase rien
+        groups = {}
+        for car in cars:
+            groups.setdefault(fields[car.external_id], []).append(car)
+        # Annonces déjà importées : même clé primaire et même slug ; anciennes étiquettes de cache
+        existing = {row["external_id"]: row for row in Car.objects.filter(
+            external_id__in=[car.external_id for car in cars]).values(
+            "external_id", "pk", "slug", "brand_id", "place_id", "body_type")}
+        tags = set()
+        for car in cars:
+            old = existing.get(car.external_id)
+            if old:
+                car.pk, car.slug = old["pk"], old["slug"]
+                before = Car(pk=old["pk"], brand_id=old["brand_id"], place_id=old["place_id"],
+                             body_type=old["body_type"])
+                if old["place_id"] in self.places:
+                    before.place = self.places[old["place_id"]]
+                tags.update(car_tags(before))
+            else:
+                car.slug = car.new_slug()
+            tags.update(car_tags(car))
+
+        through = Car.features.through
+        ids = [car.pk for car in cars]
+        with transaction.atomic():
+            for group_fields, group in groups.items():
+                Car.objects.bulk_create(group, update_conflicts=True, unique_fields=["external_id"],
+                                        update_fields=group_fields)
+            # Caractéristiques remplacées quand la colonne est présente
+            replaced = {car.pk for _, car, features, _ in built if features is not None}
+            through.objects.filter(car_id__in=replaced & {row["pk"] for row in existing.values()}).delete()
+            through.objects.bulk_create([
+                through(car_id=car.pk, carfeature_id=feature.pk)
+                for _, car, features, _ in built for feature in features or ()
+            ], ignore_conflicts=True)
+            # Ce que les signaux de Car.save auraient fait, une fois pour tout le lot
+            update_search_vectors(Car.objects.filter(pk__in=ids))
+            sync_cars(ids)
+            bump_tags(*tags)
+            if car_index.ready:
+                transaction.on_commit(lambda: car_index.refresh(ids))
+        self.stats["updated"] += len(existing)
+        self.stats["created"] += len(cars) - len(existing)
+
+    # ---------- Photos ----------
+    def _import_photos(self, built):
+        wanted = [(number, car, photos) for number, car, _, photos in built if photos]
+        if not wanted:
+            return
+        has_photos = set(CarPhoto.objects.filter(car_id__in=[car.pk for _, car, _ in wanted])
+                         .values_list("car_id", flat=True).distinct())
+        jobs = [(number, car, order, path) for number, car, photos in wanted if car.pk not in has_photos
+                for order, path in enumerate(photos)]
+        # Lecture, normalisation et envoi au stockage en parallèle ; les lignes sont écrites ensuite en un INSERT
+        stored = []
+        for (number, car, _, path), result in zip(jobs, self.pool.map(_store_photo, jobs)):
+            if isinstance(result, Exception):
+                self.stats["photo_errors"] += 1
+                self._error(number, car.external_id, f"Photo {os.path.basename(path)} : {result}")
+            else:
+                stored.append(result)
+        if not stored:
+            return
+
+        covers = {}
+        for photo in stored:
+            # Couverture : la première photo enregistrée de chaque voiture
+            if photo.car.pk not in covers:
+                photo.is_cover = True
+                covers[photo.car.pk] = photo
+        CarPhoto.objects.bulk_create(stored)
+        covered = []
+        for photo in covers.values():
+            car = photo.car
+            car.cover = photo
+            car.cover_image, car.cover_width, car.cover_height = photo.image.name, photo.width, photo.height
+            covered.append(car)
+        Car.objects.bulk_update(covered, ["cover", "cover_image", "cover_width", "cover_height"])
+        bump_tags(*{tag for car in covered for tag in car_tags(car)})
+        self.stats["photos"] += len(stored)
+        if self.renditions:
+            # Recopiées sur la voiture pour la couverture (generate_for_photo)
+            list(self.pool.map(_render_photo, stored))
+
+
+def _store_photo(job):
+    _, car, order, path = job
+    try:
+        photo = CarPhoto(car=car, order=order)
+        with open(path, "rb") as fh:
+            result = normalize_image(fh, path, settings.CAR_PHOTO_MAX_SIDE)
+            if result is None:
+                # Déjà conforme : envoyé tel quel
+                fh.seek(0)
+                with Image.open(fh) as im:
+                    size = im.size
+                fh.seek(0)
+                file = File(fh, name=os.path.basename(path))
+            else:
+                file, size = result
+            photo.width, photo.height = size
+            with file:
+                photo.image.save(file.name, file, save=False)
+        return photo
+    except Exception as e:
+        return e
+
+
+def _render_photo(photo):
+    try:
+        generate_for_photo(photo)
+    except Exception:
+        logger.exception("Déclinaisons impossibles pour la photo %s", photo.pk)
+    finally:
+        # Connexion propre au thread du pool
+        connections.close_all()
@@ -0,0 +1,175 @@
+# cars/cache_tags.py
+"""
+Invalidation du cache par étiquettes (tags).
+
+Chaque entrée mise en cache déclare les étiquettes dont elle dépend, par ex.
+["car:<id>", "region:Dakar", "brand:3"]. Chaque étiquette a une version
+stockée dans le cache ; la clé de l'entrée inclut ces versions. Quand un objet
+change, les signaux ci-dessous changent la version de ses étiquettes : toutes
+les entrées qui en dépendent deviennent introuvables (elles expirent seules).
+
+Une version est un couple (jeton aléatoire, date du changement en ms). Le jeton
+seul la rend unique, même pour deux changements dans la même milliseconde ou
+entre processus aux horloges décalées ; la date ne sert qu'au Last-Modified
+des pages (cars/conditional.py).
+
+    cars = tagged_get_or_set("home:latest", ["cars"], lambda: list(qs[:12]))
+
+Étiquettes utilisées :
+- cars            toute liste d'annonces (accueil, recherche, listes) ;
+- car:<id>        une annonce (page détail, photos, favoris) ;
+- region:<nom>, city:<id>, body:<type>, brand:<id>, place:<id>
+                  listes filtrées sur ces valeurs (ancienne et nouvelle valeur) ;
+- landing:<slug>, landings
+                  une landing page / la navigation des landing pages.
+"""
+import hashlib
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
+
+from .models import Car, CarFeature, CarPhoto, Favorite, Place, Brand
+
+# Versions (jeton, date) ; les anciennes versions entières, sous "tag:", sont ignorées
+TAG_PREFIX = "tagv:"
+DEFAULT_TIMEOUT = 60 * 15
+
+
+def _new_version():
+    # Jeton aléatoire : une version évincée du cache ne peut pas ressusciter d'anciennes entrées
+    return uuid.uuid4().hex, int(time.time() * 1000)
+
+
+def tag_versions(tags):
+    """{étiquette: version}, en créant les versions manquantes (un get_many + un set_many au pire)."""
+    keys = {f"{TAG_PREFIX}{tag}": tag for tag in tags}
+    found = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def tagged_key(name, tags):
+    versions = sorted(tag_versions(tags).items())
+    digest = hashlib.md5(repr(versions).encode()).hexdigest()
+    return f"tagged:{name}:{digest}"
+
+
+def tagged_get(name, tags, default=None):
+    return cache.get(tagged_key(name, tags), default)
+
+
+def tagged_set(name, tags, value, timeout=DEFAULT_TIMEOUT):
+    cache.set(tagged_key(name, tags), value, timeout)
+
+
+def tagged_get_or_set(name, tags, default, timeout=DEFAULT_TIMEOUT):
+    """Comme cache.get_or_set, mais l'entrée disparaît dès qu'une de ses étiquettes change."""
+    key = tagged_key(name, tags)
+    value = cache.get(key)
+    if value is None:
+        value = default() if callable(default) else default
+        cache.set(key, value, timeout)
+    return value
+
+
+def bump_tags(*tags):
+    """Invalide toutes les entrées portant une de ces étiquettes (après commit)."""
+    keys = [f"{TAG_PREFIX}{tag}" for tag in tags if tag]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many({key: _new_version() for key in keys}, None))
+
+
+# ---------- Étiquettes par modèle ----------
+def car_tags(car):
+    tags = ["cars", f"car:{car.pk}", f"brand:{car.brand_id}", f"place:{car.place_id}", f"body:{car.body_type}"]
+    if Car.place.is_cached(car):
+        place = {"region": car.place.region, "city_id": car.place.city_id}
+    else:
+        place = Place.objects.filter(pk=car.place_id).values("region", "city_id").first()
+    if place:
+        tags += [f"region:{place['region']}", f"city:{place['city_id']}"]
+    return tags
+
+
+def car_pre_save_receiver(sender, instance, raw=False, **kwargs):
+    # Valeurs avant modification : la voiture quitte aussi les listes de son ancienne région / marque
+    instance._cache_tags_before = None
+    if not raw and not instance._state.adding:
+        old = Car.objects.filter(pk=instance.pk).values("brand_id", "place_id", "body_type").first()
+        if old and (old["brand_id"], old["place_id"], old["body_type"]) != (
+                instance.brand_id, instance.place_id, instance.body_type):
+            instance._cache_tags_before = car_tags(Car(pk=instance.pk, **old))
+
+
+def car_post_save_receiver(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_tags(*car_tags(instance), *(getattr(instance, "_cache_tags_before", None) or ()))
+
+
+def car_post_delete_receiver(sender, instance, **kwargs):
+    bump_tags(*car_tags(instance))
+
+
+def car_features_changed_receiver(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith("post_"):
+        cars = (pk_set or ()) if reverse else (instance.pk,)
+        bump_tags("cars", *(f"car:{pk}" for pk in cars))
+
+
+def bump_car(car_id):
+    """Invalide l'annonce et toutes les listes où elle figure (une requête)."""
+    car = Car.objects.select_related("place").only(
+        "pk", "brand_id", "body_type", "place__region", "place__city_id").filter(pk=car_id).first()
+    bump_tags(*car_tags(car)) if car else bump_tags("cars", f"car:{car_id}")
+
+
+def carphoto_changed_receiver(sender, instance, **kwargs):
+    # La couverture apparaît sur les cartes : toutes les listes où figure la voiture
+    bump_car(instance.car_id)
+
+
+def favorite_changed_receiver(sender, instance, **kwargs):
+    bump_tags(f"car:{instance.car_id}", f"favorites:{instance.user_id}")
+
+
+def place_pre_save_receiver(sender, instance, raw=False, **kwargs):
+    instance._cache_old_region = None
+    if not raw and not instance._state.adding:
+        instance._cache_old_region = Place.objects.filter(pk=instance.pk).values_list("region", flat=True).first()
+
+
+def place_changed_receiver(sender, instance, **kwargs):
+    bump_tags("cars", f"place:{instance.pk}", f"city:{instance.city_id}", f"region:{instance.region}",
+              f"region:{getattr(instance, '_cache_old_region', None) or instance.region}")
+
+
+def brand_changed_receiver(sender, instance, **kwargs):
+    bump_tags("cars", f"brand:{instance.pk}")
+
+
+def carfeature_changed_receiver(sender, instance, **kwargs):
+    # Libellés des options dans les facettes
+    bump_tags("cars")
+
+
+pre_save.connect(car_pre_save_receiver, sender=Car)
+post_save.connect(car_post_save_receiver, sender=Car)
+post_delete.connect(car_post_delete_receiver, sender=Car)
+m2m_changed.connect(car_features_changed_receiver, sender=Car.features.through)
+post_save.connect(carphoto_changed_receiver, sender=CarPhoto)
+post_delete.connect(carphoto_changed_receiver, sender=CarPhoto)
+post_save.connect(favorite_changed_receiver, sender=Favorite)
+post_delete.connect(favorite_changed_receiver, sender=Favorite)
+pre_save.connect(place_pre_save_receiver, sender=Place)
+post_save.connect(place_changed_receiver, sender=Place)
+post_delete.connect(place_changed_receiver, sender=Place)
+post_save.connect(brand_changed_receiver, sender=Brand)
+post_delete.connect(brand_changed_receiver, sender=Brand)
+post_save.connect(carfeature_changed_receiver, sender=CarFeature)
+post_delete.connect(carfeature_changed_receiver, sender=CarFeature)
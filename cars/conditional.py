@@ -0,0 +1,67 @@
+# cars/conditional.py
+"""
+GET conditionnels (ETag / Last-Modified → 304) pour les pages publiques.
+
+Les validateurs sont calculés sans rendre la page : horodatages des modèles
+(Car.updated_at, LandingPage.updated_at…) et versions des étiquettes de cache
+(cars.cache_tags), qui changent avec les photos, les favoris ou les annonces
+d'une liste ; Last-Modified reprend la date portée par chaque version.
+L'utilisateur connecté fait partie de l'ETag (en-tête, favoris) ; sa page est
+servie en Cache-Control private, celle d'un visiteur anonyme en public,
+toujours à revalider.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .cache_tags import tag_versions
+
+
+def version_datetime(version):
+    _, bumped_at = version
+    return datetime.fromtimestamp(bumped_at / 1000, tz=dt_timezone.utc)
+
+
+def page_validators(request, parts, timestamps=(), tags=()):
+    """(etag, last_modified) à partir d'identifiants, d'horodatages et d'étiquettes de cache."""
+    user = request.user
+    if user.is_authenticated:
+        tags = [*tags, f"favorites:{user.pk}"]
+    versions = tag_versions(tags) if tags else {}
+    stamps = [t for t in timestamps if t is not None] + [version_datetime(v) for v in versions.values()]
+    raw = repr((parts, user.pk, sorted(versions.items()), [t.isoformat() for t in stamps]))
+    return hashlib.md5(raw.encode()).hexdigest(), max(stamps) if stamps else None
+
+
+def conditional_page(compute):
+    """
+    Décorateur de vue : `compute(request, *args, **kwargs)` renvoie (etag, last_modified)
+    ou None (objet introuvable : la vue répondra elle-même, en 404 par exemple).
+    """
+    def validators(request, *args, **kwargs):
+        if not hasattr(request, "_page_validators"):
+            # Messages en attente : la page les affiche, on ne répond pas 304
+            pending = len(get_messages(request)) > 0
+            request._page_validators = None if pending else compute(request, *args, **kwargs)
+        return request._page_validators or (None, None)
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, *a, **kw: validators(request, *a, **kw)[0],
+            last_modified_func=lambda request, *a, **kw: validators(request, *a, **kw)[1],
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ("GET", "HEAD") and response.status_code in (200, 304):
+                visibility = {"private": True} if request.user.is_authenticated else {"public": True}
+                patch_cache_control(response, max_age=0, must_revalidate=True, **visibility)
+                patch_vary_headers(response, ("Cookie",))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,100 @@
+# cars/direct_uploads.py
+"""
+Upload des photos directement du navigateur vers le stockage (POST présigné).
+
+1. Le formulaire demande une politique à `car_upload_sign` (type et taille du
+   fichier) : clé réservée à l'utilisateur, type MIME imposé, taille bornée,
+   validité courte.
+2. Le navigateur envoie le fichier au stockage (S3, ou un S3 local type MinIO via
+   AWS_S3_ENDPOINT_URL), sans passer par un worker Django.
+3. Le formulaire ne soumet plus que la clé ; `verify_upload_key` vérifie qu'elle
+   appartient à l'utilisateur, que l'objet existe et respecte la taille, avant la
+   création de la CarPhoto (dimensions et déclinaisons : cars.renditions).
+
+Le bucket doit autoriser le POST depuis le site (CORS). Avec le stockage fichier
+du développement, `car_upload_local` joue le rôle du bucket avec une politique
+signée par Django : même protocole côté navigateur.
+"""
+import re
+import uuid
+
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+from .models import CarPhoto
+
+MAX_UPLOAD_SIZE = 8 * 1024 * 1024           # 8 Mo, comme annoncé sur le formulaire
+UPLOAD_EXPIRES = 60 * 10                    # validité d'une politique (secondes)
+CONTENT_TYPES = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp"}
+UPLOAD_PREFIX = "cars/uploads"
+LOCAL_SALT = "cars.direct_uploads.local"
+
+_KEY_RE = re.compile(r"^%s/(?P<user>[0-9a-f-]{36})/\d{4}/\d{2}/[0-9a-f]{32}\.(jpg|png|webp)$" % UPLOAD_PREFIX)
+
+
+class UploadError(Exception):
+    pass
+
+
+def new_upload_key(user, content_type):
+    """Clé du futur objet, dans l'espace de l'utilisateur (même forme que car_photo_upload_to)."""
+    return f"{UPLOAD_PREFIX}/{user.pk}/{timezone.now():%Y/%m}/{uuid.uuid4().hex}{CONTENT_TYPES[content_type]}"
+
+
+def presigned_post(user, content_type, size):
+    """{"url", "fields", "key"} : formulaire POST que le navigateur envoie au stockage."""
+    if content_type not in CONTENT_TYPES:
+        raise UploadError("Format non pris en charge (jpg, png ou webp).")
+    if not 0 < size <= MAX_UPLOAD_SIZE:
+        raise UploadError("Photo trop volumineuse (8 Mo maximum).")
+    key = new_upload_key(user, content_type)
+
+    if isinstance(default_storage, S3Boto3Storage):
+        storage = default_storage
+        post = storage.connection.meta.client.generate_presigned_post(
+            Bucket=storage.bucket_name,
+            Key=storage._normalize_name(clean_name(key)),
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, MAX_UPLOAD_SIZE]],
+            ExpiresIn=UPLOAD_EXPIRES,
+        )
+        return {"url": post["url"], "fields": post["fields"], "key": key}
+
+    # Stockage fichier (développement) : politique signée par Django
+    policy = signing.dumps({"key": key, "content_type": content_type}, salt=LOCAL_SALT)
+    return {"url": reverse("car_upload_local"), "fields": {"key": key, "policy": policy}, "key": key}
+
+
+def save_local_upload(policy, key, upload):
+    """Équivalent du bucket pour le stockage fichier : vérifie la politique puis enregistre."""
+    if isinstance(default_storage, S3Boto3Storage):
+        raise UploadError("Envoyez la photo au stockage.")
+    try:
+        data = signing.loads(policy, salt=LOCAL_SALT, max_age=UPLOAD_EXPIRES)
+    except signing.BadSignature:
+        raise UploadError("Politique d'upload invalide ou expirée.")
+    if data["key"] != key or upload.content_type != data["content_type"]:
+        raise UploadError("Fichier non conforme à la politique.")
+    if not 0 < upload.size <= MAX_UPLOAD_SIZE:
+        raise UploadError("Photo trop volumineuse (8 Mo maximum).")
+    if default_storage.exists(key):
+        raise UploadError("Clé déjà utilisée.")
+    return default_storage.save(key, upload)
+
+
+def verify_upload_key(user, key):
+    """Vérifie une clé soumise par le formulaire ; renvoie la clé ou lève UploadError."""
+    match = _KEY_RE.match(key or "")
+    if not match or match["user"] != str(getattr(user, "pk", "")):
+        raise UploadError("Photo inconnue.")
+    if not default_storage.exists(key):
+        raise UploadError("Photo introuvable : l'envoi n'est pas terminé.")
+    if not 0 < default_storage.size(key) <= MAX_UPLOAD_SIZE:
+        raise UploadError("Photo trop volumineuse (8 Mo maximum).")
+    if CarPhoto.objects.filter(image=key).exists():
+        raise UploadError("Photo déjà utilisée.")
+    return key
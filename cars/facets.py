@@ -0,0 +1,203 @@
+# cars/facets.py
+"""
+Recherche à facettes sur les annonces.
+
+`faceted_search` applique les filtres de CarSearchForm et renvoie, pour chaque
+facette, le nombre d'annonces correspondant à chaque option. Chaque facette est
+comptée avec les filtres des *autres* facettes (on voit combien de résultats
+donnerait un changement d'option), en une requête GROUP BY par facette.
+Les compteurs sont mis en cache sous l'étiquette "cars" (cars.cache_tags) :
+ils sont invalidés dès qu'une voiture, un lieu ou une option change.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Case, CharField, Count, Q, Value, When
+
+from .cache_tags import tagged_key
+from .choices_types import BodyType, SenegalRegion, FuelType, Transmission, CarSeat, CarYear
+from .models import CarFeature
+
+FACETS_CACHE_TIMEOUT = 60 * 10
+
+# (clé, libellé, borne basse incluse, borne haute exclue)
+PRICE_BUCKETS = [
+    ("lt25000", "Moins de 25 000 F", None, 25000),
+    ("25000-50000", "25 000 F à 50 000 F", 25000, 50000),
+    ("50000-75000", "50 000 F à 75 000 F", 50000, 75000),
+    ("gte75000", "75 000 F et plus", 75000, None),
+]
+MILEAGE_BUCKETS = [
+    ("lt50000", "Moins de 50 000 km", None, 50000),
+    ("50000-100000", "50 000 à 100 000 km", 50000, 100000),
+    ("100000-200000", "100 000 à 200 000 km", 100000, 200000),
+    ("gte200000", "200 000 km et plus", 200000, None),
+]
+
+
+class ChoiceFacet:
+    """Facette à valeur unique sur une colonne à faible cardinalité."""
+    multiple = False
+
+    def __init__(self, name, label, field, choices):
+        self.name = name
+        self.label = label
+        self.field = field
+        self.choices = choices
+
+    def filter(self, qs, value):
+        return qs.filter(**{self.field: value})
+
+    def counts(self, qs):
+        rows = (qs.order_by()
+                .values(self.field)
+                .annotate(n=Count("pk", distinct=True)))
+        by_value = {str(r[self.field]): r["n"] for r in rows}
+        return [(str(value), str(label), by_value.get(str(value), 0)) for value, label in self.choices]
+
+
+class BucketFacet(ChoiceFacet):
+    """Facette par tranches sur une colonne numérique (prix, kilométrage)."""
+
+    def __init__(self, name, label, field, buckets):
+        super().__init__(name, label, field, [(key, label) for key, label, _, _ in buckets])
+        self.buckets = buckets
+
+    def _range(self, low, high):
+        q = Q()
+        if low is not None:
+            q &= Q(**{f"{self.field}__gte": low})
+        if high is not None:
+            q &= Q(**{f"{self.field}__lt": high})
+        return q
+
+    def filter(self, qs, value):
+        for key, _, low, high in self.buckets:
+            if key == value:
+                return qs.filter(self._range(low, high))
+        return qs
+
+    def bucket_for(self, number):
+        """Clé de la tranche contenant `number` (utilisé par l'index bitmap)."""
+        for key, _, low, high in self.buckets:
+            if (low is None or number >= low) and (high is None or number < high):
+                return key
+        return None
+
+    def counts(self, qs):
+        bucket = Case(
+            *[When(self._range(low, high), then=Value(key)) for key, _, low, high in self.buckets],
+            output_field=CharField(),
+        )
+        rows = (qs.order_by()
+                .annotate(_bucket=bucket)
+                .values("_bucket")
+                .annotate(n=Count("pk", distinct=True)))
+        by_key = {r["_bucket"]: r["n"] for r in rows}
+        return [(key, label, by_key.get(key, 0)) for key, label in self.choices]
+
+
+class FeatureFacet:
+    """Facette multiple sur les caractéristiques : une annonce doit toutes les avoir."""
+    multiple = True
+
+    def __init__(self, name, label):
+        self.name = name
+        self.label = label
+
+    def filter(self, qs, slugs):
+        for slug in slugs:
+            qs = qs.filter(features__slug=slug)
+        return qs
+
+    def counts(self, qs):
+        rows = (CarFeature.objects
+                .annotate(n=Count("cars", distinct=True,
+                                  filter=Q(cars__in=qs.order_by().values("pk"))))
+                .values_list("slug", "name", "n")
+                .order_by("name"))
+        return list(rows)
+
+
+FACETS = [
+    ChoiceFacet("body_type", "Catégorie", "body_type", BodyType.choices),
+    ChoiceFacet("region", "Région", "place__region", SenegalRegion.choices),
+    ChoiceFacet("fuel_type", "Carburant", "fuel_type", FuelType.choices),
+    ChoiceFacet("transmission", "Boîte", "transmission", Transmission.choices),
+    ChoiceFacet("seats", "Places", "seats", CarSeat.choices),
+    ChoiceFacet("year", "Année", "year", CarYear.choices),
+    BucketFacet("price", "Prix / jour", "daily_price", PRICE_BUCKETS),
+    BucketFacet("mileage", "Kilométrage", "mileage_km", MILEAGE_BUCKETS),
+    FeatureFacet("features", "Options"),
+]
+
+
+def active_filters(params):
+    """Normalise les valeurs du formulaire : {nom de facette: str | tuple de slugs}."""
+    active = {}
+    for facet in FACETS:
+        value = (params or {}).get(facet.name)
+        if facet.multiple:
+            slugs = tuple(sorted(getattr(v, "slug", v) for v in (value or [])))
+            if slugs:
+                active[facet.name] = slugs
+        elif value not in (None, ""):
+            active[facet.name] = str(value)
+    return active
+
+
+def _apply(qs, active, skip=None):
+    for facet in FACETS:
+        if facet.name in active and facet.name != skip:
+            qs = facet.filter(qs, active[facet.name])
+    return qs
+
+
+def _cache_key(base_qs, active):
+    try:
+        sql, sql_params = base_qs.query.sql_with_params()
+    except EmptyResultSet:
+        return None
+    raw = repr((sql, sql_params, sorted(active.items())))
+    return tagged_key(f"facets:{hashlib.md5(raw.encode()).hexdigest()}", ["cars"])
+
+
+def faceted_search(base_qs, params=None):
+    """
+    Filtre `base_qs` selon `params` (cleaned_data de CarSearchForm).
+
+    Renvoie (qs, facets, total) : `qs` reste paresseux, `facets` est une liste de
+    dicts {name, label, multiple, options: [{value, label, count, selected}]}.
+    """
+    active = active_filters(params)
+    qs = _apply(base_qs, active)
+
+    key = _cache_key(base_qs, active)
+    data = cache.get(key) if key else None
+    if data is None:
+        counts = {}
+        for facet in FACETS:
+            # Facette multiple (ET) : on compte avec sa propre sélection ;
+            # facette simple : on l'ignore pour proposer les alternatives.
+            scope = qs if facet.multiple else _apply(base_qs, active, skip=facet.name)
+            counts[facet.name] = facet.counts(scope)
+        data = {"total": qs.order_by().count(), "counts": counts}
+        if key:
+            cache.set(key, data, FACETS_CACHE_TIMEOUT)
+
+    return qs, build_facets(active, data["counts"]), data["total"]
+
+
+def build_facets(active, counts):
+    """Met en forme les compteurs {facette: [(valeur, libellé, nombre)]} pour les templates."""
+    facets = []
+    for facet in FACETS:
+        selected = active.get(facet.name)
+        options = []
+        for value, label, count in counts[facet.name]:
+            is_selected = value in selected if facet.multiple and selected else value == selected
+            options.append({"value": value, "label": label, "count": count, "selected": is_selected})
+        facets.append({"name": facet.name, "label": facet.label, "multiple": facet.multiple, "options": options})
+    return facets
+
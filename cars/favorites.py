@@ -0,0 +1,67 @@
+# cars/favorites.py
+"""
+Ensemble des favoris de chaque utilisateur, en cache.
+
+Les listes marquent `car.is_favorite` en Python (`mark_favorites`) au lieu
+d'une sous-requête EXISTS par carte. L'ensemble est chargé une fois (une
+requête), puis invalidé par les signaux de Favorite : création (favorite_toggle,
+admin…) et suppression (toggle, suppression de la voiture ou du compte en
+cascade). L'invalidation se fait après commit ; la lecture suivante recharge
+l'ensemble. Pas de lecture-modification-écriture : deux requêtes concurrentes
+ne peuvent pas perdre une mise à jour.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from .models import Favorite
+
+FAVORITES_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _cache_key(user_id):
+    return f"cars:favorites:{user_id}"
+
+
+def favorite_ids(user):
+    """frozenset des pk (str) des voitures en favori ; mémorisé sur `user` pour la requête."""
+    if not getattr(user, "is_authenticated", False):
+        return frozenset()
+    ids = getattr(user, "_favorite_ids", None)
+    if ids is None:
+        key = _cache_key(user.pk)
+        ids = cache.get(key)
+        if ids is None:
+            ids = frozenset(str(pk) for pk in Favorite.objects.filter(user=user).values_list("car_id", flat=True))
+            cache.set(key, ids, FAVORITES_CACHE_TIMEOUT)
+        user._favorite_ids = ids
+    return ids
+
+
+def mark_favorites(cars, user):
+    """Pose `is_favorite` sur chaque voiture de `cars` ; renvoie la liste."""
+    ids = favorite_ids(user)
+    cars = list(cars)
+    for car in cars:
+        car.is_favorite = str(car.pk) in ids
+    return cars
+
+
+def _invalidate(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+# ---------- Signaux ----------
+def favorite_post_save_receiver(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        user_id = instance.user_id
+        transaction.on_commit(lambda: _invalidate(user_id))
+
+
+def favorite_post_delete_receiver(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: _invalidate(user_id))
+
+
+post_save.connect(favorite_post_save_receiver, sender=Favorite)
+post_delete.connect(favorite_post_delete_receiver, sender=Favorite)
@@ -0,0 +1,213 @@
+# cars/feeds.py
+"""
+Flux partenaires : toutes les annonces actives en JSON Lines, CSV ou XML.
+
+Les voitures sont lues par blocs (`.iterator(chunk_size=…)`, curseur côté
+serveur sous PostgreSQL) dans l'ordre (updated_at, id), les caractéristiques
+d'un bloc en une requête ; chaque bloc est sérialisé puis compressé (gzip) au
+fil de l'eau. La mémoire ne dépend pas du nombre d'annonces.
+
+Synchronisation incrémentale : `updated_since` ne renvoie que les annonces
+modifiées depuis, y compris celles désactivées ("active": false) pour que le
+partenaire les retire. Le curseur à utiliser la fois suivante (en-tête
+X-Feed-Cursor de la vue, sortie de la commande export_cars_feed) est l'heure
+de début de l'export moins une marge : une annonce peut revenir deux fois,
+jamais être manquée. Les annonces supprimées n'apparaissent pas dans le delta.
+"""
+import csv
+import json
+import re
+import zlib
+from datetime import timedelta
+from urllib.parse import urljoin
+from xml.sax.saxutils import escape, quoteattr
+
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Car, CarFeature
+
+CHUNK_SIZE = 2000
+BLOCK_SIZE = 64 * 1024          # texte accumulé avant compression / envoi
+CURSOR_MARGIN = timedelta(minutes=5)
+CURRENCY = "XOF"
+
+FORMATS = {
+    "jsonl": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "xml": "application/xml; charset=utf-8",
+}
+EXTENSIONS = {"jsonl": "jsonl", "csv": "csv", "xml": "xml"}
+FIELDS = (
+    "id", "url", "title", "description", "brand", "model", "year", "body_type", "transmission",
+    "fuel_type", "seats", "doors", "mileage_km", "color", "city", "region", "latitude", "longitude",
+    "price", "currency", "features", "image", "active", "created_at", "updated_at",
+)
+COLUMNS = (
+    "pk", "slug", "title", "description", "brand__name", "model_name__name", "year", "body_type",
+    "transmission", "fuel_type", "seats", "doors", "mileage_km", "color", "place__city__name",
+    "place__region", "place__latitude", "place__longitude", "daily_price", "cover_image",
+    "cover_renditions", "is_active", "created_at", "updated_at",
+)
+# Caractères interdits en XML 1.0
+_XML_INVALID = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class FeedError(ValueError):
+    pass
+
+
+def parse_since(value):
+    """Curseur `updated_since` (ISO 8601) ; heure locale si aucun fuseau n'est précisé."""
+    if not value:
+        return None
+    # "+" d'un fuseau non encodé dans l'URL : reçu comme une espace
+    value = re.sub(r" (\d{2}:?\d{2})$", r"+\1", value.strip())
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        since = None
+    if since is None:
+        raise FeedError("updated_since : date ISO 8601 attendue (ex. 2025-01-31T12:00:00+00:00).")
+    return timezone.make_aware(since) if timezone.is_naive(since) else since
+
+
+def next_cursor():
+    """Curseur à renvoyer au partenaire, calculé avant la lecture."""
+    return timezone.now() - CURSOR_MARGIN
+
+
+def feed_queryset(since=None):
+    qs = Car.objects.all() if since else Car.objects.filter(is_active=True)
+    if since:
+        qs = qs.filter(updated_at__gte=since)
+    return qs.order_by("updated_at", "pk").values(*COLUMNS)
+
+
+def iter_listings(base_url, since=None, chunk_size=CHUNK_SIZE):
+    """Annonces du flux (dict FIELDS), bloc par bloc."""
+    features = dict(CarFeature.objects.values_list("pk", "name"))
+    through = Car.features.through
+    chunk = []
+    for row in feed_queryset(since).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _listings(chunk, base_url, features, through)
+            chunk = []
+    yield from _listings(chunk, base_url, features, through)
+
+
+def _listings(rows, base_url, features, through):
+    if not rows:
+        return
+    by_car = {}
+    for car_id, feature_id in through.objects.filter(car_id__in=[r["pk"] for r in rows]).values_list(
+            "car_id", "carfeature_id").order_by():
+        by_car.setdefault(car_id, []).append(features.get(feature_id, ""))
+    for r in rows:
+        yield {
+            "id": str(r["pk"]),
+            "url": urljoin(base_url, reverse("car_detail", kwargs={"slug": r["slug"]})),
+            "title": r["title"],
+            "description": r["description"],
+            "brand": r["brand__name"],
+            "model": r["model_name__name"] or "",
+            "year": r["year"],
+            "body_type": r["body_type"] or "",
+            "transmission": r["transmission"],
+            "fuel_type": r["fuel_type"],
+            "seats": int(r["seats"]) if r["seats"] else None,
+            "doors": int(r["doors"]) if r["doors"] else None,
+            "mileage_km": r["mileage_km"],
+            "color": r["color"],
+            "city": r["place__city__name"],
+            "region": r["place__region"],
+            "latitude": float(r["place__latitude"]) if r["place__latitude"] is not None else None,
+            "longitude": float(r["place__longitude"]) if r["place__longitude"] is not None else None,
+            "price": r["daily_price"],
+            "currency": CURRENCY,
+            "features": sorted(by_car.get(r["pk"], ())),
+            "image": _image_url(base_url, r["cover_image"], r["cover_renditions"]),
+            "active": r["is_active"],
+            "created_at": r["created_at"].isoformat(),
+            "updated_at": r["updated_at"].isoformat(),
+        }
+
+
+def _image_url(base_url, name, renditions):
+    # Déclinaison "detail" en JPEG (lue partout), sinon l'original
+    name = (renditions or {}).get("detail", {}).get("jpeg") or name
+    return urljoin(base_url, default_storage.url(name)) if name else ""
+
+
+# ---------- Sérialisation ----------
+def _jsonl(listings):
+    for listing in listings:
+        yield json.dumps(listing, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class _Line:
+    """Tampon d'une ligne pour csv.writer."""
+    def write(self, value):
+        return value
+
+
+def _csv(listings):
+    writer = csv.writer(_Line())
+    yield writer.writerow(FIELDS)
+    for listing in listings:
+        listing["features"] = "|".join(listing["features"])
+        yield writer.writerow(["" if listing[f] is None else listing[f] for f in FIELDS])
+
+
+def _xml_text(value):
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    return escape(_XML_INVALID.sub("", str(value)))
+
+
+def _xml(listings):
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<listings generated_at={quoteattr(timezone.now().isoformat())}>\n'
+    for listing in listings:
+        parts = ["<listing>"]
+        for field in FIELDS:
+            value = listing[field]
+            if field == "features":
+                parts.append("<features>" + "".join(f"<feature>{_xml_text(v)}</feature>" for v in value) + "</features>")
+            elif value is not None and value != "":
+                parts.append(f"<{field}>{_xml_text(value)}</{field}>")
+        parts.append("</listing>\n")
+        yield "".join(parts)
+    yield "</listings>\n"
+
+
+SERIALIZERS = {"jsonl": _jsonl, "csv": _csv, "xml": _xml}
+
+
+def _blocks(chunks, size=BLOCK_SIZE):
+    buffer, length = [], 0
+    for text in chunks:
+        buffer.append(text)
+        length += len(text)
+        if length >= size:
+            yield "".join(buffer).encode()
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def _gzip(blocks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_feed(fmt, base_url, since=None, compress=True, chunk_size=CHUNK_SIZE):
+    """Octets du flux, produits au fur et à mesure de la lecture."""
+    blocks = _blocks(SERIALIZERS[fmt](iter_listings(base_url, since, chunk_size)))
+    return _gzip(blocks) if compress else blocks
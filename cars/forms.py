@@ -5,6 +5,7 @@ from django import forms
 from django.forms import inlineformset_factory, BaseInlineFormSet
 from django.core.exceptions import ValidationError
 
+from .direct_uploads import UploadError, verify_upload_key
 from .models import Car, CarPhoto, Place, CarFeature
 
 MAX_PHOTOS = 6
@@ -58,6 +59,9 @@ class CarForm(forms.ModelForm):
 
 
 class CarPhotoForm(forms.ModelForm):
+    # Photo déjà envoyée par le navigateur au stockage (cars.direct_uploads) : remplace le fichier
+    upload_key = forms.CharField(required=False, widget=forms.HiddenInput())
+
     class Meta:
         model = CarPhoto
         fields = ["image", "caption", "is_cover", "order"]
@@ -68,6 +72,34 @@ class CarPhotoForm(forms.ModelForm):
             "order":   forms.HiddenInput(),
         }
 
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self.fields["image"].required = False
+
+    def clean(self):
+        cleaned = super().clean()
+        key = cleaned.get("upload_key")
+        if key:
+            try:
+                cleaned["image"] = verify_upload_key(self.user, key)
+            except UploadError as e:
+                self.add_error("image", str(e))
+        elif not cleaned.get("image") and not self.instance.pk:
+            self.add_error("image", "Ajoutez une photo.")
+        return cleaned
+
+    def save(self, commit=True):
+        photo = super().save(commit=False)
+        if self.cleaned_data.get("upload_key"):
+            # Fichier déjà sur le stockage : dimensions et déclinaisons calculées par cars.renditions
+            photo.width = photo.height = None
+            photo.renditions = {}
+            photo._image_changed = True
+        if commit:
+            photo.save()
+        return photo
+
 
 class BaseCarPhotoFormSet(BaseInlineFormSet):
     def clean(self):
@@ -0,0 +1,72 @@
+# cars/geo.py
+"""
+Recherche de proximité (« voitures autour de moi ») sur Place.latitude/longitude.
+
+1. Préfiltre par boîte englobante (BETWEEN sur les colonnes indexées) : seules
+   les annonces dans le carré autour du point sont examinées.
+2. Distance exacte (haversine) calculée en SQL sur ce sous-ensemble, puis
+   filtre sur le rayon et tri par distance.
+"""
+import math
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 500
+RADIUS_CHOICES = [(5, "5 km"), (10, "10 km"), (25, "25 km"), (50, "50 km"), (100, "100 km")]
+
+
+def bounding_box(lat, lng, radius_km):
+    """(lat_min, lat_max, lng_min, lng_max) du carré contenant le cercle de rayon `radius_km`."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    # Près des pôles la boîte couvrirait toutes les longitudes
+    cos_lat = math.cos(math.radians(lat))
+    dlng = 180.0 if cos_lat < 1e-6 else min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return max(lat - dlat, -90.0), min(lat + dlat, 90.0), max(lng - dlng, -180.0), min(lng + dlng, 180.0)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_expression(lat, lng, prefix="place__"):
+    """Expression SQL de la distance haversine (km) entre le point et le lieu de l'annonce."""
+    lat_rad = math.radians(lat)
+    lng_rad = math.radians(lng)
+    row_lat = Radians(Cast(F(f"{prefix}latitude"), FloatField()))
+    row_lng = Radians(Cast(F(f"{prefix}longitude"), FloatField()))
+    a = (Power(Sin((row_lat - Value(lat_rad)) / 2), 2)
+         + Value(math.cos(lat_rad)) * Cos(row_lat) * Power(Sin((row_lng - Value(lng_rad)) / 2), 2))
+    # Least() : les arrondis flottants peuvent dépasser 1 pour des points antipodaux
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Least(Sqrt(a), Value(1.0)), output_field=FloatField())
+
+
+def nearby(qs, lat, lng, radius_km=DEFAULT_RADIUS_KM, prefix="place__"):
+    """Annonces de `qs` à moins de `radius_km` du point, annotées `distance` et triées par distance."""
+    lat_min, lat_max, lng_min, lng_max = bounding_box(lat, lng, radius_km)
+    return (qs
+            .filter(**{f"{prefix}latitude__range": (lat_min, lat_max),
+                       f"{prefix}longitude__range": (lng_min, lng_max)})
+            .annotate(distance=distance_expression(lat, lng, prefix))
+            .filter(distance__lte=radius_km)
+            .order_by("distance", "-created_at", "-id"))
+
+
+def point_from_params(params):
+    """(lat, lng, rayon) lus dans `params` (GET ou cleaned_data), ou None si absents / invalides."""
+    try:
+        lat = float(params.get("lat"))
+        lng = float(params.get("lng"))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    try:
+        radius = float(params.get("radius") or DEFAULT_RADIUS_KM)
+    except (TypeError, ValueError):
+        radius = DEFAULT_RADIUS_KM
+    return lat, lng, min(max(radius, 1), MAX_RADIUS_KM)
@@ -0,0 +1,127 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from accounts.models import Profile
+from cars.models import Car, CarPhoto
+from utils.storages import DELETE_BATCH_SIZE, delete_objects, iter_objects
+
+# Fichiers comparés d'un coup (une requête par lot) : au plus 500 voitures ou 5000 clés
+CAR_BATCH_SIZE = 500
+KEY_BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime du stockage les fichiers qui ne sont plus référencés : photos de voitures "
+        "(originaux et déclinaisons) sous cars/, photos de profil sous profile/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Liste les orphelins sans rien supprimer.")
+        parser.add_argument("--min-age-hours", type=float, default=24,
+                            help="Ignore les fichiers plus récents (uploads en cours). Défaut : 24.")
+        parser.add_argument("--skip-profiles", action="store_true", help="Ne traite que cars/.")
+
+    def handle(self, *args, **o):
+        self.dry_run, self.verbosity = o["dry_run"], o["verbosity"]
+        self.cutoff = timezone.now() - timedelta(hours=o["min_age_hours"])
+        self.stats = dict(listed=0, listed_bytes=0, orphans=0, orphan_bytes=0, deleted=0, errors=0)
+        self.pending = []
+        started = time.monotonic()
+
+        self.collect_cars()
+        if not o["skip_profiles"]:
+            self.collect_profiles()
+        self.flush_deletes(force=True)
+
+        s, elapsed = self.stats, time.monotonic() - started
+        rate = s["listed"] / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{s['listed']} fichier(s) parcouru(s) ({s['listed_bytes'] / 1e6:.1f} Mo) en {elapsed:.1f} s "
+            f"({rate:.0f} clés/s) ; {s['orphans']} orphelin(s) ({s['orphan_bytes'] / 1e6:.1f} Mo)."
+        )
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING("Dry-run : aucun fichier supprimé."))
+        else:
+            style = self.style.ERROR if s["errors"] else self.style.SUCCESS
+            self.stdout.write(style(f"{s['deleted']} fichier(s) supprimé(s), {s['errors']} erreur(s)."))
+
+    # ---------- Photos de voitures : cars/<car_id>/photos/…, cars/uploads/… ----------
+    def collect_cars(self):
+        # Les clés d'une même voiture se suivent dans la liste : on compare par lots de voitures
+        batch, groups = [], set()
+        for obj in iter_objects(default_storage, "cars/"):
+            group = obj.name.split("/", 2)[1]
+            if len(batch) >= KEY_BATCH_SIZE or (group not in groups and len(groups) >= CAR_BATCH_SIZE):
+                self.check_car_batch(batch, groups)
+                batch, groups = [], set()
+            batch.append(obj)
+            groups.add(group)
+        self.check_car_batch(batch, groups)
+
+    def check_car_batch(self, batch, groups):
+        if not batch:
+            return
+        car_ids = [g for g in groups if _is_uuid(g)]
+        others = [obj.name for obj in batch if not _is_uuid(obj.name.split("/", 2)[1])]
+        referenced = set()
+        photos = CarPhoto.objects.filter(Q(car_id__in=car_ids) | Q(image__in=others)).values_list("image", "renditions")
+        for image, renditions in photos.order_by():
+            referenced.add(image)
+            for entry in (renditions or {}).values():
+                referenced.update(entry.get(fmt) for fmt in ("webp", "jpeg"))
+        referenced.update(Car.objects.filter(pk__in=car_ids).exclude(cover_image="")
+                          .values_list("cover_image", flat=True).order_by())
+        for obj in batch:
+            self.check(obj, obj.name in referenced)
+
+    # ---------- Photos de profil : fusion de deux listes triées ----------
+    def collect_profiles(self):
+        # Même ordre que le stockage (octets UTF-8) : collation "C" sous PostgreSQL, BINARY sous SQLite
+        order = Collate("image", "C") if connection.vendor == "postgresql" else "image"
+        refs = (Profile.objects.filter(image__startswith="profile/")
+                .order_by(order).values_list("image", flat=True).iterator(chunk_size=2000))
+        ref = next(refs, None)
+        for obj in iter_objects(default_storage, "profile/"):
+            while ref is not None and ref < obj.name:
+                ref = next(refs, None)
+            self.check(obj, ref == obj.name)
+
+    # ---------- Suppression par lots ----------
+    def check(self, obj, referenced):
+        self.stats["listed"] += 1
+        self.stats["listed_bytes"] += obj.size
+        if referenced or obj.modified > self.cutoff:
+            return
+        self.stats["orphans"] += 1
+        self.stats["orphan_bytes"] += obj.size
+        if self.verbosity > 1:
+            self.stdout.write(f"Orphelin : {obj.name} ({obj.size} o)")
+        if not self.dry_run:
+            self.pending.append(obj.name)
+            self.flush_deletes()
+
+    def flush_deletes(self, force=False):
+        while self.pending and (force or len(self.pending) >= DELETE_BATCH_SIZE):
+            batch, self.pending = self.pending[:DELETE_BATCH_SIZE], self.pending[DELETE_BATCH_SIZE:]
+            errors = delete_objects(default_storage, batch)
+            for name, message in errors:
+                self.stderr.write(f"Échec de suppression : {name} ({message})")
+            self.stats["deleted"] += len(batch) - len(errors)
+            self.stats["errors"] += len(errors)
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
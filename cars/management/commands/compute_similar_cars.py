@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cars.similar import compute_similar_cars, TOP_K, CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = ("Précalcule les voitures similaires de chaque annonce active. "
+            "Par défaut, seules les annonces nouvelles ou modifiées depuis le dernier passage sont recalculées.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recalcule toutes les annonces.")
+        parser.add_argument("-k", type=int, default=TOP_K, help=f"Nombre de voisins stockés (défaut {TOP_K}).")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                            help=f"Lignes par bloc NumPy (mémoire ≈ 8 × bloc × annonces octets, défaut {CHUNK_SIZE}).")
+
+    def handle(self, *args, **o):
+        started = time.monotonic()
+        computed, deleted = compute_similar_cars(full=o["full"], k=o["k"], chunk_size=o["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{computed} annonce(s) recalculée(s), {deleted} supprimée(s) en {time.monotonic() - started:.1f}s."
+        ))
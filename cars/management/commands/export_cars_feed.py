@@ -0,0 +1,50 @@
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from cars.feeds import CHUNK_SIZE, FORMATS, FeedError, next_cursor, parse_since, stream_feed
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporte les annonces actives pour les partenaires (JSON Lines, CSV ou XML), en flux, "
+        "compressé en gzip si le fichier se termine par .gz."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(FORMATS), default="jsonl", help="Défaut : jsonl.")
+        parser.add_argument("--output", default="-", help="Fichier de sortie ; '-' pour la sortie standard.")
+        parser.add_argument("--gzip", action="store_true", help="Compresse même sans extension .gz.")
+        parser.add_argument("--updated-since", help="Delta : annonces modifiées depuis cette date ISO 8601.")
+        parser.add_argument("--base-url", default=settings.SITE_URL,
+                            help=f"Préfixe des liens. Défaut : SITE_URL ({settings.SITE_URL}).")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"Défaut : {CHUNK_SIZE}.")
+
+    def handle(self, *args, **o):
+        try:
+            since = parse_since(o["updated_since"])
+        except FeedError as e:
+            raise CommandError(str(e))
+        output = o["output"]
+        compress = o["gzip"] or output.endswith(".gz")
+        cursor = next_cursor()
+        started = time.monotonic()
+
+        out = sys.stdout.buffer if output == "-" else open(output, "wb")
+        written = 0
+        try:
+            for data in stream_feed(o["format"], o["base_url"].rstrip("/") + "/", since,
+                                    compress=compress, chunk_size=o["chunk_size"]):
+                out.write(data)
+                written += len(data)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+            else:
+                out.flush()
+
+        # stderr : la sortie standard peut être le flux lui-même
+        self.stderr.write(f"{written / 1e6:.1f} Mo écrits en {time.monotonic() - started:.1f} s.")
+        self.stderr.write(f"Prochain delta : --updated-since {cursor.isoformat()}")
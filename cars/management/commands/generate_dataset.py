@@ -0,0 +1,69 @@
+import time
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cars.synthetic import CAR_BATCH_SIZE, DEFAULT_END, DatasetGenerator
+
+# Volumes par voiture, proportions de la production (1M voitures : 200k comptes, 5M favoris, 4M photos)
+USERS_PER_CAR = 0.2
+FAVORITES_PER_CAR = 5
+PHOTOS_PER_CAR = 4
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un jeu de données synthétique reproductible (comptes, annonces, photos factices, favoris) "
+        "pour les tests de charge. Exemple : --cars 1000000 (200k comptes, 5M favoris, 4M photos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cars", type=int, default=10000, help="Nombre d'annonces. Défaut : 10000.")
+        parser.add_argument("--users", type=int, help=f"Nombre de comptes. Défaut : {USERS_PER_CAR} par annonce.")
+        parser.add_argument("--favorites", type=int,
+                            help=f"Nombre de favoris visé. Défaut : {FAVORITES_PER_CAR} par annonce.")
+        parser.add_argument("--photos", type=int, help=f"Nombre de photos visé. Défaut : {PHOTOS_PER_CAR} par annonce.")
+        parser.add_argument("--seed", type=int, default=42, help="Graine : même graine, mêmes données. Défaut : 42.")
+        parser.add_argument("--end-date", help=f"Date des données les plus récentes (AAAA-MM-JJ). "
+                                               f"Défaut : {DEFAULT_END:%Y-%m-%d}.")
+        parser.add_argument("--batch-size", type=int, default=CAR_BATCH_SIZE,
+                            help=f"Annonces par transaction. Défaut : {CAR_BATCH_SIZE}.")
+
+    def handle(self, *args, **o):
+        cars = o["cars"]
+        users = o["users"] if o["users"] is not None else max(1, round(cars * USERS_PER_CAR))
+        favorites = o["favorites"] if o["favorites"] is not None else cars * FAVORITES_PER_CAR
+        photos = o["photos"] if o["photos"] is not None else cars * PHOTOS_PER_CAR
+        end = DEFAULT_END
+        if o["end_date"]:
+            try:
+                end = datetime.combine(datetime.strptime(o["end_date"], "%Y-%m-%d"), dt_time(23, 59),
+                                       tzinfo=dt_timezone.utc)
+            except ValueError:
+                raise CommandError("--end-date : format AAAA-MM-JJ attendu.")
+
+        self.last_report = 0
+        generator = DatasetGenerator(cars, users, favorites, photos, seed=o["seed"], end=end,
+                                     batch_size=o["batch_size"], report=self.report)
+        if generator.existing():
+            raise CommandError("Des données synthétiques existent déjà : videz la base (manage.py flush) "
+                               "avant de régénérer.")
+
+        started = time.monotonic()
+        stats = generator.run()
+        elapsed = time.monotonic() - started
+        rows = sum(stats.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['users']} comptes, {stats['cars']} annonces, {stats['features']} caractéristiques, "
+            f"{stats['photos']} photos, {stats['favorites']} favoris : {rows} lignes en {elapsed:.1f} s "
+            f"({rows / elapsed if elapsed else 0:.0f} lignes/s)."
+        ))
+        self.stdout.write("Voitures similaires : lancez compute_similar_cars --full.")
+
+    def report(self, phase, done, total, elapsed):
+        # Une ligne toutes les 5 secondes au plus, et à la fin de chaque phase
+        if done < total and elapsed - self.last_report < 5:
+            return
+        self.last_report = elapsed if done < total else 0
+        label = {"users": "comptes", "cars": "annonces"}[phase]
+        self.stdout.write(f"{label} : {done}/{total} en {elapsed:.1f} s ({done / elapsed if elapsed else 0:.0f}/s)")
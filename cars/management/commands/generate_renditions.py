@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from cars.models import CarPhoto
+from cars.renditions import generate_for_photo
+
+
+class Command(BaseCommand):
+    help = "Génère les déclinaisons WebP / JPEG des photos de voiture (par défaut : celles qui n'en ont pas)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Régénère aussi les photos déjà traitées.")
+        parser.add_argument("--car", help="Limite à une voiture (pk).")
+
+    def handle(self, *args, **o):
+        photos = CarPhoto.objects.exclude(image="").order_by("pk")
+        if not o["all"]:
+            photos = photos.filter(renditions={})
+        if o["car"]:
+            photos = photos.filter(car_id=o["car"])
+
+        done = failed = 0
+        for photo in photos.iterator(chunk_size=100):
+            try:
+                generate_for_photo(photo)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"Photo {photo.pk} ({photo.image.name}) : {exc}")
+                continue
+            done += 1
+            if o["verbosity"] > 1:
+                self.stdout.write(f"Photo {photo.pk} : {len(photo.renditions)} taille(s)")
+
+        self.stdout.write(self.style.SUCCESS(f"{done} photo(s) traitée(s), {failed} échec(s)."))
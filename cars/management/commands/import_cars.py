@@ -0,0 +1,78 @@
+import io
+import os
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from cars.bulk_import import BATCH_SIZE, PHOTO_WORKERS, CarImporter, read_rows
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe des annonces depuis un fichier CSV ou JSON Lines, par lots (bulk_create). "
+        "Relancer l'import met à jour les annonces existantes (clé : external_id)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichier .csv ou .jsonl ; '-' pour l'entrée standard.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Format (défaut : extension du fichier).")
+        parser.add_argument("--owner", help="Email du propriétaire des lignes sans colonne owner.")
+        parser.add_argument("--photos-dir", help="Dossier local des photos (colonne photos).")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=f"Lignes par lot. Défaut : {BATCH_SIZE}.")
+        parser.add_argument("--workers", type=int, default=PHOTO_WORKERS,
+                            help=f"Threads d'envoi des photos. Défaut : {PHOTO_WORKERS}.")
+        parser.add_argument("--create-missing", action="store_true",
+                            help="Crée les marques, modèles, villes, lieux et caractéristiques inconnus.")
+        parser.add_argument("--no-renditions", action="store_true",
+                            help="Ne génère pas les déclinaisons (à rattraper avec generate_renditions).")
+
+    def handle(self, *args, **o):
+        path = o["path"]
+        fmt = o["format"] or FORMATS.get(os.path.splitext(path)[1].lower())
+        if fmt is None:
+            raise CommandError("Format inconnu : précisez --format csv ou --format jsonl.")
+        if o["photos_dir"] and not os.path.isdir(o["photos_dir"]):
+            raise CommandError(f"Dossier introuvable : {o['photos_dir']}")
+        owner = None
+        if o["owner"]:
+            owner = get_user_model().objects.filter(email__iexact=o["owner"].strip()).first()
+            if owner is None:
+                raise CommandError(f"Aucun utilisateur avec l'email {o['owner']}.")
+
+        self.verbosity = o["verbosity"]
+        self.started = time.monotonic()
+        importer = CarImporter(
+            owner=owner, photos_dir=o["photos_dir"], batch_size=o["batch_size"], workers=o["workers"],
+            create_missing=o["create_missing"], renditions=not o["no_renditions"],
+            on_error=self.report_error, on_batch=self.report_progress,
+        )
+        if path == "-":
+            fh = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+        else:
+            try:
+                fh = open(path, encoding="utf-8-sig", newline="")
+            except OSError as e:
+                raise CommandError(f"Lecture impossible : {e}")
+        with fh:
+            s = importer.run(read_rows(fh, fmt))
+
+        elapsed = time.monotonic() - self.started
+        rate = s["rows"] / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{s['rows']} ligne(s) en {elapsed:.1f} s ({rate:.0f} lignes/s) : {s['created']} créée(s), "
+            f"{s['updated']} mise(s) à jour, {s['photos']} photo(s)."
+        )
+        style = self.style.ERROR if s["errors"] else self.style.SUCCESS
+        self.stdout.write(style(f"{s['errors']} erreur(s), dont {s['photo_errors']} sur des photos."))
+
+    def report_error(self, number, external_id, message):
+        self.stderr.write(f"Ligne {number}" + (f" ({external_id})" if external_id else "") + f" : {message}")
+
+    def report_progress(self, stats):
+        if self.verbosity > 1:
+            elapsed = time.monotonic() - self.started
+            self.stdout.write(f"… {stats['rows']} ligne(s), {stats['rows'] / elapsed:.0f} lignes/s")
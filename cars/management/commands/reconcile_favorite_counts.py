@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from cars.models import Car, Favorite
+
+
+class Command(BaseCommand):
+    help = "Recalcule Car.favorite_count à partir de la table des favoris et corrige les écarts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Affiche les écarts sans rien modifier.")
+
+    def handle(self, *args, **o):
+        # Nombre réel, recalculé par la base au moment de l'écriture : un favori ajouté ou retiré
+        # pendant la commande n'est pas écrasé par une valeur lue plus tôt
+        actual = Coalesce(Subquery(
+            Favorite.objects.filter(car=OuterRef("pk")).order_by()
+            .values("car").annotate(n=Count("pk")).values("n")
+        ), 0)
+        drifted = Car.objects.annotate(actual=actual).exclude(favorite_count=F("actual"))
+
+        if o["verbosity"] > 1:
+            for pk, stored, real in drifted.values_list("pk", "favorite_count", "actual").order_by().iterator():
+                self.stdout.write(f"{pk} : {stored} → {real}")
+        if o["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{drifted.count()} compteur(s) à corriger (dry-run)."))
+            return
+
+        # Un seul UPDATE … SET favorite_count = (sous-requête) sur les voitures en écart
+        fixed = Car.objects.filter(pk__in=drifted.values("pk")).update(favorite_count=actual)
+        self.stdout.write(self.style.SUCCESS(f"{fixed} compteur(s) corrigé(s)."))
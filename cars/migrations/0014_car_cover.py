@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:24
+
+import cars.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0013_alter_car_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='cover',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cars.carphoto'),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='cover_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='cover_image',
+            field=models.ImageField(blank=True, editable=False, upload_to=cars.models.car_photo_upload_to),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='cover_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='carphoto',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='carphoto',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
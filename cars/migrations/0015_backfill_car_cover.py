@@ -0,0 +1,34 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_car_cover(apps, schema_editor):
+    Car = apps.get_model("cars", "Car")
+    CarPhoto = apps.get_model("cars", "CarPhoto")
+
+    covers = (CarPhoto.objects.filter(is_cover=True)
+              .values_list("car_id", "pk", "image", "width", "height")
+              .order_by()
+              .iterator(chunk_size=BATCH_SIZE))
+
+    batch = []
+    for car_id, photo_id, image, width, height in covers:
+        batch.append(Car(pk=car_id, cover_id=photo_id, cover_image=image or "",
+                         cover_width=width, cover_height=height))
+        if len(batch) >= BATCH_SIZE:
+            Car.objects.bulk_update(batch, ["cover", "cover_image", "cover_width", "cover_height"])
+            batch = []
+    if batch:
+        Car.objects.bulk_update(batch, ["cover", "cover_image", "cover_width", "cover_height"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0014_car_cover'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_car_cover, migrations.RunPython.noop),
+    ]
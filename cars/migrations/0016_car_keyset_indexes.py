@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0015_backfill_car_cover'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='car_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['is_active', 'daily_price', 'id'], name='car_active_price_idx'),
+        ),
+    ]
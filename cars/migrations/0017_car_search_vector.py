@@ -0,0 +1,78 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:29
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations
+
+SEARCH_VECTOR_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='car_search_vector_idx')
+TITLE_TRGM_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['title'], name='car_title_trgm_idx', opclasses=['gin_trgm_ops'])
+
+CREATE_CONFIG = """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'french_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION french_unaccent ( COPY = french );
+        ALTER TEXT SEARCH CONFIGURATION french_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+    END IF;
+END
+$$;
+"""
+
+BACKFILL = """
+UPDATE cars_car c SET search_vector =
+    setweight(to_tsvector('french_unaccent', coalesce(c.title, '')), 'A')
+    || setweight(to_tsvector('french_unaccent', coalesce((SELECT name FROM cars_brand WHERE id = c.brand_id), '')), 'A')
+    || setweight(to_tsvector('french_unaccent', coalesce((SELECT name FROM cars_carmodel WHERE id = c.model_name_id), '')), 'B')
+    || setweight(to_tsvector('french_unaccent', coalesce((SELECT ci.name FROM cars_place p JOIN cars_city ci ON ci.id = p.city_id WHERE p.id = c.place_id), '')), 'C')
+    || setweight(to_tsvector('french_unaccent', coalesce(c.description, '')), 'D');
+"""
+
+
+def postgres_forwards(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Car = apps.get_model("cars", "Car")
+    schema_editor.execute(CREATE_CONFIG)
+    schema_editor.add_index(Car, SEARCH_VECTOR_INDEX)
+    schema_editor.add_index(Car, TITLE_TRGM_INDEX)
+    schema_editor.execute(BACKFILL)
+
+
+def postgres_backwards(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Car = apps.get_model("cars", "Car")
+    schema_editor.remove_index(Car, TITLE_TRGM_INDEX)
+    schema_editor.remove_index(Car, SEARCH_VECTOR_INDEX)
+    schema_editor.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS french_unaccent;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0016_car_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='car',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # Index GIN, configuration française sans accents et remplissage : PostgreSQL uniquement
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='car', index=SEARCH_VECTOR_INDEX),
+                migrations.AddIndex(model_name='car', index=TITLE_TRGM_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(postgres_forwards, postgres_backwards),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0017_car_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['latitude', 'longitude'], name='cars_place_latitud_6be761_idx'),
+        ),
+    ]
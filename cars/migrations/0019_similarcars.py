@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0018_place_lat_lng_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarCars',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similar', serialize=False, to='cars.car')),
+                ('car_ids', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Voitures similaires',
+                'verbose_name_plural': 'Voitures similaires',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:37
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_favorite_count(apps, schema_editor):
+    Car = apps.get_model("cars", "Car")
+    Favorite = apps.get_model("cars", "Favorite")
+    counts = (Favorite.objects.filter(car=OuterRef("pk"))
+              .order_by().values("car").annotate(n=Count("pk")).values("n"))
+    Car.objects.update(favorite_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0019_similarcars'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_favorite_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0020_car_favorite_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='cover_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='carphoto',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
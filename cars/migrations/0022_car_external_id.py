@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0021_photo_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='external_id',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0022_car_external_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['updated_at', 'id'], name='car_updated_idx'),
+        ),
+    ]
@@ -1,15 +1,26 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
 from django.utils.text import slugify
 from django.utils import timezone
 from django.urls import reverse
+from PIL import UnidentifiedImageError
 
+from utils.images import normalize_field_file
+from utils.storages import save_many
 from .choices_types import (
     SenegalRegion, Transmission, FuelType, BodyType, CarColor, COLOR_HEX_BY_VALUE, CarYear, CarSeat, CarDoor
 )
 
-import os, uuid
+import logging, os, uuid
+from collections import Counter
+
+logger = logging.getLogger(__name__)
 
 User = settings.AUTH_USER_MODEL
 
@@ -59,6 +70,8 @@ class Place(models.Model):
         indexes = [
             models.Index(fields=["city", "region"]),
             models.Index(fields=["country"]),
+            # Préfiltre « autour de moi » par boîte englobante (cars.geo)
+            models.Index(fields=["latitude", "longitude"]),
         ]
 
     def __str__(self):
@@ -115,6 +128,19 @@ class Car(models.Model):
     daily_price = models.PositiveIntegerField(choices=PRICE_CHOICES, default=15000)
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
+    # Photo de couverture dénormalisée : les cartes lisent ces colonnes sans requête supplémentaire
+    cover = models.ForeignKey("CarPhoto", on_delete=models.SET_NULL, related_name="+",
+                              null=True, blank=True, editable=False)
+    cover_image = models.ImageField(upload_to=car_photo_upload_to, blank=True, editable=False)
+    cover_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    cover_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    cover_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    # Recherche plein texte (cars.search), mis à jour à chaque enregistrement
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Tenu à jour par les signaux de Favorite (F() dans la même transaction) ; voir reconcile_favorite_counts
+    favorite_count = models.PositiveIntegerField(default=0, editable=False)
+    # Identifiant de l'annonce dans le flux d'origine : clé d'upsert de la commande import_cars
+    external_id = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
@@ -128,21 +154,44 @@ class Car(models.Model):
             models.Index(fields=["brand", "model_name", "year"]),
             models.Index(fields=["daily_price"]),
             models.Index(fields=["place", "daily_price"]),
+            # Pagination par curseur (cars.pagination.SORTS)
+            models.Index(fields=["is_active", "-created_at", "-id"], name="car_active_created_idx"),
+            models.Index(fields=["is_active", "daily_price", "id"], name="car_active_price_idx"),
+            # Flux partenaires incrémentaux (cars.feeds) : updated_at >= curseur
+            models.Index(fields=["updated_at", "id"], name="car_updated_idx"),
+            GinIndex(fields=["search_vector"], name="car_search_vector_idx"),
+            GinIndex(fields=["title"], name="car_title_trgm_idx", opclasses=["gin_trgm_ops"]),
         ]
 
     def __str__(self):
         return f"{self.brand} {self.year} — {self.owner}"
 
+    def new_slug(self):
+        base = slugify(f"{self.title}-{self.brand}-{self.year}")
+        base = base[:150]
+        return f"{base}-{uuid.uuid4().hex[:6]}"
+
     def save(self, *args, **kwargs):
         if not self.slug:
-            base = slugify(f"{self.title}-{self.brand}-{self.year}")
-            base = base[:150]
-            self.slug = f"{base}-{uuid.uuid4().hex[:6]}"
+            self.slug = self.new_slug()
         super().save(*args, **kwargs)
 
     @property
     def cover_photo(self):
-        return self.photos.filter(is_cover=True).first()
+        return self.cover
+
+    def set_cover(self, photo):
+        """Recopie la photo de couverture (ou None) sur la voiture, sans toucher updated_at."""
+        self.cover = photo
+        self.cover_image = photo.image.name if photo and photo.image else ""
+        self.cover_width = photo.width if photo else None
+        self.cover_height = photo.height if photo else None
+        self.cover_renditions = photo.renditions if photo else {}
+        Car.objects.filter(pk=self.pk).update(
+            cover=photo, cover_image=self.cover_image.name,
+            cover_width=self.cover_width, cover_height=self.cover_height,
+            cover_renditions=self.cover_renditions,
+        )
 
     @property
     def color_hex(self) -> str:
@@ -185,6 +234,10 @@ class CarPhoto(models.Model):
     caption = models.CharField(max_length=140, blank=True)
     is_cover = models.BooleanField(default=False)
     order = models.PositiveSmallIntegerField(default=0)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # Tailles WebP / JPEG générées après l'upload (cars.renditions)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -199,10 +252,57 @@ class CarPhoto(models.Model):
     def __str__(self):
         return f"Photo #{self.pk} — {self.car}"
 
+    def prepare_image(self):
+        """Nouveau fichier, pas encore sur le stockage : normalisé, dimensions lues."""
+        # Dimensions lues sur le fichier uploadé (encore en mémoire), jamais depuis le stockage
+        try:
+            # Orientation, métadonnées, taille maximale : avant l'écriture sur le stockage
+            size = normalize_field_file(self.image, settings.CAR_PHOTO_MAX_SIDE)
+            self.width, self.height = size or (self.image.width, self.image.height)
+        except (UnidentifiedImageError, OSError):
+            # Image illisible : gardée telle quelle, sans dimensions
+            logger.warning("Photo de voiture non normalisée : %s", self.image.name, exc_info=True)
+            self.width = self.height = None
+        # Nouveau fichier : anciennes déclinaisons obsolètes, régénérées après commit
+        self.renditions = {}
+        self._image_changed = True
+
     def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            self.prepare_image()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "width", "height", "renditions"}
+        if self.is_cover:
+            # Rétrograder les autres avant l'écriture, sinon unique_cover_per_car échoue
+            CarPhoto.objects.filter(car_id=self.car_id, is_cover=True).exclude(pk=self.pk).update(is_cover=False)
         super().save(*args, **kwargs)
         if self.is_cover:
-            CarPhoto.objects.filter(car=self.car).exclude(pk=self.pk).update(is_cover=False)
+            self.car.set_cover(self)
+        else:
+            # Cette photo n'est plus la couverture : on vide la dénormalisation si elle pointait dessus
+            if self.car.cover_id == self.pk:
+                self.car.set_cover(None)
+
+
+def save_photos(photos):
+    """
+    Enregistre plusieurs CarPhoto : les nouveaux fichiers partent ensemble vers le
+    stockage (save_many, en parallèle sur S3), puis les lignes sont écrites une à une.
+    """
+    photos = list(photos)
+    pending = [p for p in photos if p.image and not p.image._committed]
+    for photo in pending:
+        photo.prepare_image()
+    if pending:
+        storage = pending[0].image.storage
+        names = save_many(storage, [
+            (photo.image.field.generate_filename(photo, photo.image.name), photo.image.file) for photo in pending
+        ])
+        for photo, name in zip(pending, names):
+            photo.image.name, photo.image._committed = name, True
+    for photo in photos:
+        photo.save()
+    return photos
 
 
 class Favorite(models.Model):
@@ -230,4 +330,62 @@ class Favorite(models.Model):
                 pass
             base = slugify(title) or "favori"
             self.slug = f"{base}-{uuid.uuid4().hex[:6]}"
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class SimilarCars(models.Model):
+    """Voisins précalculés d'une annonce (commande compute_similar_cars)."""
+    car = models.OneToOneField(Car, on_delete=models.CASCADE, primary_key=True, related_name="similar")
+    car_ids = models.JSONField(default=list)   # pk des voisins, du plus proche au plus lointain
+    computed_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Voitures similaires"
+        verbose_name_plural = "Voitures similaires"
+
+    def __str__(self):
+        return f"{self.car} ({len(self.car_ids)} voisins)"
+
+
+def carphoto_post_delete_receiver(sender, instance, **kwargs):
+    # Car.cover est déjà remis à NULL par on_delete=SET_NULL ; on nettoie le chemin stocké.
+    if instance.image:
+        Car.objects.filter(pk=instance.car_id, cover_image=instance.image.name).update(
+            cover_image="", cover_width=None, cover_height=None, cover_renditions={}
+        )
+
+
+def favorite_post_save_receiver(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Car.objects.filter(pk=instance.car_id).update(favorite_count=F("favorite_count") + 1)
+
+
+def _decrement_favorite_counts(counts, batch_size=1000):
+    """favorite_count -= n pour chaque voiture de `counts` ({pk: n}) : un UPDATE par lot de voitures."""
+    items = list(counts.items())
+    for start in range(0, len(items), batch_size):
+        batch = dict(items[start:start + batch_size])
+        delta = Case(*[When(pk=pk, then=Value(n)) for pk, n in batch.items()], output_field=IntegerField())
+        # Greatest : jamais négatif, même si le compteur a dérivé
+        Car.objects.filter(pk__in=batch).update(favorite_count=Greatest(F("favorite_count") - delta, 0))
+
+
+def favorite_post_delete_receiver(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Favorite):
+        # favorite_count > 0 : jamais négatif, même si le compteur a dérivé
+        Car.objects.filter(pk=instance.car_id, favorite_count__gt=0).update(favorite_count=F("favorite_count") - 1)
+        return
+    # Cascade (compte ou voiture supprimé) ou suppression en masse : les favoris du même
+    # delete() (même `origin`) sont décomptés ensemble, en un UPDATE groupé après commit
+    pending = getattr(origin, "_favorite_deltas", None)
+    if pending is None:
+        pending = Counter()
+        if origin is not None:
+            origin._favorite_deltas = pending
+        transaction.on_commit(lambda: _decrement_favorite_counts(pending))
+    pending[instance.car_id] += 1
+
+
+post_delete.connect(carphoto_post_delete_receiver, sender=CarPhoto)
+post_save.connect(favorite_post_save_receiver, sender=Favorite)
+post_delete.connect(favorite_post_delete_receiver, sender=Favorite)
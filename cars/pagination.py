@@ -0,0 +1,181 @@
+# cars/pagination.py
+"""
+Pagination par curseur (keyset) pour les listes d'annonces.
+
+Au lieu de COUNT(*) + OFFSET, chaque page repart de la clé de tri de la
+dernière annonce affichée : WHERE (created_at, id) < (...) ORDER BY ... LIMIT n.
+La page 500 coûte donc autant que la page 1. Les jetons next/prev sont signés
+et opaques pour le client.
+"""
+import json
+
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils.functional import cached_property
+
+CURSOR_PARAM = "cursor"
+CURSOR_SALT = "cars.pagination.cursor"
+
+# Ordre total : la dernière clé (id) départage les égalités.
+SORTS = {
+    "newest": ("-created_at", "-id"),
+    "oldest": ("created_at", "id"),
+    "price_low": ("daily_price", "id"),
+    "price_high": ("-daily_price", "-id"),
+}
+DEFAULT_SORT = "newest"
+
+
+def approximate_count(qs):
+    """Estimation du planificateur sous PostgreSQL (pas de parcours), COUNT exact ailleurs."""
+    connection = connections[qs.db]
+    if connection.vendor != "postgresql":
+        return qs.count()
+    sql, params = qs.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _keyset_filter(ordering, values):
+    """(k1, k2, ...) strictement après `values` dans l'ordre `ordering`."""
+    q = Q()
+    for i, key in enumerate(ordering):
+        field = key.lstrip("-")
+        lookup = "lt" if key.startswith("-") else "gt"
+        branch = Q(**{f"{field}__{lookup}": values[i]})
+        for prev_key, prev_value in zip(ordering[:i], values[:i]):
+            branch &= Q(**{prev_key.lstrip("-"): prev_value})
+        q |= branch
+    return q
+
+
+def _reverse(ordering):
+    return tuple(key[1:] if key.startswith("-") else f"-{key}" for key in ordering)
+
+
+class KeysetPage:
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, next_token=None, previous_token=None, params=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_token = next_token
+        self.previous_token = previous_token
+        self._params = params
+
+    def __repr__(self):
+        return f"<KeysetPage {len(self.object_list)} objets>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_token is not None
+
+    def has_previous(self):
+        return self.previous_token is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _url(self, token):
+        params = self._params.copy() if self._params is not None else QueryDict(mutable=True)
+        params.pop("page", None)
+        params[CURSOR_PARAM] = token
+        return f"?{params.urlencode()}"
+
+    @property
+    def next_url(self):
+        return self._url(self.next_token) if self.next_token else None
+
+    @property
+    def previous_url(self):
+        return self._url(self.previous_token) if self.previous_token else None
+
+
+class KeysetPaginator:
+    """
+    `count` : None (pas de total), "approx" (estimation du planificateur),
+    "exact" (COUNT) ou un entier déjà connu (ex. total des facettes).
+    `ordering` : ordre total propre à un autre modèle (ex. LandingPageCar) au lieu
+    d'un tri de SORTS ; `sort` n'est alors que le nom porté par les jetons.
+    """
+
+    def __init__(self, queryset, per_page, sort=None, count=None, ordering=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        if ordering:
+            self.sort, self.ordering = sort, tuple(ordering)
+        else:
+            self.sort = sort if sort in SORTS else DEFAULT_SORT
+            self.ordering = SORTS[self.sort]
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if isinstance(self._count, int):
+            return self._count
+        if self._count == "approx":
+            return approximate_count(self.queryset)
+        if self._count == "exact":
+            return self.queryset.count()
+        return None
+
+    def _key(self, obj):
+        model = self.queryset.model
+        return [model._meta.get_field(key.lstrip("-")).value_to_string(obj) for key in self.ordering]
+
+    def _encode(self, direction, obj):
+        return signing.dumps([self.sort, direction, self._key(obj)], salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, token):
+        """Renvoie (direction, valeurs) ou None si le jeton est absent, altéré ou d'un autre tri."""
+        if not token:
+            return None
+        try:
+            sort, direction, raw = signing.loads(token, salt=CURSOR_SALT)
+        except (signing.BadSignature, ValueError, TypeError):
+            return None
+        if sort != self.sort or direction not in ("next", "prev") or len(raw) != len(self.ordering):
+            return None
+        model = self.queryset.model
+        try:
+            values = [model._meta.get_field(key.lstrip("-")).to_python(v) for key, v in zip(self.ordering, raw)]
+        except Exception:
+            return None
+        return direction, values
+
+    def page(self, token=None, params=None):
+        cursor = self._decode(token)
+        backwards = cursor is not None and cursor[0] == "prev"
+        ordering = _reverse(self.ordering) if backwards else self.ordering
+
+        qs = self.queryset.order_by(*ordering)
+        if cursor is not None:
+            qs = qs.filter(_keyset_filter(ordering, cursor[1]))
+
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        return KeysetPage(
+            rows, self,
+            next_token=self._encode("next", rows[-1]) if rows and has_next else None,
+            previous_token=self._encode("prev", rows[0]) if rows and has_previous else None,
+            params=params,
+        )
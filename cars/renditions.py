@@ -0,0 +1,163 @@
+# cars/renditions.py
+"""
+Déclinaisons (renditions) des photos de voiture : tailles fixes en WebP et JPEG.
+
+Après l'upload d'une CarPhoto (après commit), l'original est relu une fois depuis
+le stockage, puis réduit successivement de la plus grande taille à la plus petite
+(Pillow, LANCZOS). Chaque déclinaison est enregistrée à côté de l'original :
+
+    cars/<car>/photos/2025/01/<uuid>.jpg
+    cars/<car>/photos/2025/01/<uuid>__card.webp
+    cars/<car>/photos/2025/01/<uuid>__card.jpg …
+
+Le résultat est noté dans CarPhoto.renditions (et Car.cover_renditions pour la
+couverture) : {"card": {"width": 480, "height": 320, "webp": "<nom>", "jpeg": "<nom>"}, …}.
+Jamais d'agrandissement : une taille plus large que l'original réutilise la
+déclinaison à la largeur de l'original. Les templates utilisent le tag
+{% picture %} de cars/templatetags/car_images.py ; la commande
+generate_renditions rattrape les photos existantes.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps
+
+from .cache_tags import bump_car
+from utils.images import normalize_image
+from .models import Car, CarPhoto, car_photo_upload_to
+
+logger = logging.getLogger(__name__)
+
+# Largeur cible (px) de chaque taille, de la plus petite à la plus grande
+RENDITION_SIZES = {
+    "thumb": 160,     # vignettes (galerie, admin)
+    "card": 480,      # cartes des listes (306 px affichés, x1.5)
+    "detail": 1024,   # diaporama de la page détail
+    "full": 1920,     # plein écran
+}
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+# Quelques workers par processus : l'encodage ne bloque pas la réponse HTTP
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="renditions")
+
+
+def rendition_name(name, size, fmt):
+    root, _ = os.path.splitext(name)
+    return f"{root}__{size}.{EXTENSIONS[fmt]}"
+
+
+def _encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def build_renditions(image_file):
+    """Génère et enregistre toutes les tailles d'un fichier image ; renvoie (déclinaisons, (largeur, hauteur))."""
+    storage, name = image_file.storage, image_file.name
+    with storage.open(name, "rb") as fh, Image.open(fh) as original:
+        size = original.size
+        original = ImageOps.exif_transpose(original)
+        if original.mode != "RGB":
+            # Transparence aplatie sur fond blanc (JPEG n'a pas de canal alpha)
+            background = Image.new("RGB", original.size, "white")
+            background.paste(original, mask=original.convert("RGBA").getchannel("A"))
+            original = background
+        renditions, by_width = {}, {}
+        current = original
+        for key, width in sorted(RENDITION_SIZES.items(), key=lambda item: -item[1]):
+            width = min(width, original.width)
+            if width in by_width:
+                renditions[key] = by_width[width]
+                continue
+            if width < current.width:
+                current = current.resize((width, max(1, round(current.height * width / current.width))),
+                                         Image.Resampling.LANCZOS)
+            entry = {"width": current.width, "height": current.height}
+            for fmt in FORMATS:
+                entry[fmt] = storage.save(rendition_name(name, key, fmt), _encode(current, fmt))
+            renditions[key] = by_width[width] = entry
+    return {key: renditions[key] for key in RENDITION_SIZES}, size
+
+
+def normalize_stored(photo):
+    """
+    Photo envoyée directement au stockage (cars.direct_uploads) : normalisée comme un
+    upload classique (utils.images), puis enregistrée sous son chemin définitif.
+    """
+    storage, old = photo.image.storage, photo.image.name
+    with storage.open(old, "rb") as fh:
+        result = normalize_image(fh, old, settings.CAR_PHOTO_MAX_SIDE)
+        if result is None:
+            return
+        file, (width, height) = result
+        with file:
+            new = storage.save(car_photo_upload_to(photo, file.name), file)
+    if CarPhoto.objects.filter(pk=photo.pk, image=old).update(image=new, width=width, height=height):
+        storage.delete(old)
+        photo.image.name, photo.width, photo.height = new, width, height
+    else:
+        storage.delete(new)
+
+
+def generate_for_photo(photo):
+    """Génère les déclinaisons d'une photo et les recopie sur la voiture si c'est sa couverture."""
+    if photo.width is None:
+        # Dimensions inconnues : fichier qui n'est pas passé par CarPhoto.save (upload direct)
+        normalize_stored(photo)
+    name = photo.image.name
+    renditions, (width, height) = build_renditions(photo.image)
+    width, height = photo.width or width, photo.height or height
+    # L'image a pu être remplacée pendant l'encodage : on n'écrase pas un résultat plus récent
+    if CarPhoto.objects.filter(pk=photo.pk, image=name).update(renditions=renditions, width=width, height=height):
+        photo.renditions, photo.width, photo.height = renditions, width, height
+        if Car.objects.filter(pk=photo.car_id, cover_id=photo.pk).update(
+                cover_image=name, cover_renditions=renditions, cover_width=width, cover_height=height):
+            bump_car(photo.car_id)
+    return renditions
+
+
+def _generate(photo):
+    try:
+        if photo and photo.image:
+            generate_for_photo(photo)
+    except Exception:
+        logger.exception("Déclinaisons impossibles pour la photo %s", photo.pk)
+
+
+def _generate_in_worker(photo_id):
+    try:
+        _generate(CarPhoto.objects.filter(pk=photo_id).first())
+    finally:
+        # Connexion propre au thread du worker
+        connections.close_all()
+
+
+def schedule(photo):
+    if getattr(settings, "CAR_RENDITIONS_ASYNC", True):
+        _executor.submit(_generate_in_worker, photo.pk)
+    else:
+        # Même instance : CarPhoto.save recopie ensuite ses déclinaisons sur la voiture (set_cover)
+        _generate(photo)
+
+
+# ---------- Signaux ----------
+def carphoto_post_save_receiver(sender, instance, raw=False, **kwargs):
+    # CarPhoto.save pose _image_changed quand un nouveau fichier vient d'être enregistré
+    if not raw and getattr(instance, "_image_changed", False):
+        instance._image_changed = False
+        transaction.on_commit(lambda: schedule(instance))
+
+
+post_save.connect(carphoto_post_save_receiver, sender=CarPhoto)
@@ -0,0 +1,111 @@
+# cars/search.py
+"""
+Recherche plein texte sur les annonces (PostgreSQL).
+
+Chaque voiture porte un `search_vector` (configuration `french_unaccent`,
+indexé GIN) construit à partir du titre, de la marque, du modèle, de la ville
+et de la description. Il est recalculé à l'enregistrement de la voiture et
+quand une marque, un modèle ou une ville est renommé. Un index trigramme sur
+le titre tolère les fautes de frappe ("toyta yaris").
+
+Hors PostgreSQL (développement), on retombe sur un simple icontains.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.signals import post_save
+
+from .models import Car, Brand, CarModel, City, Place
+
+SEARCH_CONFIG = "french_unaccent"
+
+
+def _is_postgres(db):
+    return connections[db or "default"].vendor == "postgresql"
+
+
+def _document():
+    """Vecteur calculé par la base elle-même (sous-requêtes), sans charger les objets liés."""
+    brand = Subquery(Brand.objects.filter(pk=OuterRef("brand_id")).values("name")[:1])
+    model = Subquery(CarModel.objects.filter(pk=OuterRef("model_name_id")).values("name")[:1])
+    city = Subquery(City.objects.filter(places=OuterRef("place_id")).values("name")[:1])
+    return (SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector(brand, weight="A", config=SEARCH_CONFIG)
+            + SearchVector(model, weight="B", config=SEARCH_CONFIG)
+            + SearchVector(city, weight="C", config=SEARCH_CONFIG)
+            + SearchVector("description", weight="D", config=SEARCH_CONFIG))
+
+
+def update_search_vectors(qs):
+    """Recalcule les vecteurs de `qs` en un seul UPDATE (renommage de marque, ville…)."""
+    if _is_postgres(qs.db):
+        qs.update(search_vector=_document())
+
+
+def update_search_vector(car):
+    update_search_vectors(Car.objects.using(car._state.db or "default").filter(pk=car.pk))
+
+
+def _query(text):
+    return SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+
+
+def search_filter(qs, text):
+    """Restreint `qs` aux annonces correspondant à `text` (sans tri)."""
+    text = (text or "").strip()
+    if not text:
+        return qs
+    if not _is_postgres(qs.db):
+        return qs.filter(
+            Q(title__icontains=text) | Q(brand__name__icontains=text)
+            | Q(model_name__name__icontains=text) | Q(place__city__name__icontains=text)
+        )
+    return qs.filter(Q(search_vector=_query(text)) | Q(title__trigram_word_similar=text))
+
+
+def search_rank(qs, text):
+    """Trie `qs` par pertinence : rang plein texte, puis similarité trigramme du titre."""
+    text = (text or "").strip()
+    if not text or not _is_postgres(qs.db):
+        return qs
+    return (qs
+            .annotate(rank=SearchRank(F("search_vector"), _query(text)),
+                      similarity=TrigramWordSimilarity(text, "title"))
+            .order_by("-rank", "-similarity", "-created_at", "-id"))
+
+
+def full_text_search(qs, text):
+    return search_rank(search_filter(qs, text), text)
+
+
+# ---------- Mise à jour des vecteurs ----------
+def car_post_save_receiver(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_search_vector(instance)
+
+
+def brand_post_save_receiver(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(Car.objects.filter(brand=instance))
+
+
+def carmodel_post_save_receiver(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(Car.objects.filter(model_name=instance))
+
+
+def city_post_save_receiver(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(Car.objects.filter(place__city=instance))
+
+
+def place_post_save_receiver(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(Car.objects.filter(place=instance))
+
+
+post_save.connect(car_post_save_receiver, sender=Car)
+post_save.connect(brand_post_save_receiver, sender=Brand)
+post_save.connect(carmodel_post_save_receiver, sender=CarModel)
+post_save.connect(city_post_save_receiver, sender=City)
+post_save.connect(place_post_save_receiver, sender=Place)
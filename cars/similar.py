@@ -0,0 +1,124 @@
+# cars/similar.py
+"""
+Voitures similaires précalculées (commande compute_similar_cars).
+
+Chaque annonce active est encodée en vecteur numérique : codes entiers pour
+les colonnes catégorielles (marque, modèle, catégorie, région, carburant,
+boîte) et valeurs centrées-réduites pour les colonnes numériques (prix en log,
+année, kilométrage en log, places). La distance est une somme pondérée :
+poids × (codes différents) + poids × (écart numérique)². Les k plus proches
+voisins sont calculés par blocs de lignes avec NumPy, sans boucle Python par
+paire, puis stockés dans SimilarCars. La page détail n'a plus qu'à charger ces pk.
+"""
+import numpy as np
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Car, SimilarCars
+
+TOP_K = 12
+CHUNK_SIZE = 512
+BATCH_SIZE = 1000
+
+# colonne -> poids
+CATEGORICAL = {
+    "brand_id": 2.0,
+    "body_type": 2.0,
+    "place__region": 1.5,
+    "model_name_id": 1.0,
+    "fuel_type": 0.5,
+    "transmission": 0.5,
+}
+NUMERIC = {
+    "daily_price": (2.0, np.log1p),
+    "year": (1.0, None),
+    "mileage_km": (0.5, np.log1p),
+    "seats": (0.5, None),
+}
+
+
+class Vectors:
+    """Annonces actives encodées : `ids[i]` a pour codes `codes[:, i]` et valeurs `values[:, i]`."""
+
+    def __init__(self, rows):
+        self.ids = [str(row["pk"]) for row in rows]
+        self.index = {pk: i for i, pk in enumerate(self.ids)}
+        self.codes = np.empty((len(CATEGORICAL), len(rows)), dtype=np.int64)
+        for j, column in enumerate(CATEGORICAL):
+            lookup = {}
+            # None n'égale rien, pas même un autre None : code unique par ligne
+            self.codes[j] = [lookup.setdefault(row[column], len(lookup)) if row[column] is not None else -1 - i
+                             for i, row in enumerate(rows)]
+        self.values = np.empty((len(NUMERIC), len(rows)), dtype=np.float64)
+        for j, (column, (_, transform)) in enumerate(NUMERIC.items()):
+            col = np.array([float(row[column] or 0) for row in rows])
+            if transform is not None:
+                col = transform(col)
+            std = col.std()
+            self.values[j] = (col - col.mean()) / std if std else 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def distances(self, rows):
+        """Matrice (len(rows), n) des distances entre les lignes `rows` et toutes les annonces."""
+        d = np.zeros((len(rows), len(self)), dtype=np.float64)
+        for j, weight in enumerate(CATEGORICAL.values()):
+            d += weight * (self.codes[j, rows][:, None] != self.codes[j][None, :])
+        for j, (weight, _) in enumerate(NUMERIC.values()):
+            d += weight * (self.values[j, rows][:, None] - self.values[j][None, :]) ** 2
+        return d
+
+    def neighbours(self, rows, k=TOP_K, chunk_size=CHUNK_SIZE):
+        """{pk: [pk des k plus proches voisins]} pour les positions `rows`."""
+        result = {}
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return {self.ids[i]: [] for i in rows}
+        for start in range(0, len(rows), chunk_size):
+            chunk = np.asarray(rows[start:start + chunk_size])
+            d = self.distances(chunk)
+            d[np.arange(len(chunk)), chunk] = np.inf          # pas soi-même
+            top = np.argpartition(d, k - 1, axis=1)[:, :k]
+            order = np.take_along_axis(d, top, axis=1).argsort(axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            for i, neighbours in zip(chunk, top):
+                result[self.ids[i]] = [self.ids[n] for n in neighbours]
+        return result
+
+
+def load_vectors():
+    # Plus récentes d'abord : à distance égale, argsort stable garde la plus récente
+    rows = list(Car.objects.filter(is_active=True)
+                .order_by("-created_at", "-pk")
+                .values("pk", *CATEGORICAL, *NUMERIC))
+    return Vectors(rows)
+
+
+def stale_rows(vectors, since):
+    """Positions à recalculer depuis `since` : annonces nouvelles ou modifiées, et
+    annonces dont la liste pointe vers une voiture modifiée ou désactivée."""
+    computed = dict(SimilarCars.objects.values_list("car_id", "car_ids"))
+    computed = {str(pk): ids for pk, ids in computed.items()}
+    changed = {str(pk) for pk in Car.objects.filter(updated_at__gte=since).values_list("pk", flat=True)}
+    stale = {pk for pk in vectors.ids if pk not in computed or pk in changed}
+    for pk, ids in computed.items():
+        if pk in vectors.index and any(n in changed or n not in vectors.index for n in ids):
+            stale.add(pk)
+    return sorted(vectors.index[pk] for pk in stale)
+
+
+def compute_similar_cars(full=False, k=TOP_K, chunk_size=CHUNK_SIZE):
+    """Recalcule les voisins (tous, ou seulement ceux à rafraîchir) ; renvoie (calculés, supprimés)."""
+    started = timezone.now()
+    vectors = load_vectors()
+    since = None if full else SimilarCars.objects.aggregate(last=Max("computed_at"))["last"]
+    rows = list(range(len(vectors))) if since is None else stale_rows(vectors, since)
+
+    neighbours = vectors.neighbours(rows, k=k, chunk_size=chunk_size)
+    objs = [SimilarCars(car_id=pk, car_ids=ids, computed_at=started) for pk, ids in neighbours.items()]
+    SimilarCars.objects.bulk_create(objs, batch_size=BATCH_SIZE, update_conflicts=True,
+                                    unique_fields=["car"], update_fields=["car_ids", "computed_at"])
+    deleted, _ = SimilarCars.objects.exclude(car__is_active=True).delete()
+    return len(objs), deleted
+
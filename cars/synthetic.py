@@ -0,0 +1,373 @@
+# cars/synthetic.py
+"""
+Jeu de données synthétique à grande échelle (commande generate_dataset), pour
+reproduire en local les volumes et les plans de requêtes de la production.
+
+Tout découle de la graine : même graine et mêmes volumes, mêmes lignes (clés
+primaires comprises, dérivées de la graine et du numéro de ligne). Les
+distributions sont volontairement déséquilibrées, comme en production :
+Dakar et sa banlieue dominent, Toyota aussi ; le type de carrosserie et le
+prix suivent le modèle ; quelques comptes (agences) portent beaucoup
+d'annonces ; quelques annonces concentrent beaucoup de favoris.
+
+Les voitures sont écrites par lots (bulk_create), chaque lot avec ses
+caractéristiques, ses photos (chemins factices, aucun fichier) et ses favoris ;
+favorite_count est calculé au passage. bulk_create ne déclenche pas de signaux :
+vecteurs de recherche et landing pages sont mis à jour par lot puis à la fin ;
+les index bitmap des serveurs en cours se reconstruisent d'eux-mêmes
+(CARS_BITMAP_REBUILD_INTERVAL).
+Repère : external_id "synth-<n>", emails "@synthetic.test" (mot de passe
+"synthetic").
+"""
+import bisect
+import hashlib
+import itertools
+import math
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils.text import slugify
+
+from accounts.models import Profile
+from pages.landing_members import rebuild_landing
+from pages.models import LandingKind, LandingPage
+from .cache_tags import bump_tags
+from .choices_types import BodyType, CarColor, FuelType, SenegalRegion, Transmission
+from .models import MILEAGE_CHOICES, PRICE_CHOICES, Brand, Car, CarFeature, CarModel, CarPhoto, City, Favorite, Place
+from .search import update_search_vectors
+
+EXTERNAL_PREFIX = "synth-"
+EMAIL_DOMAIN = "synthetic.test"
+PASSWORD = "synthetic"
+CAR_BATCH_SIZE = 2000
+USER_BATCH_SIZE = 5000
+INSERT_BATCH_SIZE = 1000      # lignes par INSERT (limite de paramètres de PostgreSQL)
+# Date de référence fixe : même graine, mêmes dates
+DEFAULT_END = datetime(2025, 6, 30, tzinfo=dt_timezone.utc)
+HISTORY_DAYS = 730
+MAX_PHOTOS = 12
+
+# Ville -> (région, latitude, longitude, poids)
+CITIES = {
+    "Dakar": (SenegalRegion.DAKAR, 14.6928, -17.4467, 30),
+    "Pikine": (SenegalRegion.DAKAR, 14.7646, -17.3907, 6),
+    "Guédiawaye": (SenegalRegion.DAKAR, 14.7833, -17.4000, 4),
+    "Rufisque": (SenegalRegion.DAKAR, 14.7167, -17.2667, 5),
+    "Thiès": (SenegalRegion.THIES, 14.7910, -16.9359, 8),
+    "Mbour": (SenegalRegion.THIES, 14.4199, -16.9633, 6),
+    "Saly": (SenegalRegion.THIES, 14.4500, -17.0167, 4),
+    "Touba": (SenegalRegion.DIOURBEL, 14.8667, -15.8833, 5),
+    "Diourbel": (SenegalRegion.DIOURBEL, 14.6550, -16.2314, 2),
+    "Kaolack": (SenegalRegion.KAOLACK, 14.1652, -16.0758, 5),
+    "Fatick": (SenegalRegion.FATICK, 14.3396, -16.4111, 1.5),
+    "Kaffrine": (SenegalRegion.KAFFRINE, 14.1059, -15.5508, 1),
+    "Louga": (SenegalRegion.LOUGA, 15.6144, -16.2286, 2),
+    "Saint-Louis": (SenegalRegion.SAINT_LOUIS, 16.0179, -16.4896, 5),
+    "Matam": (SenegalRegion.MATAM, 15.6559, -13.2548, 0.7),
+    "Tambacounda": (SenegalRegion.TAMBACOUNDA, 13.7707, -13.6673, 1.5),
+    "Kédougou": (SenegalRegion.KEDOUGOU, 12.5556, -12.1744, 0.5),
+    "Kolda": (SenegalRegion.KOLDA, 12.8983, -14.9412, 1),
+    "Sédhiou": (SenegalRegion.SEDHIOU, 12.7081, -15.5569, 0.5),
+    "Ziguinchor": (SenegalRegion.ZIGUINCHOR, 12.5681, -16.2719, 3),
+    "Cap Skirring": (SenegalRegion.ZIGUINCHOR, 12.3906, -16.7461, 1.5),
+}
+
+# Marque -> (poids, [(modèle, carrosserie, prix journalier de base)]) ; modèles du plus au moins courant
+BRANDS = {
+    "Toyota": (30, [("Yaris", BodyType.CITY_CAR, 20000), ("Corolla", BodyType.SEDAN, 25000),
+                    ("RAV4", BodyType.SUV, 40000), ("Hilux", BodyType.PICKUP, 45000),
+                    ("Land Cruiser", BodyType.FOUR_BY_FOUR, 70000), ("Prado", BodyType.FOUR_BY_FOUR, 60000),
+                    ("HiAce", BodyType.MINIBUS, 55000), ("Coaster", BodyType.BUS, 90000)]),
+    "Hyundai": (14, [("Accent", BodyType.SEDAN, 20000), ("i10", BodyType.CITY_CAR, 15000),
+                     ("Tucson", BodyType.SUV, 35000), ("Santa Fe", BodyType.SUV, 45000),
+                     ("H1", BodyType.VAN, 45000)]),
+    "Kia": (10, [("Picanto", BodyType.CITY_CAR, 15000), ("Rio", BodyType.CITY_CAR, 18000),
+                 ("Sportage", BodyType.SUV, 35000), ("Sorento", BodyType.SUV, 45000)]),
+    "Peugeot": (10, [("208", BodyType.CITY_CAR, 20000), ("301", BodyType.SEDAN, 20000),
+                     ("308", BodyType.SEDAN, 25000), ("3008", BodyType.SUV, 40000),
+                     ("508", BodyType.SEDAN, 35000), ("Partner", BodyType.VAN, 30000)]),
+    "Renault": (8, [("Clio", BodyType.CITY_CAR, 18000), ("Logan", BodyType.SEDAN, 17000),
+                    ("Duster", BodyType.SUV, 25000), ("Megane", BodyType.SEDAN, 22000)]),
+    "Mercedes-Benz": (6, [("Classe C", BodyType.SEDAN, 50000), ("Classe E", BodyType.SEDAN, 65000),
+                          ("GLE", BodyType.SUV, 85000), ("Sprinter", BodyType.MINIBUS, 70000),
+                          ("Classe C Cabriolet", BodyType.CONVERTIBLE, 90000)]),
+    "Nissan": (6, [("Almera", BodyType.SEDAN, 18000), ("Qashqai", BodyType.SUV, 35000),
+                   ("Navara", BodyType.PICKUP, 45000), ("Patrol", BodyType.FOUR_BY_FOUR, 75000)]),
+    "Ford": (4, [("Ranger", BodyType.PICKUP, 45000), ("Focus", BodyType.SEDAN, 22000),
+                 ("Explorer", BodyType.SUV, 55000), ("Mustang", BodyType.COUPE, 95000)]),
+    "Mitsubishi": (4, [("L200", BodyType.PICKUP, 40000), ("Pajero", BodyType.FOUR_BY_FOUR, 55000)]),
+    "Suzuki": (3, [("Swift", BodyType.CITY_CAR, 17000), ("Vitara", BodyType.SUV, 28000)]),
+    "Honda": (3, [("Civic", BodyType.SEDAN, 25000), ("CR-V", BodyType.SUV, 38000)]),
+    "Volkswagen": (2, [("Golf", BodyType.CITY_CAR, 22000), ("Touareg", BodyType.SUV, 60000)]),
+}
+
+# Carrosserie -> (places possibles, portes possibles, part des boîtes automatiques)
+BODY_LAYOUT = {
+    BodyType.CITY_CAR: (("4", "5"), ("3", "5"), 0.2),
+    BodyType.SEDAN: (("5",), ("4",), 0.35),
+    BodyType.SUV: (("5", "7"), ("5",), 0.6),
+    BodyType.FOUR_BY_FOUR: (("5", "7"), ("5",), 0.55),
+    BodyType.PICKUP: (("2", "5"), ("2", "4"), 0.2),
+    BodyType.VAN: (("7", "8", "9"), ("4", "5"), 0.3),
+    BodyType.MINIBUS: (("9",), ("4", "5"), 0.1),
+    BodyType.BUS: (("9",), ("2",), 0.1),
+    BodyType.COUPE: (("2", "4"), ("2",), 0.8),
+    BodyType.CONVERTIBLE: (("2", "4"), ("2",), 0.8),
+}
+FUELS = {FuelType.GASOLINE: 55, FuelType.DIESEL: 40, FuelType.HYBRID: 3, FuelType.ELECTRIC: 1, FuelType.LPG: 1}
+COLORS = {CarColor.WHITE: 30, CarColor.BLACK: 20, CarColor.SILVER: 15, CarColor.GREY: 15, CarColor.BLUE: 6,
+          CarColor.RED: 5, CarColor.BEIGE: 3, CarColor.BROWN: 2, CarColor.GREEN: 1, CarColor.GOLD: 1,
+          CarColor.YELLOW: 0.5, CarColor.ORANGE: 0.5, CarColor.PURPLE: 0.3, CarColor.OTHER: 0.7}
+# Caractéristique -> probabilité d'être présente
+FEATURES = {
+    "Climatisation": 0.85, "Bluetooth": 0.45, "GPS intégré": 0.25, "Caméra de recul": 0.3,
+    "Radar de recul": 0.25, "Régulateur de vitesse": 0.2, "Sièges en cuir": 0.12, "Toit ouvrant": 0.06,
+    "Jantes alliage": 0.3, "4 roues motrices": 0.1, "Chauffeur disponible": 0.15, "Siège bébé": 0.08,
+}
+TITLE_SUFFIXES = ["", "", "", "propre", "climatisée", "comme neuve", "avec chauffeur", "économique",
+                  "idéale famille", "tout terrain", "prix négociable"]
+DESCRIPTIONS = [
+    "Voiture bien entretenue, vidange à jour.",
+    "Disponible à l'aéroport AIBD et en centre-ville.",
+    "Location à la journée, à la semaine ou au mois.",
+    "Kilométrage illimité dans la région.",
+    "Chauffeur expérimenté sur demande.",
+    "Caution demandée à la remise des clés.",
+    "Idéal pour les mariages et les déplacements professionnels.",
+]
+FIRST_NAMES = {
+    "HOMME": ["Mamadou", "Moussa", "Abdoulaye", "Ousmane", "Ibrahima", "Cheikh", "Modou", "Aliou",
+              "Babacar", "Pape", "Serigne", "Amadou", "Lamine", "Omar"],
+    "FEMME": ["Fatou", "Aminata", "Awa", "Mariama", "Khady", "Aïssatou", "Ndeye", "Coumba",
+              "Seynabou", "Adama", "Astou", "Rokhaya", "Bineta", "Dieynaba"],
+}
+LAST_NAMES = ["Diallo", "Ndiaye", "Diop", "Fall", "Sow", "Sy", "Ba", "Gueye", "Faye", "Sarr", "Cissé",
+              "Thiam", "Mbaye", "Kane", "Diouf", "Niang", "Seck", "Camara", "Ndoye", "Wade", "Touré", "Sall"]
+PHONE_PREFIXES = ["70", "75", "76", "77", "78"]
+YEARS = list(range(2010, 2025))
+PRICES = [p for p, _ in PRICE_CHOICES]
+MILEAGES = [m for m, _ in MILEAGE_CHOICES]
+
+
+def stable_uuid(seed, kind, number):
+    """UUID v4 reproductible : le même (graine, type, numéro) donne toujours la même clé."""
+    return uuid.UUID(bytes=hashlib.md5(f"{seed}:{kind}:{number}".encode()).digest(), version=4)
+
+
+def _snap(value, grid):
+    """Valeur de la grille de choix la plus proche (les prix et kilométrages sont des choix fixes)."""
+    step = grid[1] - grid[0]
+    return min(max(grid[0] + round((value - grid[0]) / step) * step, grid[0]), grid[-1])
+
+
+@contextmanager
+def manual_timestamps(*fields):
+    """Désactive auto_now / auto_now_add : les dates générées sont écrites telles quelles."""
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f, _, _ in saved:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+class Weighted:
+    """Tirage pondéré rapide (cumul précalculé) ; rng.choices recalculerait le cumul à chaque appel."""
+
+    def __init__(self, weights):
+        self.values = list(weights)
+        self.cum = list(itertools.accumulate(weights.values()))
+
+    def pick(self, rng):
+        return self.values[min(bisect.bisect_right(self.cum, rng.random() * self.cum[-1]), len(self.values) - 1)]
+
+
+class DatasetGenerator:
+    """Génère utilisateurs, puis voitures (avec caractéristiques, photos et favoris), lot par lot."""
+
+    def __init__(self, cars, users, favorites, photos, seed=42, end=DEFAULT_END,
+                 batch_size=CAR_BATCH_SIZE, report=None):
+        self.n_cars, self.n_users = cars, max(users, 1)
+        self.favorites_per_car = favorites / cars if cars else 0
+        self.photos_per_car = photos / cars if cars else 0
+        self.seed, self.end, self.batch_size = seed, end, batch_size
+        self.report = report or (lambda phase, done, total, elapsed: None)
+        self.rng = random.Random(seed)
+        self.stats = dict(users=0, cars=0, photos=0, favorites=0, features=0)
+
+    # ---------- Données de référence (petites : ORM classique, signaux compris) ----------
+    def prepare_references(self):
+        self.places = {}
+        for name, (region, lat, lng, _) in CITIES.items():
+            city, _ = City.objects.get_or_create(name=name, defaults={"region": region})
+            place, _ = Place.objects.get_or_create(city=city, region=region,
+                                                   defaults={"latitude": lat, "longitude": lng})
+            self.places[name] = place
+        self.city_picker = Weighted({name: weight for name, (_, _, _, weight) in CITIES.items()})
+
+        self.models = {}
+        for brand_name, (_, models) in BRANDS.items():
+            brand, _ = Brand.objects.get_or_create(name=brand_name)
+            for name, body_type, price in models:
+                model, _ = CarModel.objects.get_or_create(brand=brand, name=name)
+                self.models[(brand_name, name)] = (brand, model, body_type, price)
+        self.brand_picker = Weighted({name: weight for name, (weight, _) in BRANDS.items()})
+        # Dans une marque : loi de Zipf sur le rang du modèle
+        self.model_pickers = {name: Weighted({m[0]: 1 / rank for rank, m in enumerate(models, 1)})
+                              for name, (_, models) in BRANDS.items()}
+        self.features = [(CarFeature.objects.get_or_create(name=name)[0].pk, p) for name, p in FEATURES.items()]
+        self.fuel_picker, self.color_picker = Weighted(FUELS), Weighted(COLORS)
+        # Années récentes plus fréquentes
+        self.year_picker = Weighted({year: (year - 2008) ** 1.5 for year in YEARS})
+
+    def existing(self):
+        User = get_user_model()
+        return (Car.objects.filter(external_id__startswith=EXTERNAL_PREFIX).exists()
+                or User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").exists())
+
+    # ---------- Utilisateurs ----------
+    def user_id(self, number):
+        return stable_uuid(self.seed, "user", number)
+
+    def generate_users(self):
+        User = get_user_model()
+        password = make_password(PASSWORD)
+        fields = [User._meta.get_field("date_joined"), User._meta.get_field("last_login")]
+        started = time.monotonic()
+        with manual_timestamps(*fields):
+            for start in range(0, self.n_users, USER_BATCH_SIZE):
+                users, profiles = [], []
+                for number in range(start, min(start + USER_BATCH_SIZE, self.n_users)):
+                    user_type = "FEMME" if self.rng.random() < 0.4 else "HOMME"
+                    joined = self.end - timedelta(days=HISTORY_DAYS * 1.5 * self.rng.random() ** 1.3)
+                    users.append(User(
+                        id=self.user_id(number), email=f"user{number}@{EMAIL_DOMAIN}", password=password,
+                        first_name=self.rng.choice(FIRST_NAMES[user_type]), last_name=self.rng.choice(LAST_NAMES),
+                        user_type=user_type,
+                        phone_number=f"+221{PHONE_PREFIXES[number // 10 ** 7 % 5]}{number % 10 ** 7:07d}",
+                        date_joined=joined, last_login=joined + (self.end - joined) * self.rng.random(),
+                    ))
+                    profiles.append(Profile(id=stable_uuid(self.seed, "profile", number), user_id=users[-1].id))
+                with transaction.atomic():
+                    User.objects.bulk_create(users, batch_size=INSERT_BATCH_SIZE)
+                    Profile.objects.bulk_create(profiles, batch_size=INSERT_BATCH_SIZE)
+                self.stats["users"] += len(users)
+                self.report("users", self.stats["users"], self.n_users, time.monotonic() - started)
+
+    # ---------- Voitures, caractéristiques, photos, favoris ----------
+    def _owner(self):
+        # Quelques agences portent beaucoup d'annonces : indices bas fortement favorisés
+        return self.user_id(int(self.n_users * self.rng.random() ** 3))
+
+    def _car(self, number):
+        rng = self.rng
+        pk = stable_uuid(self.seed, "car", number)
+        brand_name = self.brand_picker.pick(rng)
+        brand, model, body_type, base_price = self.models[(brand_name, self.model_pickers[brand_name].pick(rng))]
+        seats, doors, auto_share = BODY_LAYOUT[body_type]
+        year = self.year_picker.pick(rng)
+        age = 2025 - year
+        created = self.end - timedelta(days=HISTORY_DAYS * rng.random() ** 1.5)
+        suffix = rng.choice(TITLE_SUFFIXES)
+        title = f"{brand_name} {model.name} {year}" + (f" - {suffix}" if suffix else "")
+        # Prix : base du modèle, décote avec l'âge, bruit log-normal
+        price = base_price * (1 - 0.03 * age) * math.exp(rng.gauss(0, 0.25))
+        return Car(
+            id=pk, external_id=f"{EXTERNAL_PREFIX}{number}", owner_id=self._owner(),
+            title=title, slug=f"{slugify(title)[:140]}-{pk.hex[:10]}",
+            brand=brand, model_name=model, year=year, body_type=body_type,
+            transmission=Transmission.AUTO if rng.random() < auto_share else Transmission.MANUAL,
+            fuel_type=self.fuel_picker.pick(rng), seats=rng.choice(seats), doors=rng.choice(doors),
+            mileage_km=_snap(max(age, 0.3) * rng.gauss(15000, 5000), MILEAGES),
+            color=self.color_picker.pick(rng),
+            description=" ".join(rng.sample(DESCRIPTIONS, rng.randint(1, 3))),
+            place=self.places[self.city_picker.pick(rng)], daily_price=_snap(price, PRICES),
+            is_active=rng.random() < 0.92, is_featured=rng.random() < 0.02,
+            created_at=created, updated_at=created + (self.end - created) * rng.random() ** 3,
+        )
+
+    def _photos(self, car):
+        count = min(MAX_PHOTOS, int(self.rng.expovariate(1 / (self.photos_per_car + 0.5)))) if self.photos_per_car else 0
+        photos = []
+        for order in range(count):
+            width, height = (1600, 1200) if self.rng.random() < 0.85 else (1200, 1600)
+            photos.append(CarPhoto(
+                car_id=car.pk, image=f"cars/{car.pk}/photos/synthetic/{order}.jpg", order=order,
+                is_cover=order == 0, width=width, height=height, uploaded_at=car.created_at,
+            ))
+        if photos:
+            car.cover_image, car.cover_width, car.cover_height = photos[0].image, photos[0].width, photos[0].height
+        return photos
+
+    def _favorites(self, car):
+        if not self.favorites_per_car:
+            return []
+        # Pareto (moyenne 2) : la plupart des annonces ont peu de favoris, quelques-unes beaucoup
+        count = min(self.n_users, round(self.favorites_per_car * self.rng.paretovariate(2) / 2))
+        if count > self.n_users // 4:
+            users = set(self.rng.sample(range(self.n_users), count))
+        else:
+            # Les comptes les plus actifs (indices bas) mettent plus de favoris
+            users = set()
+            while len(users) < count:
+                users.add(int(self.n_users * self.rng.random() ** 2))
+        favorites = []
+        for user in sorted(users):
+            pk = stable_uuid(self.seed, "favorite", f"{car.external_id}:{user}")
+            favorites.append(Favorite(
+                id=pk, slug=f"{car.slug[:140]}-{pk.hex[:12]}", user_id=self.user_id(user), car_id=car.pk,
+                created_at=car.created_at + (self.end - car.created_at) * self.rng.random(),
+            ))
+        car.favorite_count = len(favorites)
+        return favorites
+
+    def generate_cars(self):
+        through = Car.features.through
+        fields = [Car._meta.get_field("created_at"), Car._meta.get_field("updated_at"),
+                  CarPhoto._meta.get_field("uploaded_at"), Favorite._meta.get_field("created_at")]
+        started = time.monotonic()
+        with manual_timestamps(*fields):
+            for start in range(0, self.n_cars, self.batch_size):
+                cars, links, photos, favorites = [], [], [], []
+                for number in range(start, min(start + self.batch_size, self.n_cars)):
+                    car = self._car(number)
+                    cars.append(car)
+                    links.extend(through(car_id=car.pk, carfeature_id=feature)
+                                 for feature, p in self.features if self.rng.random() < p)
+                    photos.extend(self._photos(car))
+                    favorites.extend(self._favorites(car))
+                ids = [car.pk for car in cars]
+                with transaction.atomic():
+                    Car.objects.bulk_create(cars, batch_size=INSERT_BATCH_SIZE)
+                    through.objects.bulk_create(links, batch_size=INSERT_BATCH_SIZE)
+                    CarPhoto.objects.bulk_create(photos, batch_size=INSERT_BATCH_SIZE)
+                    Favorite.objects.bulk_create(favorites, batch_size=INSERT_BATCH_SIZE)
+                    # Couverture : clé de la photo n° 0, connue seulement après l'INSERT
+                    Car.objects.filter(pk__in=ids).update(cover=Subquery(
+                        CarPhoto.objects.filter(car=OuterRef("pk"), is_cover=True).values("pk")[:1]))
+                    update_search_vectors(Car.objects.filter(pk__in=ids))
+                for key, rows in (("cars", cars), ("features", links), ("photos", photos), ("favorites", favorites)):
+                    self.stats[key] += len(rows)
+                self.report("cars", self.stats["cars"], self.n_cars, time.monotonic() - started)
+
+    def finish(self):
+        """Ce que les signaux auraient fait : landing pages et caches."""
+        for page in LandingPage.objects.exclude(kind=LandingKind.STATIC):
+            rebuild_landing(page)
+        bump_tags("cars", "landings")
+
+    def run(self):
+        self.prepare_references()
+        self.generate_users()
+        self.generate_cars()
+        self.finish()
+        return self.stats
@@ -0,0 +1,72 @@
+# cars/templatetags/car_images.py
+"""
+Images responsives à partir des déclinaisons (cars.renditions).
+
+    {% load car_images %}
+    {% picture car.cover_image car.cover_renditions "card" alt=car.title class="w-100 h-100 object-fit-cover" %}
+    <img src="{% rendition_url photo.image photo.renditions 'thumb' %}" srcset="{{ photo.renditions|srcset:'jpeg' }}">
+
+Sans déclinaisons (photo pas encore traitée), l'original est servi comme avant.
+"""
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+# Largeur affichée de chaque taille, pour l'attribut sizes
+DEFAULT_SIZES = {
+    "thumb": "160px",
+    "card": "(min-width: 1200px) 306px, (min-width: 576px) 50vw, 100vw",
+    "detail": "(min-width: 992px) 66vw, 100vw",
+    "full": "100vw",
+}
+
+
+@register.filter
+def srcset(renditions, fmt="webp"):
+    """"url 160w, url 480w, …" (une entrée par largeur distincte)."""
+    if not renditions:
+        return ""
+    seen = {}
+    for entry in renditions.values():
+        if entry.get(fmt):
+            seen.setdefault(entry["width"], entry[fmt])
+    return ", ".join(f"{default_storage.url(name)} {width}w" for width, name in sorted(seen.items()))
+
+
+@register.simple_tag
+def rendition_url(image, renditions, size="card", fmt="jpeg"):
+    """URL de la déclinaison demandée, ou de l'original s'il n'y en a pas encore."""
+    entry = (renditions or {}).get(size) or {}
+    if entry.get(fmt):
+        return default_storage.url(entry[fmt])
+    return image.url if image else ""
+
+
+@register.simple_tag
+def picture(image, renditions, size="card", sizes=None, **attrs):
+    """<picture> WebP + JPEG ; `attrs` sont recopiés sur la balise <img> (class, style, alt…)."""
+    attrs.setdefault("alt", "")
+    attrs.setdefault("loading", "lazy")
+    entry = (renditions or {}).get(size)
+    if not entry:
+        img_attrs = {"src": image.url if image else "", **attrs}
+        return format_html("<img{}>", _attributes(img_attrs))
+    sizes = sizes or DEFAULT_SIZES.get(size, "100vw")
+    img_attrs = {
+        "src": default_storage.url(entry["jpeg"]),
+        "srcset": srcset(renditions, "jpeg"),
+        "sizes": sizes,
+        "width": entry["width"],
+        "height": entry["height"],
+        **attrs,
+    }
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}"><img{}></picture>',
+        srcset(renditions, "webp"), sizes, _attributes(img_attrs),
+    )
+
+
+def _attributes(attrs):
+    return format_html_join("", ' {}="{}"', ((k.replace("_", "-"), v) for k, v in attrs.items() if v is not None))
@@ -1,3 +1,57 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from pages.benchmarks import QueryBudgetTestCase, seed_dataset
+from .models import Car, Favorite
+
+
+class CarViewsQueryBudgetTests(QueryBudgetTestCase):
+    def test_car_list(self):
+        self.assertWithinBudget("car_list")
+
+    def test_car_detail(self):
+        self.assertWithinBudget("car_detail")
+
+    def test_my_favorites(self):
+        self.assertWithinBudget("my_favorites")
+
+    def test_favorite_toggle(self):
+        self.assertWithinBudget("favorite_toggle")
+
+
+class FavoriteCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(40)
+
+    def assertCountsExact(self):
+        drifted = Car.objects.annotate(actual=Count("favorite_links")).exclude(favorite_count=F("actual"))
+        self.assertFalse(drifted.exists())
+
+    def counter_updates(self, queries):
+        return [q["sql"] for q in queries if q["sql"].startswith('UPDATE "cars_car" SET "favorite_count"')]
+
+    def test_user_cascade_decrements_in_one_update(self):
+        user = get_user_model().objects.annotate(n=Count("favorite_links")).order_by("-n").first()
+        self.assertGreater(user.n, 1)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+        self.assertEqual(len(self.counter_updates(queries)), 1)
+        self.assertCountsExact()
+
+    def test_single_delete(self):
+        Favorite.objects.first().delete()
+        self.assertCountsExact()
 
-# Create your tests here.
+    def test_reconcile_single_update(self):
+        Car.objects.filter(pk__in=Car.objects.values("pk")[:5]).update(favorite_count=99)
+        with CaptureQueriesContext(connection) as queries:
+            call_command("reconcile_favorite_counts", stdout=StringIO())
+        self.assertEqual(len(queries), 1)
+        self.assertCountsExact()
@@ -7,6 +7,9 @@ urlpatterns = [
     path("new/", views.car_create, name="car_create"),
     path("edit/<slug:slug>", views.car_update, name="car_update"),
     path("delete/<slug:slug>", views.car_delete, name="car_delete"),
+    path("uploads/sign/", views.car_upload_sign, name="car_upload_sign"),
+    path("uploads/local/", views.car_upload_local, name="car_upload_local"),
+    path("feed/", views.car_feed, name="car_feed"),
     path("favorite/<slug:slug>", views.favorite_toggle, name="favorite_toggle"),
     path("mes-favorits/", views.my_favorites, name="my_favorites"),
 
@@ -3,36 +3,56 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.core.exceptions import PermissionDenied
 from django.views.generic import ListView, DetailView
 from django.views.decorators.http import require_http_methods
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.db import IntegrityError, transaction
 from django.contrib import messages
-from django.db.models import Count, Prefetch
 
 
 logger = logging.getLogger(__name__)
 
-from .models import Car, Favorite, CarPhoto
+from .models import Car, Favorite, SimilarCars, save_photos
 from .forms import CarForm, CarPhotoFormSet, EditCarPhotoFormSet
+from .conditional import conditional_page, page_validators
+from .direct_uploads import UploadError, presigned_post, save_local_upload
+from .favorites import mark_favorites
+from .feeds import EXTENSIONS, FORMATS, FeedError, next_cursor, parse_since, stream_feed
+from .geo import nearby, point_from_params, RADIUS_CHOICES
+from .pagination import KeysetPaginator, CURSOR_PARAM, DEFAULT_SORT, SORTS
 
 FORMSET_PREFIX = "photos"
 PHOTO_PREFIX = "photos"
 
 def _ensure_one_cover(car):
     qs = car.photos.order_by("order", "id")
-    if not qs.filter(is_cover=True).exists():
-        first = qs.first()
-        if first:
-            first.is_cover = True
-            first.save(update_fields=["is_cover"])
+    cover = qs.filter(is_cover=True).first()
+    if cover is None:
+        cover = qs.first()
+        if cover:
+            cover.is_cover = True
+            cover.save(update_fields=["is_cover"])  # CarPhoto.save recopie la cover sur la voiture
+            return
+    if car.cover_id != getattr(cover, "pk", None):
+        car.set_cover(cover)
+
+
+def _save_photo_formset(formset):
+    # Les fichiers des nouvelles photos partent en parallèle vers le stockage (save_photos)
+    photos = formset.save(commit=False)
+    for photo in formset.deleted_objects:
+        photo.delete()
+    save_photos(photos)
 
 
 @login_required
 @transaction.atomic
 def car_create(request):
     car_form = CarForm(request.POST or None)
-    photo_formset = CarPhotoFormSet(request.POST or None, request.FILES or None, prefix="photos")
+    photo_formset = CarPhotoFormSet(request.POST or None, request.FILES or None, prefix="photos",
+                                    form_kwargs={"user": request.user})
 
     if request.method == "POST":
         valid = car_form.is_valid() and photo_formset.is_valid()
@@ -43,7 +63,7 @@ def car_create(request):
             car_form.save_m2m()
 
             photo_formset.instance = car
-            photo_formset.save()
+            _save_photo_formset(photo_formset)
             _ensure_one_cover(car)
 
             return redirect(car.get_absolute_url())
@@ -72,14 +92,14 @@ def car_update(request, slug):
     car_form = CarForm(request.POST or None, instance=car)
     photo_formset = CarPhotoFormSet(
         request.POST or None, request.FILES or None,
-        instance=car, prefix="photos"
+        instance=car, prefix="photos", form_kwargs={"user": request.user}
     )
 
     if request.method == "POST":
         valid = car_form.is_valid() and photo_formset.is_valid()
         if valid:
             car = car_form.save()
-            photo_formset.save()
+            _save_photo_formset(photo_formset)
             _ensure_one_cover(car)
             messages.success(request, "Annonce mise à jour avec succès.")
             return redirect(car.get_absolute_url())
@@ -98,6 +118,59 @@ def car_update(request, slug):
 
 
 
+@login_required
+@require_POST
+def car_upload_sign(request):
+    """Politique de POST présigné pour envoyer une photo directement au stockage."""
+    try:
+        size = int(request.POST.get("size", 0))
+    except ValueError:
+        return JsonResponse({"error": "Taille invalide."}, status=400)
+    try:
+        return JsonResponse(presigned_post(request.user, request.POST.get("content_type", ""), size))
+    except UploadError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+@login_required
+@require_POST
+def car_upload_local(request):
+    """Stockage fichier (développement) : reçoit le POST que S3 recevrait en production."""
+    upload = request.FILES.get("file")
+    if upload is None:
+        return JsonResponse({"error": "Fichier manquant."}, status=400)
+    try:
+        save_local_upload(request.POST.get("policy", ""), request.POST.get("key", ""), upload)
+    except UploadError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return HttpResponse(status=204)
+
+
+@require_http_methods(["GET", "HEAD"])
+@transaction.non_atomic_requests
+def car_feed(request):
+    """Flux partenaires (cars.feeds) : ?format=jsonl|csv|xml&updated_since=<ISO 8601>."""
+    fmt = request.GET.get("format", "jsonl")
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest("format : jsonl, csv ou xml.")
+    try:
+        since = parse_since(request.GET.get("updated_since"))
+    except FeedError as e:
+        return HttpResponseBadRequest(str(e))
+    cursor = next_cursor()
+    compress = "gzip" in request.headers.get("Accept-Encoding", "")
+    response = StreamingHttpResponse(
+        stream_feed(fmt, request.build_absolute_uri("/"), since, compress=compress),
+        content_type=FORMATS[fmt],
+    )
+    if compress:
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    response["Content-Disposition"] = f'inline; filename="annonces.{EXTENSIONS[fmt]}"'
+    response["X-Feed-Cursor"] = cursor.isoformat()
+    return response
+
+
 @login_required
 @require_http_methods(["GET", "POST"])
 def car_delete(request, slug):
@@ -126,11 +199,56 @@ class CarListView(ListView):
         qs = (Car.objects
               .filter(is_active=True)
               .select_related("brand", "model_name", "place__city")
-              .prefetch_related("photos")
               .order_by("-created_at"))
+        # ?lat=…&lng=…[&radius=…] : uniquement les annonces dans le rayon
+        self.point = point_from_params(self.request.GET)
+        if self.point:
+            qs = nearby(qs, *self.point)
         return qs
 
+    def _sort(self):
+        sort = self.request.GET.get("sort")
+        if sort == "distance" and self.point:
+            return sort
+        return sort if sort in SORTS else DEFAULT_SORT
+
+    def paginate_queryset(self, queryset, page_size):
+        if self._sort() == "distance":
+            # Tri sur une valeur calculée : pagination classique, limitée au rayon
+            return super().paginate_queryset(queryset, page_size)
+        # Pagination par curseur : pas de COUNT(*) ni d'OFFSET, même coût à chaque page
+        paginator = KeysetPaginator(queryset, page_size, sort=self._sort(), count="approx")
+        page = paginator.page(self.request.GET.get(CURSOR_PARAM), params=self.request.GET)
+        return paginator, page, page.object_list, page.has_other_pages()
 
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["cars"] = ctx["object_list"] = mark_favorites(ctx["object_list"], self.request.user)
+        ctx["sort"] = self._sort()
+        ctx["point"] = self.point
+        ctx["radius_choices"] = RADIUS_CHOICES
+        params = self.request.GET.copy()
+        params.pop("page", None)
+        ctx["querystring"] = params.urlencode()
+        return ctx
+
+
+def car_detail_validators(request, slug):
+    row = (Car.objects.filter(slug=slug, is_active=True)
+           .values("pk", "updated_at", "similar__computed_at", "similar__car_ids", "place__region").first())
+    if row is None:
+        return None
+    # car:<id> change avec les photos et les favoris ; landings : menus de l'en-tête.
+    # Cartes des annonces similaires (titre, prix, couverture, retrait) : étiquette de chaque
+    # voisin, ou de la région pour la liste de repli (get_similar_cars)
+    neighbours = row["similar__car_ids"]
+    similar = [f"car:{pk}" for pk in neighbours] if neighbours is not None else [f"region:{row['place__region']}"]
+    return page_validators(request, ("car", row["pk"]),
+                           timestamps=(row["updated_at"], row["similar__computed_at"]),
+                           tags=(f"car:{row['pk']}", "landings", *similar))
+
+
+@method_decorator(conditional_page(car_detail_validators), name="dispatch")
 class CarDetailView(DetailView):
     model = Car
     template_name = "cars/car_detail.html"
@@ -138,9 +256,22 @@ class CarDetailView(DetailView):
 
     def get_queryset(self):
         return (Car.objects.filter(is_active=True)
-                .select_related("brand", "model_name", "place", "place__city")  # pas place__region !
+                .select_related("brand", "model_name__brand", "place", "place__city", "similar")  # pas place__region !
                 .prefetch_related("photos"))
 
+    def get_similar_cars(self, car, limit=8):
+        qs = Car.objects.filter(is_active=True).select_related("brand", "model_name__brand", "place__city")
+        try:
+            # Voisins précalculés (compute_similar_cars) : une seule requête par clé primaire
+            ids = car.similar.car_ids
+        except SimilarCars.DoesNotExist:
+            # Annonce pas encore traitée par la commande : même région, plus récentes d'abord
+            return (qs.filter(place__region=car.place.region)
+                    .exclude(pk=car.pk)
+                    .order_by("-created_at")[:limit])
+        found = {str(pk): c for pk, c in qs.in_bulk(ids).items()}
+        return [found[pk] for pk in ids if pk in found][:limit]
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         car = self.object
@@ -155,17 +286,10 @@ class CarDetailView(DetailView):
             display_photos.append(cover)
         display_photos += [p for p in photos if not cover or p.pk != cover.pk]
 
-        similar = (Car.objects
-                   .filter(is_active=True, place__region=car.place.region)
-                   .exclude(pk=car.pk)
-                   .select_related("place", "place__city")
-                   .prefetch_related("photos")
-                   .order_by("-created_at")[:8])
-
         ctx.update({
             "cover": cover,
             "photos": display_photos,
-            "similar_cars": similar,
+            "similar_cars": self.get_similar_cars(car),
         })
         return ctx
 
@@ -178,14 +302,20 @@ def favorite_toggle(request, slug):
     if car.owner_id == request.user.id:
         return HttpResponseBadRequest("Vous ne pouvez pas ajouter votre propre annonce aux favoris.")
 
-    fav, created = Favorite.objects.get_or_create(user=request.user, car=car)
-    if not created:
-        fav.delete()
-        state = "removed"
-    else:
-        state = "added"
-
-    count = car.favorite_links.count()
+    # Favori + compteur (signaux de Favorite, F()) dans une seule transaction
+    with transaction.atomic():
+        deleted, _ = Favorite.objects.filter(user=request.user, car=car).delete()
+        if deleted:
+            state = "removed"
+        else:
+            try:
+                with transaction.atomic():
+                    Favorite.objects.create(user=request.user, car=car)
+            except IntegrityError:
+                # Double clic concurrent : l'autre requête a déjà inséré (et compté) le favori
+                pass
+            state = "added"
+        count = Car.objects.filter(pk=car.pk).values_list("favorite_count", flat=True).get()
 
     # AJAX ?
     if request.headers.get("x-requested-with") == "XMLHttpRequest" or \
@@ -200,9 +330,5 @@ def my_favorites(request):
     cars = (Car.objects
             .filter(favorite_links__user=request.user)
             .select_related("brand", "place__city")
-            .prefetch_related(Prefetch("photos",
-                queryset=CarPhoto.objects.order_by("order", "id"),
-                to_attr="prefetched_photos"))
-            .annotate(favorite_count=Count("favorite_links", distinct=True))
             .order_by("-favorite_links__created_at"))
     return render(request, "cars/account_favorites.html", {"cars": cars})
\ No newline at end of file
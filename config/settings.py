@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'accounts.apps.AccountsConfig',
     'django.contrib.humanize',
     "phonenumber_field",
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'utils.server_timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,7 +55,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates dont les rendus sont chronométrés (en-tête Server-Timing)
+        'BACKEND': 'utils.server_timing.DjangoTemplates',
         'DIRS': [ BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,6 +79,48 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {"default": env.db("DATABASE_URL", default="postgres:///bsdauto")}
 DATABASES["default"]["ATOMIC_REQUESTS"] = True
 
+# Cache partagé entre processus en production (ex. CACHE_URL=rediscache://127.0.0.1:6379/1) ;
+# mémoire locale par défaut. Invalidation par étiquettes : voir cars/cache_tags.py
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://bsd-auto")}
+CACHES["default"].setdefault("KEY_PREFIX", "bsd")
+
+# Déclinaisons des photos (cars/renditions.py) générées dans un thread après l'upload ;
+# False : générées pendant la requête (tests, scripts)
+CAR_RENDITIONS_ASYNC = env.bool("CAR_RENDITIONS_ASYNC", default=True)
+
+# Index bitmap de la recherche (cars/bitmap_index.py) construit et synchronisé dans un thread ;
+# False : pendant la requête qui le demande (tests, banc d'essai)
+CARS_BITMAP_ASYNC = env.bool("CARS_BITMAP_ASYNC", default=True)
+
+# Adresse publique du site : liens absolus hors requête (commande export_cars_feed…)
+SITE_URL = env("SITE_URL", default="http://localhost:8000")
+
+# Instrumentation par requête (utils/server_timing.py) : part des requêtes qui reçoivent l'en-tête
+# Server-Timing et une ligne de journal ; au-delà du seuil (ms), toujours, en WARNING
+SERVER_TIMING_SAMPLE_RATE = env.float("SERVER_TIMING_SAMPLE_RATE", default=0.1)
+SERVER_TIMING_SLOW_MS = env.int("SERVER_TIMING_SLOW_MS", default=1000)
+# L'en-tête expose la durée des requêtes SQL : par défaut, seulement pour le staff et INTERNAL_IPS ;
+# True : pour tous (préproduction). La ligne de journal est écrite dans tous les cas
+SERVER_TIMING_HEADER = env.bool("SERVER_TIMING_HEADER", default=False)
+
+# Requêtes SQL lentes (utils/slow_queries.py) : au-delà du seuil (ms ; 0 pour désactiver), SQL, paramètres,
+# vue et plan EXPLAIN dans un journal local tournant. Rapport : manage.py slow_query_report
+SLOW_QUERY_MS = env.int("SLOW_QUERY_MS", default=200)
+SLOW_QUERY_LOG = env("SLOW_QUERY_LOG", default=str(BASE_DIR / "logs" / "slow_queries.log"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"timing": {"format": "%(asctime)s %(levelname)s %(message)s"}},
+    "handlers": {"timing": {"class": "logging.StreamHandler", "formatter": "timing"}},
+    "loggers": {"utils.server_timing": {"handlers": ["timing"], "level": "INFO", "propagate": False}},
+}
+
+# Normalisation des images à l'upload (utils/images.py) : plus grand côté (px), qualité JPEG
+CAR_PHOTO_MAX_SIDE = env.int("CAR_PHOTO_MAX_SIDE", default=2560)
+PROFILE_IMAGE_MAX_SIDE = env.int("PROFILE_IMAGE_MAX_SIDE", default=512)
+UPLOAD_JPEG_QUALITY = env.int("UPLOAD_JPEG_QUALITY", default=85)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -140,16 +185,32 @@ else:
     AWS_QUERYSTRING_AUTH = False
     AWS_DEFAULT_ACL = None
 
-    # IMPORTANT : domaine régional
-    AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.{AWS_S3_REGION_NAME}.amazonaws.com'
-
-    # Static
-    STATICFILES_STORAGE = 'utils.storages.StaticRootS3Boto3Storage'
-    STATIC_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/static/"
-
-    # Media (uploads utilisateurs)
-    DEFAULT_FILE_STORAGE = 'utils.storages.MediaRootS3Boto3Storage'
-    MEDIA_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/media/"
+    # Client partagé et transferts (utils/storages.py) : pool de connexions, multipart parallèle
+    AWS_S3_MAX_POOL_CONNECTIONS = env.int('AWS_S3_MAX_POOL_CONNECTIONS', default=50)
+    AWS_S3_MULTIPART_THRESHOLD = env.int('AWS_S3_MULTIPART_THRESHOLD', default=8 * 1024 * 1024)
+    AWS_S3_MULTIPART_CHUNKSIZE = env.int('AWS_S3_MULTIPART_CHUNKSIZE', default=8 * 1024 * 1024)
+    AWS_S3_MAX_CONCURRENCY = env.int('AWS_S3_MAX_CONCURRENCY', default=10)
+    AWS_S3_SAVE_MANY_WORKERS = env.int('AWS_S3_SAVE_MANY_WORKERS', default=6)
+
+    # S3 local (MinIO…) pour tester les uploads présignés : ex. AWS_S3_ENDPOINT_URL=http://127.0.0.1:9000
+    AWS_S3_ENDPOINT_URL = env('AWS_S3_ENDPOINT_URL', default=None)
+
+    # IMPORTANT : domaine régional (ou bucket du S3 local, adressé par chemin)
+    if AWS_S3_ENDPOINT_URL:
+        AWS_S3_URL_PROTOCOL, _endpoint = AWS_S3_ENDPOINT_URL.rstrip('/').split('//', 1)
+        AWS_S3_CUSTOM_DOMAIN = f'{_endpoint}/{AWS_STORAGE_BUCKET_NAME}'
+    else:
+        AWS_S3_URL_PROTOCOL = 'https:'
+        AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.{AWS_S3_REGION_NAME}.amazonaws.com'
+
+    # Static et media (uploads utilisateurs) ; STORAGES remplace STATICFILES_STORAGE /
+    # DEFAULT_FILE_STORAGE, ignorés depuis Django 5.1
+    STORAGES = {
+        "default": {"BACKEND": "utils.storages.MediaRootS3Boto3Storage"},
+        "staticfiles": {"BACKEND": "utils.storages.StaticRootS3Boto3Storage"},
+    }
+    STATIC_URL = f"{AWS_S3_URL_PROTOCOL}//{AWS_S3_CUSTOM_DOMAIN}/static/"
+    MEDIA_URL = f"{AWS_S3_URL_PROTOCOL}//{AWS_S3_CUSTOM_DOMAIN}/media/"
 
 
 # Default primary key field type
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PagesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pages'
+
+    def ready(self):
+        # Branche les signaux : appartenance des annonces aux landing pages
+        from . import landing_members  # noqa: F401
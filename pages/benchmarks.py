@@ -0,0 +1,236 @@
+# pages/benchmarks.py
+"""
+Banc d'essai des vues les plus fréquentées : nombre de requêtes SQL et durée,
+sur un jeu de données synthétique reproductible (cars/synthetic.py).
+
+Chaque scénario est joué une fois pour chauffer le processus (index bitmap,
+gabarits compilés), puis `repeat` fois, cache vidé avant chaque requête : on
+mesure le chemin le plus cher, celui où un N+1 dans un gabarit se voit. Le
+nombre de requêtes ne doit pas dépasser le budget du scénario ; un budget
+dépassé signale une requête par carte, par photo ou par favori.
+
+- Tests : cars/tests.py, pages/tests.py et accounts/tests.py font respecter
+  les budgets (manage.py test), sur QueryBudgetTestCase.
+- Commande run_benchmarks : écrit un fichier de résultats JSON et le compare
+  à celui d'un autre commit (--compare).
+
+Les mesures se font sur un cache local au processus (MEASURE_CACHES) : vider
+le cache entre deux tours ne touche jamais le cache partagé de l'instance.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from cars.bitmap_index import car_index
+from cars.models import Car, CarPhoto, City, Favorite
+from cars.synthetic import DatasetGenerator
+from .models import LandingKind, LandingPage
+
+SEED = 42
+REPEAT = 5
+# Écart de durée médiane signalé par la comparaison (20 %)
+TIME_TOLERANCE = 0.2
+# Contrôle de transaction : compté par SQLite, implicite avec psycopg ; exclu des budgets
+TRANSACTION_SQL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+MEASURE_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class Scenario:
+    """Une vue, la requête qui l'appelle et son budget de requêtes SQL."""
+
+    def __init__(self, name, budget, url, method="get", user=None, data=None, status=(200,)):
+        self.name, self.budget = name, budget
+        self.url, self.method, self.user, self.data, self.status = url, method, user, data, status
+
+    def request(self, subjects):
+        """(méthode, URL, données) ; `url` reçoit les sujets choisis dans les données."""
+        data = self.data(subjects) if callable(self.data) else self.data
+        return self.method, self.url(subjects), data
+
+
+# Ordre d'exécution et du fichier de résultats. `user` : compte connecté (voir pick_subjects)
+SCENARIOS = {s.name: s for s in [
+    Scenario("home", 6, lambda s: reverse("home"), user="viewer"),
+    Scenario("car_list", 6, lambda s: reverse("cars_list"), user="viewer"),
+    Scenario("car_detail", 10, lambda s: s["car"].get_absolute_url(), user="viewer"),
+    Scenario("landing_page", 9, lambda s: s["landing"].get_absolute_url(), user="viewer"),
+    Scenario("my_favorites", 5, lambda s: reverse("my_favorites"), user="viewer"),
+    Scenario("account_profile", 6, lambda s: reverse("account_profile"), user="owner"),
+    Scenario("favorite_toggle", 7, lambda s: reverse("favorite_toggle", kwargs={"slug": s["toggle"].slug}),
+             method="post", user="viewer", status=(302,)),
+    Scenario("car_search_context", 5, lambda s: reverse("cars_search"), user="viewer",
+             data={"region": "Dakar", "body_type": "suv"}),
+]}
+
+
+# ---------- Données ----------
+def seed_dataset(cars, users=None, favorites=None, photos=None, seed=SEED):
+    """Jeu synthétique (proportions de generate_dataset) et une landing page par type."""
+    DatasetGenerator(cars, users if users is not None else max(1, cars // 5),
+                     favorites if favorites is not None else cars * 5,
+                     photos if photos is not None else cars * 4, seed=seed).run()
+    # Après les annonces : l'enregistrement d'une page remplit sa liste (pages/landing_members.py)
+    LandingPage.objects.create(kind=LandingKind.DESTINATION, title="Location voiture Dakar",
+                               city=City.objects.get(name="Dakar"), position=1)
+    LandingPage.objects.create(kind=LandingKind.REGION, title="Location voiture région de Thiès",
+                               region="Thiès", position=2)
+    LandingPage.objects.create(kind=LandingKind.CATEGORY, title="Location SUV", body_type="suv", position=3)
+    LandingPage.objects.create(kind=LandingKind.STATIC, title="Conditions de location", position=4)
+
+
+def dataset_scale():
+    """Volumes en base, consignés avec les résultats : deux fichiers ne se comparent qu'à volumes égaux."""
+    return {
+        "cars": Car.objects.count(),
+        "users": get_user_model().objects.count(),
+        "favorites": Favorite.objects.count(),
+        "photos": CarPhoto.objects.count(),
+    }
+
+
+def pick_subjects():
+    """Les objets les plus chargés : le pire cas de chaque vue, toujours le même à graine égale."""
+    User = get_user_model()
+    viewer = User.objects.annotate(n=Count("favorite_links")).order_by("-n", "pk").first()
+    owner = User.objects.annotate(n=Count("cars")).order_by("-n", "pk").first()
+    active = Car.objects.filter(is_active=True)
+    car = active.annotate(n=Count("photos")).order_by("-n", "pk").first()
+    landing = (LandingPage.objects.filter(is_active=True).exclude(kind=LandingKind.STATIC)
+               .annotate(n=Count("members")).order_by("-n", "pk").first())
+    toggle = active.exclude(owner=viewer).order_by("pk").first()
+    if None in (viewer, owner, car, landing, toggle):
+        raise BenchmarkError("Données insuffisantes : lancez generate_dataset (ou seed_dataset) d'abord.")
+    return {"viewer": viewer, "owner": owner, "car": car, "landing": landing, "toggle": toggle}
+
+
+# ---------- Mesure ----------
+def measure(scenario, subjects, repeat=REPEAT):
+    """Joue le scénario ; renvoie requêtes (max des tours), durées et respect du budget."""
+    method, url, data = scenario.request(subjects)
+    queries, timings = [], []
+    # Cache local : cache.clear() ne vide pas le cache partagé (Redis…) de l'instance mesurée.
+    # Index bitmap construit pendant le tour de chauffe, pas en arrière-plan : prêt pour les tours mesurés
+    with override_settings(CACHES=MEASURE_CACHES, CARS_BITMAP_ASYNC=False):
+        client = Client()
+        if scenario.user:
+            client.force_login(subjects[scenario.user])
+        for run in range(repeat + 1):
+            cache.clear()
+            # Pas d'échantillonnage Server-Timing : aucune ligne de journal par mesure
+            with CaptureQueriesContext(connection) as captured, override_settings(SERVER_TIMING_SAMPLE_RATE=0):
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                elapsed = time.perf_counter() - started
+            if response.status_code not in scenario.status:
+                raise BenchmarkError(f"{scenario.name} : réponse {response.status_code} pour {url}.")
+            sql = [q["sql"] for q in captured.captured_queries if not q["sql"].upper().startswith(TRANSACTION_SQL)]
+            if run:     # tour 0 : chauffe
+                queries.append(len(sql))
+                timings.append(elapsed * 1000)
+    return {
+        "url": url,
+        "queries": max(queries),
+        "budget": scenario.budget,
+        "within_budget": max(queries) <= scenario.budget,
+        "median_ms": round(statistics.median(timings), 2),
+        "min_ms": round(min(timings), 2),
+        "max_ms": round(max(timings), 2),
+        # Requêtes du dernier tour, pour le message d'un budget dépassé (hors fichier de résultats)
+        "sql": sql,
+    }
+
+
+def run_benchmarks(names=None, repeat=REPEAT, report=None):
+    """Mesure les scénarios demandés (tous par défaut) sur les données en base."""
+    subjects = pick_subjects()
+    results = {}
+    for name in names or SCENARIOS:
+        results[name] = measure(SCENARIOS[name], subjects, repeat)
+        if report:
+            report(name, results[name])
+    return results
+
+
+class QueryBudgetTestCase(TestCase):
+    """Base des tests de budget : jeu synthétique partagé par la classe, un test par scénario."""
+    scale = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(cls.scale)
+        cls.subjects = pick_subjects()
+        # Index bitmap du processus : peut dater d'une autre classe de tests
+        car_index.schedule_rebuild()
+
+    def assertWithinBudget(self, name):
+        result = measure(SCENARIOS[name], self.subjects, repeat=2)
+        self.assertLessEqual(result["queries"], result["budget"], "{} : {} requêtes pour un budget de {}.\n{}".format(
+            name, result["queries"], result["budget"], "\n".join(result["sql"])))
+
+
+# ---------- Fichier de résultats ----------
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def results_document(results, scale, repeat=REPEAT):
+    """Contenu du fichier : contexte (commit, base, volumes) et mesures par scénario."""
+    return {
+        "commit": _commit(),
+        "generated_at": datetime.now(dt_timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "scale": scale,
+        "repeat": repeat,
+        "scenarios": {name: {k: v for k, v in result.items() if k != "sql"} for name, result in results.items()},
+    }
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_results(document, path):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(document, fh, indent=1, ensure_ascii=False)
+        fh.write("\n")
+
+
+def compare(old, new, tolerance=TIME_TOLERANCE):
+    """
+    Lignes (scénario, requêtes avant, après, médiane avant, après, écart relatif, régression ?)
+    pour les scénarios présents dans les deux fichiers.
+    """
+    rows = []
+    for name, result in new["scenarios"].items():
+        before = old["scenarios"].get(name)
+        if before is None:
+            continue
+        delta = (result["median_ms"] - before["median_ms"]) / before["median_ms"] if before["median_ms"] else 0
+        regression = result["queries"] > before["queries"] or delta > tolerance
+        rows.append((name, before["queries"], result["queries"], before["median_ms"], result["median_ms"],
+                     delta, regression))
+    return rows
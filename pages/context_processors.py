@@ -1,7 +1,23 @@
 # pages/context_processors.py
+"""
+Navigation des landing pages pour tous les templates.
+
+Les listes sont gardées en mémoire dans chaque processus et rechargées
+seulement quand la version partagée de l'étiquette "landings" change
+(enregistrement / suppression d'une LandingPage, voir cars.cache_tags).
+Les variables lp_* sont paresseuses : un template qui ne les utilise pas
+(admin, redirections AJAX, 404…) ne coûte ni requête ni accès au cache.
+"""
+from django.utils.functional import SimpleLazyObject
+
+from cars.cache_tags import tag_versions
 from .models import LandingPage, LandingKind
 
-def landing(request):
+# (version, groupes) : remplacé d'un bloc, donc sans verrou
+_navigation = (None, None)
+
+
+def _load():
     pages = list(
         LandingPage.objects
         .filter(is_active=True)
@@ -14,3 +30,22 @@ def landing(request):
         "lp_categories":   [p for p in pages if p.kind == LandingKind.CATEGORY],
         "lp_static":       [p for p in pages if p.kind == LandingKind.STATIC],
     }
+
+
+def landing_navigation():
+    global _navigation
+    version = tag_versions(["landings"])["landings"]
+    cached_version, groups = _navigation
+    if groups is None or cached_version != version:
+        groups = _load()
+        _navigation = (version, groups)
+    return groups
+
+
+def landing(request):
+    # Une seule résolution par requête, partagée par les quatre variables
+    groups = SimpleLazyObject(landing_navigation)
+    return {
+        name: SimpleLazyObject(lambda name=name: groups[name])
+        for name in ("lp_destinations", "lp_regions", "lp_categories", "lp_static")
+    }
@@ -1,8 +1,21 @@
 from django import forms
-from cars.models import BodyType, SenegalRegion
+from cars.models import BodyType, SenegalRegion, FuelType, Transmission, CarSeat, CarYear, CarFeature
+from cars.facets import PRICE_BUCKETS, MILEAGE_BUCKETS
+from cars.geo import RADIUS_CHOICES
 
 
 class CarSearchForm(forms.Form):
+    q = forms.CharField(
+        label="Recherche",
+        required=False,
+        max_length=100,
+        widget=forms.TextInput(attrs={
+            "class": "form-control form-control-xl",
+            "placeholder": "Marque, modèle, ville…",
+            "aria-label": "Recherche",
+            "type": "search",
+        }),
+    )
     body_type = forms.ChoiceField(
         label="Catégorie",
         required=False,
@@ -24,4 +37,60 @@ class CarSearchForm(forms.Form):
             "aria-label": "Région",
             "data-bs-theme": "light",
         }),
-    )
\ No newline at end of file
+    )
+    fuel_type = forms.ChoiceField(
+        label="Carburant",
+        required=False,
+        choices=[("", "Carburant")] + list(FuelType.choices),
+        widget=forms.Select(attrs={"class": "form-select", "aria-label": "Carburant"}),
+    )
+    transmission = forms.ChoiceField(
+        label="Boîte",
+        required=False,
+        choices=[("", "Boîte")] + list(Transmission.choices),
+        widget=forms.Select(attrs={"class": "form-select", "aria-label": "Boîte"}),
+    )
+    seats = forms.ChoiceField(
+        label="Places",
+        required=False,
+        choices=[("", "Places")] + list(CarSeat.choices),
+        widget=forms.Select(attrs={"class": "form-select", "aria-label": "Places"}),
+    )
+    year = forms.TypedChoiceField(
+        label="Année",
+        required=False,
+        coerce=int,
+        empty_value=None,
+        choices=[("", "Année")] + list(CarYear.choices),
+        widget=forms.Select(attrs={"class": "form-select", "aria-label": "Année"}),
+    )
+    price = forms.ChoiceField(
+        label="Prix / jour",
+        required=False,
+        choices=[("", "Prix / jour")] + [(key, label) for key, label, _, _ in PRICE_BUCKETS],
+        widget=forms.Select(attrs={"class": "form-select", "aria-label": "Prix / jour"}),
+    )
+    mileage = forms.ChoiceField(
+        label="Kilométrage",
+        required=False,
+        choices=[("", "Kilométrage")] + [(key, label) for key, label, _, _ in MILEAGE_BUCKETS],
+        widget=forms.Select(attrs={"class": "form-select", "aria-label": "Kilométrage"}),
+    )
+    features = forms.ModelMultipleChoiceField(
+        label="Options",
+        required=False,
+        queryset=CarFeature.objects.order_by("name"),
+        to_field_name="slug",
+        widget=forms.CheckboxSelectMultiple(attrs={"class": "form-check-input"}),
+    )
+    # « Autour de moi » : position du navigateur + rayon (cars.geo)
+    lat = forms.FloatField(required=False, min_value=-90, max_value=90, widget=forms.HiddenInput)
+    lng = forms.FloatField(required=False, min_value=-180, max_value=180, widget=forms.HiddenInput)
+    radius = forms.TypedChoiceField(
+        label="Rayon",
+        required=False,
+        coerce=int,
+        empty_value=None,
+        choices=[("", "Rayon")] + RADIUS_CHOICES,
+        widget=forms.HiddenInput,
+    )
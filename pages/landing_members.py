@@ -0,0 +1,157 @@
+# pages/landing_members.py
+"""
+Table d'appartenance landing page → annonces (LandingPageCar).
+
+Afficher une landing page revient à lire une plage de l'index
+(landing, -car_created_at, -car) au lieu de filtrer toute la table des
+voitures ; le total affiché est LandingPage.member_count. La table et le total
+sont tenus à jour par les signaux :
+- Car : ajout / retrait quand is_active, place ou body_type change, et à la
+  suppression ;
+- Place : les voitures du lieu sont recalculées (ville ou région modifiée) ;
+- LandingPage : la page est reconstruite quand sa cible change.
+La commande rebuild_landing_members reconstruit tout.
+"""
+from collections import Counter
+
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.signals import post_save, pre_delete, pre_save
+
+from cars.models import Car, Place
+from .models import LandingPage, LandingPageCar, LandingKind
+
+BATCH_SIZE = 1000
+TARGET_FIELDS = ("kind", "city_id", "region", "body_type")
+
+
+def landing_filter(page):
+    """Filtre Car correspondant à la page, ou None (page statique ou incomplète)."""
+    if page.kind == LandingKind.DESTINATION and page.city_id:
+        return Q(place__city_id=page.city_id)
+    if page.kind == LandingKind.REGION and page.region:
+        return Q(place__region=page.region)
+    if page.kind == LandingKind.CATEGORY and page.body_type:
+        return Q(body_type=page.body_type)
+    return None
+
+
+def _matches(page, car):
+    if page["kind"] == LandingKind.DESTINATION:
+        return page["city_id"] is not None and page["city_id"] == car["place__city_id"]
+    if page["kind"] == LandingKind.REGION:
+        return page["region"] is not None and page["region"] == car["place__region"]
+    if page["kind"] == LandingKind.CATEGORY:
+        return page["body_type"] is not None and page["body_type"] == car["body_type"]
+    return False
+
+
+def _add_counts(deltas):
+    """member_count += delta pour chaque page de `deltas` ({pk: delta}), en une requête."""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if deltas:
+        LandingPage.objects.filter(pk__in=deltas).update(member_count=F("member_count") + Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()], output_field=IntegerField()))
+
+
+def _set_count(page, total):
+    # update() : ni updated_at ni signaux de LandingPage (la page elle-même ne change pas)
+    LandingPage.objects.filter(pk=page.pk).update(member_count=total)
+    page.member_count = total
+    return total
+
+
+def rebuild_landing(page):
+    """Recalcule toutes les annonces d'une page."""
+    LandingPageCar.objects.filter(landing=page).delete()
+    q = landing_filter(page)
+    if q is None:
+        return _set_count(page, 0)
+    cars = Car.objects.filter(q, is_active=True).values_list("pk", "created_at").order_by().iterator(chunk_size=BATCH_SIZE)
+    batch, total = [], 0
+    for car_id, created_at in cars:
+        batch.append(LandingPageCar(landing=page, car_id=car_id, car_created_at=created_at))
+        if len(batch) >= BATCH_SIZE:
+            LandingPageCar.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    LandingPageCar.objects.bulk_create(batch)
+    return _set_count(page, total + len(batch))
+
+
+def sync_cars(car_ids):
+    """Ajoute / retire ces voitures des pages auxquelles elles appartiennent désormais."""
+    car_ids = list(car_ids)
+    if not car_ids:
+        return
+    pages = list(LandingPage.objects.exclude(kind=LandingKind.STATIC).values("pk", *TARGET_FIELDS))
+    deltas = Counter()
+    for start in range(0, len(car_ids), BATCH_SIZE):
+        chunk = car_ids[start:start + BATCH_SIZE]
+        cars = Car.objects.filter(pk__in=chunk).values(
+            "pk", "is_active", "created_at", "body_type", "place__city_id", "place__region")
+        wanted = {}
+        for car in cars:
+            if car["is_active"]:
+                for page in pages:
+                    if _matches(page, car):
+                        wanted[(page["pk"], car["pk"])] = car["created_at"]
+        existing = set(LandingPageCar.objects.filter(car_id__in=chunk).values_list("landing_id", "car_id"))
+        stale = existing - wanted.keys()
+        if stale:
+            q = Q()
+            for landing_id, car_id in stale:
+                q |= Q(landing_id=landing_id, car_id=car_id)
+            LandingPageCar.objects.filter(q).delete()
+            deltas.subtract(landing_id for landing_id, _ in stale)
+        added = wanted.keys() - existing
+        LandingPageCar.objects.bulk_create(
+            [LandingPageCar(landing_id=landing_id, car_id=car_id, car_created_at=wanted[(landing_id, car_id)])
+             for landing_id, car_id in added],
+            ignore_conflicts=True,
+        )
+        deltas.update(landing_id for landing_id, _ in added)
+    _add_counts(deltas)
+
+
+# ---------- Signaux ----------
+def car_pre_save_receiver(sender, instance, raw=False, **kwargs):
+    instance._landing_dirty = True
+    if not raw and not instance._state.adding:
+        old = Car.objects.filter(pk=instance.pk).values_list("is_active", "place_id", "body_type").first()
+        instance._landing_dirty = old != (instance.is_active, instance.place_id, instance.body_type)
+
+
+def car_post_save_receiver(sender, instance, raw=False, **kwargs):
+    if not raw and getattr(instance, "_landing_dirty", True):
+        sync_cars([instance.pk])
+
+
+def car_pre_delete_receiver(sender, instance, **kwargs):
+    # Les lignes d'appartenance partent en cascade, sans passer par sync_cars
+    landing_ids = LandingPageCar.objects.filter(car=instance).values_list("landing_id", flat=True)
+    _add_counts({landing_id: -1 for landing_id in landing_ids})
+
+
+def place_post_save_receiver(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        sync_cars(Car.objects.filter(place=instance).values_list("pk", flat=True))
+
+
+def landingpage_pre_save_receiver(sender, instance, raw=False, **kwargs):
+    instance._landing_target_changed = True
+    if not raw and not instance._state.adding:
+        old = LandingPage.objects.filter(pk=instance.pk).values_list(*TARGET_FIELDS).first()
+        instance._landing_target_changed = old != tuple(getattr(instance, f) for f in TARGET_FIELDS)
+
+
+def landingpage_post_save_receiver(sender, instance, raw=False, **kwargs):
+    if not raw and getattr(instance, "_landing_target_changed", True):
+        rebuild_landing(instance)
+
+
+pre_save.connect(car_pre_save_receiver, sender=Car)
+post_save.connect(car_post_save_receiver, sender=Car)
+pre_delete.connect(car_pre_delete_receiver, sender=Car)
+post_save.connect(place_post_save_receiver, sender=Place)
+pre_save.connect(landingpage_pre_save_receiver, sender=LandingPage)
+post_save.connect(landingpage_post_save_receiver, sender=LandingPage)
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pages.sitemaps import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = "Met à jour le plan du site (sitemap.xml) : seuls les fragments dont les annonces ont changé sont réécrits."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Réécrit tous les fragments.")
+        parser.add_argument("--base-url", help="Préfixe des liens (défaut : SITE_URL).")
+
+    def handle(self, *args, **o):
+        started = time.monotonic()
+        rebuilt = []
+
+        def log(name, regenerated):
+            if regenerated:
+                rebuilt.append(name)
+            if self.verbosity > 1 or regenerated:
+                self.stdout.write(f"{name} : {'régénéré' if regenerated else 'inchangé'}")
+
+        self.verbosity = o["verbosity"]
+        manifest = build_sitemaps(force=o["force"], base_url=o["base_url"], log=log)
+        urls = sum(shard["signature"][0] for shard in manifest["shards"].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(manifest['shards'])} fragment(s), {len(rebuilt)} régénéré(s), "
+            f"{urls} URL en {time.monotonic() - started:.1f} s."
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from pages.landing_members import rebuild_landing
+from pages.models import LandingPage, LandingKind
+
+
+class Command(BaseCommand):
+    help = "Reconstruit la table d'appartenance landing page → annonces (toutes les pages ou celles indiquées)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("slugs", nargs="*", help="Slugs des pages à reconstruire (toutes par défaut).")
+
+    def handle(self, *args, **o):
+        pages = LandingPage.objects.exclude(kind=LandingKind.STATIC)
+        if o["slugs"]:
+            pages = pages.filter(slug__in=o["slugs"])
+        for page in pages:
+            count = rebuild_landing(page)
+            self.stdout.write(f"{page.slug} : {count} annonce(s)")
+        self.stdout.write(self.style.SUCCESS("Appartenances reconstruites."))
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from pages.benchmarks import (REPEAT, SCENARIOS, SEED, TIME_TOLERANCE, BenchmarkError, compare, dataset_scale,
+                              load_results, results_document, run_benchmarks, save_results, seed_dataset)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure requêtes SQL et durée des vues les plus fréquentées, sur une base de test remplie "
+        "de données synthétiques, et écrit les résultats en JSON. Pour comparer deux commits : "
+        "--output avant.json sur l'un, --compare avant.json sur l'autre."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="benchmarks.json", help="Fichier de résultats. Défaut : benchmarks.json.")
+        parser.add_argument("--compare", help="Résultats d'un autre commit à comparer.")
+        parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                            help="Scénario à mesurer (répétable). Défaut : tous.")
+        parser.add_argument("--repeat", type=int, default=REPEAT, help=f"Mesures par scénario. Défaut : {REPEAT}.")
+        parser.add_argument("--cars", type=int, default=2000,
+                            help="Annonces générées dans la base de test. Défaut : 2000.")
+        parser.add_argument("--seed", type=int, default=SEED, help=f"Défaut : {SEED}.")
+        parser.add_argument("--current-db", action="store_true",
+                            help="Mesure sur la base configurée (ex. après generate_dataset) au lieu d'une base de test.")
+        parser.add_argument("--tolerance", type=float, default=TIME_TOLERANCE,
+                            help=f"Écart de durée médiane signalé par --compare. Défaut : {TIME_TOLERANCE}.")
+
+    def handle(self, *args, **o):
+        previous = load_results(o["compare"]) if o["compare"] else None
+        setup_test_environment()
+        test_db = None
+        try:
+            if not o["current_db"]:
+                test_db = connection.settings_dict["NAME"]
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                self.stdout.write(f"Génération de {o['cars']} annonces (graine {o['seed']})…")
+                seed_dataset(o["cars"], seed=o["seed"])
+            # Tout est annulé à la fin : favorite_toggle ne laisse aucune trace, même sur --current-db
+            with transaction.atomic():
+                results = run_benchmarks(o["scenario"], o["repeat"], report=self.report)
+                scale = dataset_scale()
+                transaction.set_rollback(True)
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+        finally:
+            if test_db is not None:
+                connection.creation.destroy_test_db(test_db, verbosity=0)
+            teardown_test_environment()
+
+        document = results_document(results, scale, o["repeat"])
+        save_results(document, o["output"])
+        self.stdout.write(f"Résultats : {o['output']}")
+        if previous:
+            self.compare(previous, document, o["tolerance"])
+
+        over = [name for name, result in results.items() if not result["within_budget"]]
+        if over:
+            raise CommandError(f"Budget de requêtes dépassé : {', '.join(over)}.")
+
+    def report(self, name, result):
+        line = (f"{name:<20} {result['queries']:>3}/{result['budget']:<3} requêtes  "
+                f"médiane {result['median_ms']:8.2f} ms  (min {result['min_ms']:.2f})")
+        self.stdout.write(line if result["within_budget"] else self.style.ERROR(line))
+
+    def compare(self, old, new, tolerance):
+        self.stdout.write(f"Comparaison avec {old.get('commit') or '?'} ({old.get('database')}, {old.get('scale')}) :")
+        for name, q_old, q_new, t_old, t_new, delta, regression in compare(old, new, tolerance):
+            line = f"{name:<20} requêtes {q_old:>3} → {q_new:<3}  médiane {t_old:8.2f} → {t_new:8.2f} ms ({delta:+.0%})"
+            self.stdout.write(self.style.WARNING(line) if regression else line)
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from utils.slow_queries import SLOW_QUERY_LOG, aggregate, log_files, read_log
+
+ORDERS = {
+    "total": "total_ms",
+    "count": "count",
+    "mean": "mean_ms",
+    "max": "max_ms",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Rapport des requêtes SQL lentes (journal de utils/slow_queries.py) : les N requêtes "
+        "normalisées les plus coûteuses, avec leurs vues d'origine et leur plan d'exécution."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20, help="Nombre de requêtes affichées. Défaut : 20.")
+        parser.add_argument("--order", choices=sorted(ORDERS), default="total",
+                            help="Classement : durée cumulée (défaut), occurrences, moyenne ou maximum.")
+        parser.add_argument("--since", help="Depuis une date ISO 8601, ou une durée en heures (ex. 24h).")
+        parser.add_argument("--view", help="Seulement les requêtes venues de cette vue (nom d'URL).")
+        parser.add_argument("--log", default=SLOW_QUERY_LOG, help=f"Journal à lire. Défaut : {SLOW_QUERY_LOG}.")
+        parser.add_argument("--no-plans", action="store_true", help="N'affiche pas les plans d'exécution.")
+
+    def handle(self, *args, **o):
+        self.verbosity = o["verbosity"]
+        since = self.parse_since(o["since"])
+        paths = log_files(o["log"])
+        if not paths:
+            raise CommandError(f"Aucun journal : {o['log']} (SLOW_QUERY_MS est-il activé ?).")
+
+        records = read_log(paths, since)
+        if o["view"]:
+            records = (r for r in records if r["view"] == o["view"])
+        groups = aggregate(records)
+        groups.sort(key=lambda g: g[ORDERS[o["order"]]], reverse=True)
+        total = sum(g["total_ms"] for g in groups)
+        self.stdout.write(f"{sum(g['count'] for g in groups)} requêtes lentes, {len(groups)} empreintes, "
+                          f"{total / 1000:.1f} s au total ({len(paths)} fichier(s)).")
+
+        for rank, group in enumerate(groups[:o["top"]], 1):
+            views = ", ".join(f"{view} ×{n}" for view, n in
+                              sorted(group["views"].items(), key=lambda item: item[1], reverse=True)[:3])
+            self.stdout.write("")
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{rank} {group['fingerprint']}  {group['count']} fois, cumul {group['total_ms'] / 1000:.1f} s "
+                f"({group['total_ms'] / (total or 1):.0%}), moyenne {group['mean_ms']:.0f} ms, "
+                f"p95 {group['p95_ms']:.0f} ms, max {group['max_ms']:.0f} ms"
+            ))
+            self.stdout.write(f"  Vues : {views}  — dernière : {group['last_at']}")
+            sql = group["normalized"]
+            if self.verbosity < 2 and len(sql) > 400:
+                sql = sql[:400] + "…"
+            self.stdout.write(f"  {sql}")
+            if self.verbosity >= 2:
+                self.stdout.write(f"  Paramètres (occurrence la plus lente) : {group['example']['params']}")
+            if not o["no_plans"]:
+                for line in group["plan"] or ["(pas de plan)"]:
+                    self.stdout.write(f"    {line}")
+
+    def parse_since(self, value):
+        if not value:
+            return None
+        if value.endswith("h") and value[:-1].isdigit():
+            return timezone.now() - timedelta(hours=int(value[:-1]))
+        try:
+            since = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError("--since : date ISO 8601 ou durée en heures (ex. 24h) attendue.")
+        return since if timezone.is_aware(since) else timezone.make_aware(since)
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_members(apps, schema_editor):
+    LandingPage = apps.get_model("pages", "LandingPage")
+    LandingPageCar = apps.get_model("pages", "LandingPageCar")
+    Car = apps.get_model("cars", "Car")
+    for page in LandingPage.objects.exclude(kind="STATIC"):
+        if page.kind == "DESTINATION" and page.city_id:
+            cars = Car.objects.filter(place__city_id=page.city_id)
+        elif page.kind == "REGION" and page.region:
+            cars = Car.objects.filter(place__region=page.region)
+        elif page.kind == "CATEGORY" and page.body_type:
+            cars = Car.objects.filter(body_type=page.body_type)
+        else:
+            continue
+        rows = cars.filter(is_active=True).values_list("pk", "created_at").order_by()
+        # Par lots, comme rebuild_landing : la mémoire ne dépend pas du nombre d'annonces
+        batch = []
+        for car_id, created_at in rows.iterator(chunk_size=BATCH_SIZE):
+            batch.append(LandingPageCar(landing=page, car_id=car_id, car_created_at=created_at))
+            if len(batch) >= BATCH_SIZE:
+                LandingPageCar.objects.bulk_create(batch)
+                batch = []
+        LandingPageCar.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0020_car_favorite_count'),
+        ('pages', '0002_alter_landingpage_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LandingPageCar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('car_created_at', models.DateTimeField()),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='landing_members', to='cars.car')),
+                ('landing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='pages.landingpage')),
+            ],
+            options={
+                'verbose_name': 'Annonce de landing page',
+                'verbose_name_plural': 'Annonces de landing page',
+                'indexes': [models.Index(fields=['landing', '-car_created_at', '-car'], name='landing_member_order_idx')],
+                'constraints': [models.UniqueConstraint(fields=('landing', 'car'), name='uniq_landing_car')],
+            },
+        ),
+        migrations.RunPython(backfill_members, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    LandingPage = apps.get_model("pages", "LandingPage")
+    LandingPageCar = apps.get_model("pages", "LandingPageCar")
+    counts = (LandingPageCar.objects.filter(landing=OuterRef("pk")).order_by()
+              .values("landing").annotate(n=Count("pk")).values("n"))
+    LandingPage.objects.update(member_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0003_landingpagecar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='landingpage',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,13 @@
 import uuid
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.signals import post_save, post_delete
 from django.urls import reverse
 from django.utils.text import slugify
 from django_ckeditor_5.fields import CKEditor5Field
 
-from cars.models import City, SenegalRegion, BodyType
+from cars.cache_tags import bump_tags
+from cars.models import Car, City, SenegalRegion, BodyType
 
 
 class LandingKind(models.TextChoices):
@@ -46,6 +48,8 @@ class LandingPage(models.Model):
     is_active = models.BooleanField(default=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Nombre de LandingPageCar, tenu par pages.landing_members : pas de COUNT à l'affichage
+    member_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["position", "title"]
@@ -107,3 +111,33 @@ class LandingPage(models.Model):
 
     def get_absolute_url(self):
         return reverse("landing_page", kwargs={"slug": self.slug})
+
+
+class LandingPageCar(models.Model):
+    """Annonces actives d'une landing page, maintenues par pages.landing_members."""
+    landing = models.ForeignKey(LandingPage, on_delete=models.CASCADE, related_name="members")
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name="landing_members")
+    car_created_at = models.DateTimeField()     # copie de Car.created_at : tri sans jointure
+
+    class Meta:
+        verbose_name = "Annonce de landing page"
+        verbose_name_plural = "Annonces de landing page"
+        constraints = [
+            models.UniqueConstraint(fields=["landing", "car"], name="uniq_landing_car"),
+        ]
+        indexes = [
+            # Une page de résultats = un parcours de cet index
+            models.Index(fields=["landing", "-car_created_at", "-car"], name="landing_member_order_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.landing_id} → {self.car_id}"
+
+
+def landingpage_changed_receiver(sender, instance, **kwargs):
+    # Page elle-même + navigation (menus des landing pages)
+    bump_tags("landings", f"landing:{instance.slug}")
+
+
+post_save.connect(landingpage_changed_receiver, sender=LandingPage)
+post_delete.connect(landingpage_changed_receiver, sender=LandingPage)
@@ -0,0 +1,201 @@
+# pages/sitemaps.py
+"""
+Plan du site (sitemaps.org) : un index et des fragments gzip d'au plus 50 000 URL,
+générés hors requête (commande build_sitemaps) et stockés déjà compressés.
+
+- "landings" : l'accueil et les landing pages actives ;
+- "cars-<n>" : les annonces actives, réparties par plage de clé primaire. Les
+  UUID v4 sont uniformes : chaque plage reçoit environ SHARD_TARGET annonces et
+  une annonce reste dans le même fragment tant que leur nombre ne change pas.
+
+Pour chaque fragment, une requête d'agrégat (nombre, max(updated_at)) sur sa
+plage donne une signature ; seuls les fragments dont la signature a changé sont
+relus (en flux, .iterator()) et réécrits. Les fichiers portent l'empreinte de
+leur contenu (sitemaps/cars-3-<empreinte>.xml.gz) ; le manifeste
+sitemaps/manifest.json dit lesquels sont en service. Les vues les servent tels
+quels, depuis le cache.
+"""
+import gzip
+import hashlib
+import json
+import math
+import tempfile
+import uuid
+from urllib.parse import urljoin
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils import timezone
+
+from cars.models import Car
+from .models import LandingPage
+
+MAX_URLS = 50000              # limite du protocole par fichier
+SHARD_TARGET = 40000          # remplissage visé : marge pour les écarts de répartition
+CHUNK_SIZE = 2000
+DIRECTORY = "sitemaps"
+MANIFEST_NAME = f"{DIRECTORY}/manifest.json"
+MANIFEST_CACHE_KEY = "sitemap:manifest"
+MANIFEST_CACHE_TIMEOUT = 300
+SPOOL_MAX_SIZE = 4 * 1024 * 1024
+XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+# ---------- Manifeste ----------
+def load_manifest():
+    """Manifeste en service (cache, sinon stockage), ou None si rien n'a encore été généré."""
+    manifest = cache.get(MANIFEST_CACHE_KEY)
+    if manifest is None:
+        if not default_storage.exists(MANIFEST_NAME):
+            return None
+        with default_storage.open(MANIFEST_NAME, "rb") as fh:
+            manifest = json.load(fh)
+        cache.set(MANIFEST_CACHE_KEY, manifest, MANIFEST_CACHE_TIMEOUT)
+    return manifest
+
+
+def _save_manifest(manifest):
+    # Le cache d'abord : les lecteurs ne voient pas le court instant où le fichier est remplacé
+    cache.set(MANIFEST_CACHE_KEY, manifest, MANIFEST_CACHE_TIMEOUT)
+    default_storage.delete(MANIFEST_NAME)
+    default_storage.save(MANIFEST_NAME, ContentFile(json.dumps(manifest, indent=1).encode()))
+
+
+def read_shard(filename):
+    """Octets gzip d'un fragment ; le nom change avec le contenu, le cache n'expire donc jamais."""
+    key = f"sitemap:file:{filename}"
+    data = cache.get(key)
+    if data is None:
+        with default_storage.open(filename, "rb") as fh:
+            data = fh.read()
+        cache.set(key, data, None)
+    return data
+
+
+# ---------- Fragments ----------
+def _car_range(k, count):
+    """Plage de clés primaires du fragment k sur count : [bas, haut[ (haut None pour le dernier)."""
+    low = uuid.UUID(int=(k << 128) // count)
+    high = uuid.UUID(int=((k + 1) << 128) // count) if k + 1 < count else None
+    return low, high
+
+
+def _car_queryset(k, count):
+    low, high = _car_range(k, count)
+    qs = Car.objects.filter(is_active=True, pk__gte=low)
+    return qs.filter(pk__lt=high) if high else qs
+
+
+def _signature(qs):
+    stats = qs.order_by().aggregate(urls=Count("pk"), lastmod=Max("updated_at"))
+    return stats["urls"], stats["lastmod"].isoformat() if stats["lastmod"] else None
+
+
+def _car_entries(k, count):
+    for car in _car_queryset(k, count).only("slug", "updated_at").order_by("pk").iterator(chunk_size=CHUNK_SIZE):
+        yield car.get_absolute_url(), car.updated_at
+
+
+def _landing_entries():
+    yield reverse("home"), None
+    pages = LandingPage.objects.filter(is_active=True).only("slug", "updated_at").order_by("position", "slug")
+    for page in pages.iterator(chunk_size=CHUNK_SIZE):
+        yield page.get_absolute_url(), page.updated_at
+
+
+def _write_shard(name, entries, base_url):
+    """Écrit un fragment compressé ; renvoie (nom dans le stockage, empreinte du contenu)."""
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    digest = hashlib.sha1()
+    # mtime=0 : même contenu, mêmes octets (et même empreinte)
+    with gzip.GzipFile(fileobj=out, mode="wb", mtime=0) as gz:
+        def write(text):
+            data = text.encode()
+            digest.update(data)
+            gz.write(data)
+
+        write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n')
+        for path, lastmod in entries:
+            line = f"<url><loc>{escape(urljoin(base_url, path))}</loc>"
+            if lastmod:
+                line += f"<lastmod>{lastmod.isoformat(timespec='seconds')}</lastmod>"
+            write(line + "</url>\n")
+        write("</urlset>\n")
+    out.seek(0)
+    fingerprint = digest.hexdigest()[:12]
+    filename = f"{DIRECTORY}/{name}-{fingerprint}.xml.gz"
+    if not default_storage.exists(filename):
+        default_storage.save(filename, File(out, name=filename))
+    out.close()
+    return filename, fingerprint
+
+
+def build_sitemaps(force=False, base_url=None, log=None):
+    """
+    Met à jour les fragments dont la signature a changé, puis le manifeste.
+    Renvoie le manifeste ; `log(nom, régénéré)` est appelé pour chaque fragment.
+    """
+    base_url = (base_url or settings.SITE_URL).rstrip("/") + "/"
+    old = load_manifest() or {}
+    old_shards = old.get("shards", {}) if old.get("base_url") == base_url else {}
+
+    # Nombre de fragments : ne diminue jamais (les plages, donc les fragments, resteraient stables)
+    active = Car.objects.filter(is_active=True).count()
+    car_shards = max(old.get("car_shards", 1), math.ceil(active / SHARD_TARGET), 1)
+    while True:
+        signatures = {f"cars-{k}": _signature(_car_queryset(k, car_shards)) for k in range(car_shards)}
+        if all(urls <= MAX_URLS for urls, _ in signatures.values()):
+            break
+        car_shards *= 2
+    if car_shards != old.get("car_shards"):
+        old_shards = {}   # plages différentes : tout est à refaire
+    signatures["landings"] = _signature(LandingPage.objects.filter(is_active=True))
+
+    shards = {}
+    for name, (urls, lastmod) in signatures.items():
+        previous = old_shards.get(name)
+        if not force and previous and previous["signature"] == [urls, lastmod]:
+            shards[name] = previous
+            if log:
+                log(name, False)
+            continue
+        if name == "landings":
+            entries = _landing_entries()
+        else:
+            entries = _car_entries(int(name.split("-")[1]), car_shards)
+        filename, fingerprint = _write_shard(name, entries, base_url)
+        shards[name] = {
+            "file": filename,
+            "digest": fingerprint,
+            "signature": [urls, lastmod],
+            "lastmod": lastmod or timezone.now().isoformat(),
+        }
+        if log:
+            log(name, True)
+
+    # Fichiers remplacés : gardés une génération de plus (manifeste encore en cache ailleurs)
+    in_use = {shard["file"] for shard in shards.values()}
+    retired = sorted({shard["file"] for shard in old.get("shards", {}).values()} - in_use)
+    manifest = {"base_url": base_url, "car_shards": car_shards, "shards": shards, "retired": retired,
+                "generated_at": timezone.now().isoformat()}
+    _save_manifest(manifest)
+    for filename in set(old.get("retired", ())) - in_use:
+        default_storage.delete(filename)
+    return manifest
+
+
+def render_index(manifest):
+    """sitemap.xml : la liste des fragments et leur lastmod, sur le même domaine que leurs URL."""
+    base_url = manifest["base_url"]
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<sitemapindex xmlns="{XMLNS}">']
+    for name, shard in sorted(manifest["shards"].items()):
+        loc = urljoin(base_url, reverse("sitemap_shard", kwargs={"name": name}))
+        lines.append(f"<sitemap><loc>{escape(loc)}</loc><lastmod>{shard['lastmod']}</lastmod></sitemap>")
+    lines.append("</sitemapindex>\n")
+    return "\n".join(lines)
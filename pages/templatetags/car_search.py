@@ -1,8 +1,14 @@
 # cars/templatetags/car_search.py
 from django import template
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Prefetch
-from cars.models import Car, CarPhoto, BodyType, SenegalRegion
+from django.http import QueryDict
+from cars.facets import faceted_search
+from cars.favorites import mark_favorites
+from cars import bitmap_index
+from cars.geo import nearby, point_from_params
+from cars.pagination import KeysetPaginator, CURSOR_PARAM, DEFAULT_SORT
+from cars.search import search_filter, search_rank
+from cars.models import Car, BodyType, SenegalRegion
 from pages.forms import CarSearchForm
 
 register = template.Library()
@@ -11,41 +17,70 @@ def _default_qs():
     return (
         Car.objects.filter(is_active=True)
         .select_related("brand", "place__city")
-        .prefetch_related(
-            Prefetch("photos",
-                     queryset=CarPhoto.objects.order_by("order", "id"),
-                     to_attr="prefetched_photos")
-        )
         .order_by("-created_at")
     )
 
+def _facet_urls(request, facets):
+    """Ajoute à chaque option l'URL qui l'active / la désactive (sans la page courante)."""
+    params = request.GET.copy() if request else QueryDict(mutable=True)
+    params.pop("page", None)
+    params.pop(CURSOR_PARAM, None)
+    for facet in facets:
+        for option in facet["options"]:
+            q = params.copy()
+            if facet["multiple"]:
+                values = [v for v in q.getlist(facet["name"]) if v != option["value"]]
+                if not option["selected"]:
+                    values.append(option["value"])
+                q.setlist(facet["name"], values)
+            elif option["selected"]:
+                q.pop(facet["name"], None)
+            else:
+                q[facet["name"]] = option["value"]
+            option["url"] = f"?{q.urlencode()}"
+    return facets
+
+
 @register.simple_tag(takes_context=True)
-def car_search_context(context, base_qs=None, limit=None, paginate=False, per_page=12):
+def car_search_context(context, base_qs=None, limit=None, paginate=False, per_page=12, cursor=False):
     request = context.get("request")
     form = CarSearchForm(request.GET or None)
 
+    use_index = base_qs is None and bitmap_index.is_enabled()
     base_qs = base_qs or _default_qs()
-    qs = base_qs
 
-    body_type = region = None
     body_type_label = region_label = None
 
-    if form.is_valid():
-        body_type = form.cleaned_data.get("body_type")
-        region = form.cleaned_data.get("region")
-
-        if body_type:
-            qs = qs.filter(body_type=body_type)
-            body_type_label = dict(BodyType.choices).get(body_type)
+    params = form.cleaned_data if form.is_valid() else {}
+    text = params.get("q")
+    sort = request.GET.get("sort") if request else None
+    point = point_from_params(params)
+    if point:
+        # Rayon autour de l'utilisateur, trié par distance (sauf recherche texte)
+        base_qs = nearby(base_qs, *point)
+    indexed = None
+    if use_index and not point and not text and sort in (None, "", DEFAULT_SORT):
+        # Filtres et compteurs en mémoire ; seule la page affichée est chargée.
+        # None tant que l'index se construit en arrière-plan : SQL ci-dessous
+        indexed = bitmap_index.indexed_search(base_qs, params)
+    if indexed:
+        qs, facets, total = indexed
+    else:
+        # Le texte restreint la base des facettes ; les résultats sont triés par pertinence
+        qs, facets, total = faceted_search(search_filter(base_qs, text), params)
+        qs = search_rank(qs, text)
 
-        if region:
-            qs = qs.filter(place__region=region)
-            region_label = dict(SenegalRegion.choices).get(region)
+    body_type = params.get("body_type")
+    region = params.get("region")
+    if body_type:
+        body_type_label = dict(BodyType.choices).get(body_type)
+    if region:
+        region_label = dict(SenegalRegion.choices).get(region)
 
     if limit and not paginate:
         qs = qs[:limit]
 
-    no_results = not qs.exists()
+    no_results = total == 0
 
     suggest_same_region = base_qs.filter(place__region=region)[:8] if no_results and region else []
     suggest_same_body   = base_qs.filter(body_type=body_type)[:8] if no_results and body_type else []
@@ -54,7 +89,15 @@ def car_search_context(context, base_qs=None, limit=None, paginate=False, per_pa
     page_obj = None
     cars_items = qs
     is_paginated = False
-    if paginate:
+    querystring = ""
+    if paginate and cursor and not text and not point and not isinstance(qs, bitmap_index.IndexedResults):
+        # Curseur : le total vient déjà des facettes, aucune requête COUNT/OFFSET
+        paginator = KeysetPaginator(qs, per_page, sort=sort, count=total)
+        page_obj = paginator.page(request.GET.get(CURSOR_PARAM) if request else None,
+                                  params=request.GET if request else None)
+        cars_items = page_obj.object_list
+        is_paginated = page_obj.has_other_pages()
+    elif paginate:
         paginator = Paginator(qs, per_page)
         page_number = (request.GET.get("page") if request else None) or 1
         try:
@@ -65,6 +108,13 @@ def car_search_context(context, base_qs=None, limit=None, paginate=False, per_pa
             page_obj = paginator.page(paginator.num_pages)
         cars_items = page_obj.object_list
         is_paginated = paginator.num_pages > 1
+        if request:
+            params = request.GET.copy()
+            params.pop("page", None)
+            querystring = params.urlencode()
+
+    if request and (paginate or limit):
+        cars_items = mark_favorites(cars_items, request.user)
 
     return {
         "form": form,
@@ -72,7 +122,11 @@ def car_search_context(context, base_qs=None, limit=None, paginate=False, per_pa
         "cars": cars_items,
         "page_obj": page_obj,
         "is_paginated": is_paginated,
+        "querystring": querystring,
         "no_results": no_results,
+        "total": total,
+        "point": point,
+        "facets": _facet_urls(request, facets),
         "body_type_label": body_type_label,
         "region_label": region_label,
         "suggest_same_region": suggest_same_region,
@@ -1,3 +1,47 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from cars.models import Car
+from utils import slow_queries
+from utils.server_timing import ServerTimingMiddleware
+from utils.slow_queries import connection_created_receiver, slow_query_wrapper
+from .benchmarks import QueryBudgetTestCase
+
+
+class PagesQueryBudgetTests(QueryBudgetTestCase):
+    def test_home(self):
+        self.assertWithinBudget("home")
+
+    def test_landing_page(self):
+        self.assertWithinBudget("landing_page")
+
+    def test_car_search_context(self):
+        self.assertWithinBudget("car_search_context")
+
+
+class SlowQueryWrapperTests(TestCase):
+    def setUp(self):
+        wrappers = connection.execute_wrappers
+        self.addCleanup(setattr, connection, "execute_wrappers", list(wrappers))
+        # Connexion « neuve » : le wrapper sera posé pendant la requête, comme en production
+        connection.execute_wrappers = [w for w in wrappers if w is not slow_query_wrapper]
+
+    def view(self, request):
+        connection_created_receiver(sender=connection.__class__, connection=connection)
+        Car.objects.count()
+        return HttpResponse()
+
+    def test_wrappers_unchanged_and_every_slow_query_logged(self):
+        middleware = ServerTimingMiddleware(self.view)
+        with mock.patch.object(slow_queries, "SLOW_QUERY_MS", 0), \
+                mock.patch.object(slow_queries, "capture") as capture:
+            for _ in range(4):
+                with CaptureQueriesContext(connection) as queries:
+                    middleware(RequestFactory().get("/"))
+                self.assertEqual(connection.execute_wrappers, [slow_query_wrapper])
+                self.assertEqual(len(queries), 1)
+        self.assertEqual(capture.call_count, 4)
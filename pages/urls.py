@@ -4,6 +4,9 @@ from . import views
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('robots.txt', views.robots_txt, name='robots_txt'),
+    path('sitemap.xml', views.sitemap_index, name='sitemap_index'),
+    path('sitemaps/<slug:name>.xml.gz', views.sitemap_shard, name='sitemap_shard'),
     path('<slug:slug>', views.landing_page, name='landing_page'),
     path('search/', views.cars_search, name='cars_search'),
 ]
\ No newline at end of file
@@ -1,35 +1,41 @@
+from django.http import Http404, HttpResponse
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Count, Exists, OuterRef, BooleanField, Value, Prefetch
-from cars.models import Car, CarPhoto, Favorite
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from cars.cache_tags import tagged_get_or_set
+from cars.conditional import conditional_page, page_validators
+from cars.favorites import mark_favorites
+from cars.models import Car
+from cars.pagination import KeysetPaginator, CURSOR_PARAM
 
-from .models import LandingPage, LandingKind
+from .models import LandingPage, LandingPageCar, LandingKind
 from .forms import CarSearchForm
+from .sitemaps import load_manifest, read_shard, render_index
+
+LANDING_PAGE_SIZE = 12
+# Ordre de l'index landing_member_order_idx : une page = une plage de l'index, sans OFFSET
+LANDING_ORDERING = ("-car_created_at", "-car")
+
 
 # Create your views here.
 def home(request):
     form = CarSearchForm(request.GET or None)
-    user = request.user if request.user.is_authenticated else None
-    fav_exists = Favorite.objects.filter(user=user, car=OuterRef("pk")) if user else Favorite.objects.none()
 
     base_qs = (
         Car.objects.filter(is_active=True)
-        .select_related("brand", "place__city")
-        .prefetch_related(
-            Prefetch(
-                "photos",
-                queryset=CarPhoto.objects.order_by("order", "id"),
-                to_attr="prefetched_photos",  # si tu utilises cover_photo basé sur photos
-            )
-        )
-        .annotate(
-            favorite_count=Count("favorite_links", distinct=True),
-            is_favorite=Exists(fav_exists) if user else Value(False, output_field=BooleanField()),
-        )
+        .select_related("brand", "model_name", "place__city")
         .order_by("-created_at")
     )
 
-    latest_cars = base_qs[:12]
-    top_cars = base_qs.order_by("-is_featured", "-created_at")[:3]  # adapte si tu as un flag is_featured
+    # Listes partagées par tous les visiteurs, invalidées par l'étiquette "cars" ;
+    # is_favorite posé ensuite en Python depuis le cache des favoris
+    latest_cars = tagged_get_or_set("home:latest", ["cars"], lambda: list(base_qs[:12]))
+    top_cars = tagged_get_or_set("home:top", ["cars"],
+                                 lambda: list(base_qs.order_by("-is_featured", "-created_at")[:3]))  # adapte si tu as un flag is_featured
+    latest_cars = mark_favorites(latest_cars, request.user)
+    top_cars = mark_favorites(top_cars, request.user)
 
     return render(request, "pages/index.html", {
         "latest_cars": latest_cars,
@@ -38,26 +44,83 @@ def home(request):
     })
 
 
+def landing_validators(request, slug):
+    page = (LandingPage.objects.filter(slug=slug, is_active=True)
+            .values("pk", "kind", "city_id", "region", "body_type", "updated_at").first())
+    if page is None:
+        return None
+    # Étiquette de la cible : change dès qu'une annonce entre, sort ou est modifiée dans la liste
+    target = {
+        LandingKind.DESTINATION: f"city:{page['city_id']}",
+        LandingKind.REGION: f"region:{page['region']}",
+        LandingKind.CATEGORY: f"body:{page['body_type']}",
+    }.get(page["kind"])
+    tags = [f"landing:{slug}", "landings"] + ([target] if target else [])
+    return page_validators(request, ("landing", page["pk"], request.GET.get(CURSOR_PARAM)),
+                           timestamps=(page["updated_at"],), tags=tags)
+
+
+@conditional_page(landing_validators)
 def landing_page(request, slug):
     page = get_object_or_404(LandingPage, slug=slug, is_active=True)
 
+    page_obj = None
     cars = None
     if page.kind != LandingKind.STATIC:
-        cars = (Car.objects.filter(is_active=True)
-                .select_related("brand", "place__city")
-                .prefetch_related(Prefetch("photos",
-                                           queryset=CarPhoto.objects.order_by("order", "id"),
-                                           to_attr="prefetched_photos"))
-                .order_by("-created_at"))
-        if page.kind == LandingKind.DESTINATION and page.city_id:
-            cars = cars.filter(place__city_id=page.city_id)
-        elif page.kind == LandingKind.REGION and page.region:
-            cars = cars.filter(place__region=page.region)
-        elif page.kind == LandingKind.CATEGORY and page.body_type:
-            cars = cars.filter(body_type=page.body_type)
-    context = {"page": page, "cars": cars}
+        # Plage de la table d'appartenance (voir pages/landing_members.py), à partir de la clé
+        # de la dernière annonce affichée ; total lu sur la page, sans COUNT
+        members = (LandingPageCar.objects.filter(landing=page)
+                   .select_related("car__brand", "car__model_name", "car__place__city"))
+        paginator = KeysetPaginator(members, LANDING_PAGE_SIZE, sort="landing", ordering=LANDING_ORDERING,
+                                    count=page.member_count)
+        page_obj = paginator.page(request.GET.get(CURSOR_PARAM), params=request.GET)
+        cars = mark_favorites((m.car for m in page_obj), request.user)
+    context = {
+        "page": page,
+        "cars": cars,
+        "page_obj": page_obj,
+        "is_paginated": page_obj is not None and page_obj.has_other_pages(),
+    }
     return render(request, "pages/landing_page.html", context)
 
 
 def cars_search(request):
-    return render(request, "pages/search_car.html")
\ No newline at end of file
+    return render(request, "pages/search_car.html")
+
+
+# ---------- Plan du site (pages/sitemaps.py) ----------
+SITEMAP_MAX_AGE = 3600
+SITEMAP_RETRY_AFTER = 3600
+
+
+def sitemap_index(request):
+    manifest = load_manifest()
+    if manifest is None:
+        # Jamais de génération dans une requête : on attend la commande build_sitemaps
+        response = HttpResponse("Plan du site en cours de génération.", status=503, content_type="text/plain")
+        response["Retry-After"] = SITEMAP_RETRY_AFTER
+        patch_cache_control(response, no_store=True)
+        return response
+    response = HttpResponse(render_index(manifest), content_type="application/xml; charset=utf-8")
+    patch_cache_control(response, public=True, max_age=SITEMAP_MAX_AGE)
+    return response
+
+
+def sitemap_shard(request, name):
+    shard = (load_manifest() or {}).get("shards", {}).get(name)
+    if shard is None:
+        raise Http404("Fragment inconnu.")
+    etag = f'"{shard["digest"]}"'
+    last_modified = parse_datetime(shard["lastmod"]).timestamp()
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(read_shard(shard["file"]), content_type="application/gzip")
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=SITEMAP_MAX_AGE)
+    return response
+
+
+def robots_txt(request):
+    sitemap = request.build_absolute_uri(reverse("sitemap_index"))
+    return HttpResponse(f"User-agent: *\nDisallow: /admin/\n\nSitemap: {sitemap}\n", content_type="text/plain")
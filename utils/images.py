@@ -0,0 +1,75 @@
+# utils/images.py
+"""
+Normalisation des images à l'upload (CarPhoto.image, Profile.image).
+
+Orientation EXIF appliquée, métadonnées retirées (EXIF, GPS, XMP ; le profil ICC
+est conservé), plus grand côté ramené à `max_side`, ré-encodage JPEG à
+UPLOAD_JPEG_QUALITY (PNG si l'image a de la transparence).
+
+L'image est lue depuis le fichier temporaire de l'upload : pour un JPEG, le
+décodeur réduit directement l'échelle (draft) au lieu de décoder la pleine
+résolution ; la réduction se fait sur place, et le résultat est écrit dans un
+fichier temporaire qui passe sur disque au-delà de quelques Mo.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from PIL import ExifTags, Image, ImageOps
+
+SPOOL_MAX_SIZE = 2 * 1024 * 1024
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+
+
+def _quality():
+    return getattr(settings, "UPLOAD_JPEG_QUALITY", 85)
+
+
+def normalize_image(fh, name, max_side):
+    """
+    Renvoie (File, (largeur, hauteur)) prêt à être enregistré, ou None si l'image
+    est déjà conforme (format, taille, aucune métadonnée) et peut être gardée telle quelle.
+    """
+    fh.seek(0)
+    with Image.open(fh) as im:
+        source_format = im.format
+        if source_format == "JPEG":
+            # Décodage à l'échelle 1/2, 1/4 ou 1/8 la plus proche au-dessus de la cible
+            im.draft("RGB", (max_side, max_side))
+        orientation = im.getexif().get(ExifTags.Base.Orientation, 1)
+        has_metadata = any(key in im.info for key in METADATA_KEYS)
+        too_big = max(im.size) > max_side
+        if not (too_big or orientation != 1 or has_metadata or source_format not in ("JPEG", "PNG")):
+            return None
+
+        im.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)   # sur place, jamais d'agrandissement
+        ImageOps.exif_transpose(im, in_place=True)
+        alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+        icc_profile = im.info.get("icc_profile")
+
+        out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        if alpha:
+            im.save(out, "PNG", optimize=True)
+            ext = ".png"
+        else:
+            if im.mode != "RGB":
+                im = im.convert("RGB")
+            im.save(out, "JPEG", quality=_quality(), optimize=True, progressive=True, icc_profile=icc_profile)
+            ext = ".jpg"
+        size = im.size
+    out.seek(0)
+    stem = os.path.splitext(os.path.basename(name or "image"))[0]
+    return File(out, name=f"{stem}{ext}"), size
+
+
+def normalize_field_file(field_file, max_side):
+    """Normalise un fichier d'ImageField pas encore enregistré ; renvoie ses dimensions (ou None)."""
+    result = normalize_image(field_file.file, field_file.name, max_side)
+    if result is None:
+        return None
+    file, size = result
+    # Le nouveau fichier remplace l'upload ; le nom définitif vient toujours de upload_to
+    field_file.file, field_file.name = file, file.name
+    field_file._committed = False
+    return size
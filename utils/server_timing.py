@@ -0,0 +1,187 @@
+# utils/server_timing.py
+"""
+Instrumentation par requête : temps SQL, rendu des gabarits, appels au stockage S3.
+
+ServerTimingMiddleware mesure chaque requête :
+- SQL : nombre de requêtes et durée, par `connection.execute_wrapper` sur
+  chaque base ;
+- gabarits : durée des rendus de premier niveau, via le moteur DjangoTemplates
+  ci-dessous (les {% include %} sont comptés dans le gabarit qui les inclut ;
+  les requêtes lancées pendant le rendu, par un queryset paresseux, sont
+  comptées à la fois ici et dans SQL) ;
+- stockage : nombre d'appels et durée, via les méthodes de
+  utils.storages.SharedClientS3Storage.
+
+Les mesures sont tenues dans une ContextVar : une par requête, même en threads.
+Pour les requêtes échantillonnées (SERVER_TIMING_SAMPLE_RATE, 10 % par défaut)
+et toutes celles plus lentes que SERVER_TIMING_SLOW_MS, une ligne JSON est
+écrite dans le journal "utils.server_timing", par nom d'URL (car_detail,
+home…) ; en WARNING au-delà du seuil. La réponse reçoit aussi un en-tête
+Server-Timing (onglet Réseau du navigateur), mais seulement pour le staff et
+INTERNAL_IPS, ou pour tous avec SERVER_TIMING_HEADER = True : il renseigne sur
+la base de données. Réponses en flux (car_feed…) : seule la préparation de la
+réponse est mesurée, pas le corps produit après coup.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates as BaseDjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+# Mesures de la requête en cours ; None hors requête (commandes, threads d'upload…)
+_current = ContextVar("server_timing", default=None)
+
+
+class RequestMetrics:
+    def __init__(self, request=None):
+        # Requête en cours : vue d'origine des requêtes lentes (utils/slow_queries.py)
+        self.request = request
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.storage_count = 0
+        self.storage_time = 0.0
+        self.storage_ops = {}
+        # Appels imbriqués (save_many → save, rendu dans un rendu) : comptés une fois
+        self._depth = {"template": 0, "storage": 0}
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_metrics():
+    return _current.get()
+
+
+# ---------- Points de mesure ----------
+def _db_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.db_count += 1
+
+
+@contextmanager
+def _timed(kind, op=None):
+    metrics = _current.get()
+    if metrics is None or metrics._depth[kind]:
+        yield
+        return
+    metrics._depth[kind] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics._depth[kind] -= 1
+        if kind == "template":
+            metrics.template_time += elapsed
+        else:
+            metrics.storage_count += 1
+            metrics.storage_time += elapsed
+            metrics.storage_ops[op] = metrics.storage_ops.get(op, 0) + 1
+
+
+def timed_storage_call(op):
+    """Décorateur des méthodes de stockage : un appel `op` de plus pour la requête en cours."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            with _timed("storage", op):
+                return method(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with _timed("template"):
+            return super().render(context, request)
+
+
+class DjangoTemplates(BaseDjangoTemplates):
+    """Moteur DjangoTemplates dont les rendus sont chronométrés (TEMPLATES["BACKEND"])."""
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+
+# ---------- Middleware ----------
+def _server_timing(metrics, total):
+    entries = [
+        f'db;dur={metrics.db_time * 1000:.1f};desc="SQL ({metrics.db_count})"',
+        f'tpl;dur={metrics.template_time * 1000:.1f};desc="Gabarits"',
+    ]
+    if metrics.storage_count:
+        entries.append(f'storage;dur={metrics.storage_time * 1000:.1f};desc="S3 ({metrics.storage_count})"')
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """À placer en tête de MIDDLEWARE : le total couvre les autres middlewares."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "SERVER_TIMING_SAMPLE_RATE", 0.1)
+        self.slow_ms = getattr(settings, "SERVER_TIMING_SLOW_MS", 1000)
+        self.header = getattr(settings, "SERVER_TIMING_HEADER", False)
+        self.internal_ips = getattr(settings, "INTERNAL_IPS", ())
+
+    def header_allowed(self, request):
+        if self.header or request.META.get("REMOTE_ADDR") in self.internal_ips:
+            return True
+        user = getattr(request, "user", None)
+        return bool(user and user.is_authenticated and user.is_staff)
+
+    def __call__(self, request):
+        metrics = RequestMetrics(request)
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = metrics.elapsed()
+
+        slow = total * 1000 >= self.slow_ms
+        if not slow and random.random() >= self.sample_rate:
+            return response
+        if self.header_allowed(request):
+            response["Server-Timing"] = _server_timing(metrics, total)
+        match = request.resolver_match
+        record = {
+            "url_name": match.view_name if match else None,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            "db_count": metrics.db_count,
+            "db_ms": round(metrics.db_time * 1000, 1),
+            "template_ms": round(metrics.template_time * 1000, 1),
+            "storage_count": metrics.storage_count,
+            "storage_ms": round(metrics.storage_time * 1000, 1),
+            "storage_ops": metrics.storage_ops,
+            "slow": slow,
+        }
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps(record), extra={"timing": record})
+        return response
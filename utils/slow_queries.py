@@ -0,0 +1,263 @@
+# utils/slow_queries.py
+"""
+Requêtes SQL lentes : capture en production, sans profileur.
+
+Un `execute_wrapper` posé sur chaque connexion (signal connection_created)
+chronomètre toutes les requêtes. Au-delà de SLOW_QUERY_MS, il écrit une ligne
+JSON dans un journal local tournant (SLOW_QUERY_LOG) : SQL, paramètres, durée,
+vue d'origine (nom d'URL, via utils.server_timing), empreinte de la requête
+normalisée et plan d'exécution :
+- PostgreSQL : EXPLAIN (ANALYZE off), donc sans réexécuter la requête ;
+- SQLite : EXPLAIN QUERY PLAN.
+
+Le plan est demandé sur un curseur brut (ni wrappers ni journal de Django),
+dans un point de sauvegarde si une transaction est ouverte : un EXPLAIN en
+échec n'interrompt pas la requête HTTP. Un plan au plus par empreinte toutes
+les EXPLAIN_INTERVAL secondes et par processus ; les autres occurrences sont
+journalisées sans plan.
+
+Rapport : manage.py slow_query_report (top N par empreinte).
+"""
+import glob
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from utils.server_timing import current_metrics
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = getattr(settings, "SLOW_QUERY_MS", 200)
+SLOW_QUERY_LOG = getattr(settings, "SLOW_QUERY_LOG", None)
+LOG_MAX_BYTES = getattr(settings, "SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024)
+LOG_BACKUPS = getattr(settings, "SLOW_QUERY_LOG_BACKUPS", 5)
+EXPLAIN_INTERVAL = 300
+MAX_PARAMS = 50
+MAX_PARAM_LENGTH = 200
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+# empreinte -> time.monotonic() du dernier EXPLAIN
+_explained = {}
+_writer = None
+_writer_lock = threading.Lock()
+
+
+# ---------- Empreinte ----------
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_LIST = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """SQL sans valeurs : littéraux et paramètres en ?, listes IN (…) et VALUES repliées."""
+    sql = _STRING.sub("?", sql).replace("%s", "?")
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    sql = _REPEATED_LIST.sub("(...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+# ---------- Plan d'exécution ----------
+def _sqlite_plan(rows):
+    # (id, parent, notused, detail) : arbre rendu par indentation
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+def explain(connection, sql, params):
+    """Plan de `sql` (liste de lignes) ; None si la base ne sait pas l'expliquer."""
+    if connection.vendor == "postgresql":
+        prefix = "EXPLAIN (ANALYZE off) "
+    elif connection.vendor == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return None
+    in_transaction = not connection.get_autocommit()
+    cursor = connection.create_cursor()
+    try:
+        if in_transaction:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+        except connection.Database.Error:
+            if in_transaction:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            raise
+        finally:
+            if in_transaction:
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+    finally:
+        cursor.close()
+    if connection.vendor == "sqlite":
+        return _sqlite_plan(rows)
+    return [row[0] for row in rows]
+
+
+# ---------- Journal ----------
+def _log_writer():
+    """Logger à fichier tournant, créé au premier enregistrement (dossier compris)."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                path = Path(SLOW_QUERY_LOG)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                              encoding="utf-8", delay=True)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                writer = logging.getLogger(f"{__name__}.file")
+                writer.addHandler(handler)
+                writer.setLevel(logging.INFO)
+                writer.propagate = False
+                _writer = writer
+    return _writer
+
+
+def _param(value):
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    text = str(value)
+    return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + "…"
+
+
+def _params(params, many):
+    if params is None:
+        return None
+    if many:
+        # executemany : premier jeu de paramètres seulement
+        params = next(iter(params), ())
+    if isinstance(params, dict):
+        return {k: _param(v) for k, v in list(params.items())[:MAX_PARAMS]}
+    return [_param(v) for v in list(params)[:MAX_PARAMS]]
+
+
+def capture(connection, sql, params, many, duration):
+    normalized = normalize(sql)
+    digest = fingerprint(normalized)
+    metrics = current_metrics()
+    request = metrics.request if metrics else None
+    match = request.resolver_match if request else None
+    record = {
+        "at": datetime.now(dt_timezone.utc).isoformat(timespec="milliseconds"),
+        "duration_ms": round(duration * 1000, 1),
+        "fingerprint": digest,
+        "view": match.view_name if match else None,
+        "method": request.method if request else None,
+        "path": request.path if request else None,
+        "database": connection.alias,
+        "sql": sql,
+        "params": _params(params, many),
+        "normalized": normalized,
+        "plan": None,
+    }
+    now = time.monotonic()
+    if many or not sql.lstrip().upper().startswith(EXPLAINABLE):
+        record["plan_skipped"] = "non expliquée"
+    elif now - _explained.get(digest, -EXPLAIN_INTERVAL) < EXPLAIN_INTERVAL:
+        record["plan_skipped"] = "plan récent"
+    else:
+        _explained[digest] = now
+        try:
+            record["plan"] = explain(connection, sql, params)
+        except connection.Database.Error as e:
+            record["plan_skipped"] = f"erreur : {e}".strip()
+    _log_writer().info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if duration * 1000 >= SLOW_QUERY_MS:
+        try:
+            capture(context["connection"], sql, params, many, duration)
+        except Exception:
+            # La capture ne doit jamais faire échouer la requête observée
+            logger.exception("Capture de requête lente impossible")
+    return result
+
+
+# ---------- Lecture du journal (slow_query_report) ----------
+def log_files(path=None):
+    """Journal et ses rotations (.1, .2…), du plus ancien au plus récent."""
+    path = Path(path or SLOW_QUERY_LOG)
+    rotated = [(int(p.suffix[1:]), p) for p in path.parent.glob(glob.escape(path.name) + ".*")
+               if p.suffix[1:].isdigit()]
+    return [p for _, p in sorted(rotated, reverse=True)] + ([path] if path.exists() else [])
+
+
+def read_log(paths, since=None):
+    for path in paths:
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue        # ligne tronquée (rotation pendant l'écriture)
+                if since and datetime.fromisoformat(record["at"]) < since:
+                    continue
+                yield record
+
+
+def aggregate(records):
+    """Statistiques par empreinte : occurrences, durées, vues et dernier plan connu."""
+    groups = {}
+    for record in records:
+        group = groups.get(record["fingerprint"])
+        if group is None:
+            group = groups[record["fingerprint"]] = {
+                "fingerprint": record["fingerprint"], "normalized": record["normalized"],
+                "count": 0, "total_ms": 0.0, "max_ms": 0.0, "durations": [], "views": {},
+                "plan": None, "example": None, "last_at": None,
+            }
+        duration = record["duration_ms"]
+        group["count"] += 1
+        group["total_ms"] += duration
+        group["durations"].append(duration)
+        view = record["view"] or "-"
+        group["views"][view] = group["views"].get(view, 0) + 1
+        group["last_at"] = record["at"]
+        if duration >= group["max_ms"]:
+            group["max_ms"] = duration
+            group["example"] = {"sql": record["sql"], "params": record["params"]}
+        if record["plan"]:
+            group["plan"] = record["plan"]
+    for group in groups.values():
+        durations = sorted(group.pop("durations"))
+        group["mean_ms"] = group["total_ms"] / group["count"]
+        group["p95_ms"] = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+    return list(groups.values())
+
+
+# ---------- Signaux ----------
+def connection_created_receiver(sender, connection, **kwargs):
+    # execute_wrappers est propre à la connexion (et au thread) ; survit aux reconnexions.
+    # En bas de la pile : la connexion s'ouvre souvent pendant une requête, après le
+    # connection.execute_wrapper() de ServerTimingMiddleware, dont le pop() final doit
+    # retirer son propre wrapper, pas celui-ci
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, slow_query_wrapper)
+
+
+if SLOW_QUERY_MS and SLOW_QUERY_LOG:
+    connection_created.connect(connection_created_receiver)
@@ -1,10 +1,200 @@
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name, setting
+
+from utils.server_timing import timed_storage_call
+
+MB = 1024 * 1024
+
+# Un client botocore (et son pool de connexions) par configuration et par processus.
+# Le client est thread-safe ; chaque thread garde sa propre ressource boto3, construite sur ce client.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class SharedClientS3Storage(S3Boto3Storage):
+    """
+    S3Boto3Storage dont tous les threads et toutes les instances partagent un client :
+    un seul pool de connexions HTTP (AWS_S3_MAX_POOL_CONNECTIONS) au lieu d'un client
+    créé paresseusement par thread. Les gros fichiers partent en multipart parallèle
+    (AWS_S3_MULTIPART_THRESHOLD, AWS_S3_MULTIPART_CHUNKSIZE, AWS_S3_MAX_CONCURRENCY),
+    et save_many envoie plusieurs fichiers en même temps.
+    """
+
+    def __init__(self, **settings):
+        super().__init__(**settings)
+        pool_size = setting("AWS_S3_MAX_POOL_CONNECTIONS", 50)
+        if setting("AWS_S3_CLIENT_CONFIG") is None:
+            self.client_config = self.client_config.merge(Config(
+                max_pool_connections=pool_size,
+                retries={"max_attempts": 5, "mode": "standard"},
+            ))
+        if setting("AWS_S3_TRANSFER_CONFIG") is None:
+            self.transfer_config = TransferConfig(
+                multipart_threshold=setting("AWS_S3_MULTIPART_THRESHOLD", 8 * MB),
+                multipart_chunksize=setting("AWS_S3_MULTIPART_CHUNKSIZE", 8 * MB),
+                max_concurrency=setting("AWS_S3_MAX_CONCURRENCY", 10),
+                use_threads=True,
+            )
+        self.save_concurrency = setting("AWS_S3_SAVE_MANY_WORKERS", 6)
+        # Calculée avant la création du client : botocore réécrit ensuite client_config.retries
+        config = self.client_config
+        self._client_key = (
+            self.session_profile, self.access_key, self.secret_key, self.security_token,
+            self.region_name, self.endpoint_url, self.use_ssl, self.verify,
+            config.max_pool_connections, config.signature_version, repr(config.s3), repr(config.retries),
+        )
+
+    def _shared_client(self):
+        key = self._client_key
+        client = _clients.get(key)
+        if client is None:
+            with _clients_lock:
+                client = _clients.get(key)
+                if client is None:
+                    client = self._create_session().client(
+                        "s3",
+                        region_name=self.region_name,
+                        use_ssl=self.use_ssl,
+                        endpoint_url=self.endpoint_url,
+                        config=self.client_config,
+                        verify=self.verify,
+                    )
+                    _clients[key] = client
+        return client
+
+    @property
+    def connection(self):
+        connection = getattr(self._connections, "connection", None)
+        if connection is None:
+            client = self._shared_client()
+            # Ressource boto3 légère (par thread) sur le client partagé
+            resource_cls = getattr(SharedClientS3Storage, "_resource_cls", None)
+            if resource_cls is None:
+                resource_cls = SharedClientS3Storage._resource_cls = type(
+                    self._create_session().resource("s3", region_name=self.region_name or "us-east-1"))
+            connection = self._connections.connection = resource_cls(client=client)
+        return connection
+
+    # Appels réseau comptés par ServerTimingMiddleware (url() est un calcul local)
+    @timed_storage_call("open")
+    def _open(self, name, mode="rb"):
+        return super()._open(name, mode)
+
+    @timed_storage_call("save")
+    def _save(self, name, content):
+        return super()._save(name, content)
+
+    @timed_storage_call("delete")
+    def delete(self, name):
+        return super().delete(name)
+
+    @timed_storage_call("exists")
+    def exists(self, name):
+        return super().exists(name)
+
+    @timed_storage_call("size")
+    def size(self, name):
+        return super().size(name)
 
+    @timed_storage_call("listdir")
+    def listdir(self, name):
+        return super().listdir(name)
 
-class StaticRootS3Boto3Storage(S3Boto3Storage):
+    @timed_storage_call("modified_time")
+    def get_modified_time(self, name):
+        return super().get_modified_time(name)
+
+    # Les threads de l'envoi parallèle n'héritent pas du contexte : mesuré d'un bloc
+    @timed_storage_call("save_many")
+    def save_many(self, items, max_workers=None):
+        """
+        Enregistre [(nom, contenu), …] en parallèle (threads, client partagé) ;
+        renvoie les noms définitifs dans le même ordre. La première erreur est relevée.
+        """
+        items = list(items)
+        if len(items) <= 1:
+            return [self.save(name, content) for name, content in items]
+        with ThreadPoolExecutor(max_workers=min(max_workers or self.save_concurrency, len(items))) as pool:
+            return list(pool.map(lambda item: self.save(*item), items))
+
+
+class StaticRootS3Boto3Storage(SharedClientS3Storage):
     location = "static"
 
 
-class MediaRootS3Boto3Storage(S3Boto3Storage):
+class MediaRootS3Boto3Storage(SharedClientS3Storage):
     location = "media"
-    file_overwrite = False
\ No newline at end of file
+    file_overwrite = False
+
+
+def save_many(storage, items, max_workers=None):
+    """storage.save_many si le stockage sait envoyer en parallèle, sinon un par un."""
+    if hasattr(storage, "save_many"):
+        return storage.save_many(items, max_workers=max_workers)
+    return [storage.save(name, content) for name, content in items]
+
+
+# ---------- Parcours et suppression en masse (S3 ou stockage fichier) ----------
+# Suppression multiple S3 : 1000 clés maximum par requête
+DELETE_BATCH_SIZE = 1000
+
+StoredObject = namedtuple("StoredObject", "name size modified")
+
+
+def iter_objects(storage, prefix, page_size=1000):
+    """
+    StoredObject(name, size, modified) de chaque fichier sous `prefix`, noms relatifs au
+    stockage, triés dans l'ordre des octets UTF-8 (ordre de ListObjectsV2).
+    Sur S3 la liste est paginée : la mémoire ne dépend pas du nombre de clés.
+    """
+    if isinstance(storage, S3Boto3Storage):
+        root = storage._normalize_name(clean_name(prefix))
+        strip = len(storage._normalize_name("x")) - 1   # longueur de "media/"
+        paginator = storage.connection.meta.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(Bucket=storage.bucket_name, Prefix=root,
+                                   PaginationConfig={"PageSize": page_size})
+        for page in pages:
+            for obj in page.get("Contents", ()):
+                yield StoredObject(obj["Key"][strip:], obj["Size"], obj["LastModified"])
+        return
+
+    # Stockage fichier (développement) : parcours complet puis tri
+    base = storage.path("")
+    found = []
+    for dirpath, _dirs, files in os.walk(storage.path(prefix)):
+        for filename in files:
+            path = os.path.join(dirpath, filename)
+            stat = os.stat(path)
+            name = os.path.relpath(path, base).replace(os.sep, "/")
+            found.append(StoredObject(name, stat.st_size, datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)))
+    yield from sorted(found)
+
+
+def delete_objects(storage, names):
+    """Supprime `names` (au plus DELETE_BATCH_SIZE) ; renvoie [(nom, erreur)] des échecs."""
+    names = list(names)
+    if not names:
+        return []
+    if isinstance(storage, S3Boto3Storage):
+        response = storage.connection.meta.client.delete_objects(
+            Bucket=storage.bucket_name,
+            Delete={"Objects": [{"Key": storage._normalize_name(clean_name(n))} for n in names], "Quiet": True},
+        )
+        strip = len(storage._normalize_name("x")) - 1
+        return [(e["Key"][strip:], e.get("Message", e.get("Code"))) for e in response.get("Errors", ())]
+
+    errors = []
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError as e:
+            errors.append((name, str(e)))
+    return errors